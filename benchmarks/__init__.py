@@ -0,0 +1 @@
+# benchmarks 패키지 (오프라인 부하 테스트)
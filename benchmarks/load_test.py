@@ -0,0 +1,344 @@
+"""
+오프라인 부하 테스트 / 지연시간 벤치마크
+
+스텁 LLM 서버(benchmarks.stub_llm)와 API 서버(benchmarks.serve → main:app)를 띄운 뒤
+엔드포인트별로 지정한 동시성으로 요청을 보내 처리량, p50/p95/p99 지연시간, 서버 최대 RSS를 JSON으로 출력합니다.
+HTTP 오류뿐 아니라 서비스 오류 문구로 시작하는 200 응답과 /metrics의 bovi_errors 증가분도 오류로 집계합니다.
+CPU 전용, 네트워크 없이 실행 가능합니다 (--stub-encoder 사용 시 모델 다운로드도 없음).
+
+사용법:
+    python -m benchmarks.load_test --stub-encoder --concurrency 16 --requests 200 --output bench.json
+    python -m benchmarks.load_test --endpoints recommend,games --concurrency 1,8,32
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+
+from services.embedding_backend import PARITY_QUERIES
+
+ENDPOINTS = ("recommend", "explain-rules", "rule-summary", "games")
+
+# 서비스가 예외를 잡아 status=success 응답의 본문으로 돌려주는 오류 메시지 (이걸로 시작하면 실패로 집계)
+SERVICE_ERROR_PREFIXES = (
+    "게임 추천 중 오류가 발생했습니다",
+    "추천할 게임 데이터를 찾을 수 없습니다",
+    "룰 질문 답변 중 오류가 발생했습니다",
+    "룰 요약 중 오류가 발생했습니다",
+    "파인튜닝 모델 답변 생성 중 오류가 발생했습니다"
+)
+
+RULE_QUESTIONS = [
+    "몇 명이서 할 수 있나요?",
+    "게임은 어떻게 끝나나요?",
+    "처음에 카드는 몇 장씩 받나요?",
+    "승리 조건이 뭐예요?",
+    "차례에 할 수 있는 행동은 무엇인가요?"
+]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+class RSSMonitor:
+    """서버 프로세스의 최대 RSS (Linux는 커널이 기록한 VmHWM, 그 외는 주기적 샘플링)"""
+
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self.sampled_peak = 0
+        self._task = None
+
+    def _read_proc(self, field):
+        try:
+            with open(f"/proc/{self.pid}/status") as f:
+                for line in f:
+                    if line.startswith(field + ":"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return None
+
+    def _current_rss(self):
+        rss = self._read_proc("VmRSS")
+        if rss is None:
+            try:
+                import psutil
+                rss = psutil.Process(self.pid).memory_info().rss
+            except Exception:
+                rss = 0
+        return rss
+
+    async def _run(self):
+        while True:
+            self.sampled_peak = max(self.sampled_peak, self._current_rss())
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def peak(self):
+        return max(self._read_proc("VmHWM") or 0, self.sampled_peak)
+
+
+def build_payloads(endpoint, count, game_names, unique):
+    """엔드포인트별 요청 목록 [(method, path, json)]. unique면 캐시를 우회하도록 질문에 번호를 붙임"""
+    payloads = []
+    for i in range(count):
+        suffix = f" ({i})" if unique else ""
+        game_name = game_names[i % len(game_names)]
+        if endpoint == "recommend":
+            payloads.append(("POST", "/recommend", {"query": PARITY_QUERIES[i % len(PARITY_QUERIES)] + suffix, "top_k": 3}))
+        elif endpoint == "explain-rules":
+            payloads.append(("POST", "/explain-rules", {
+                "game_name": game_name, "question": RULE_QUESTIONS[i % len(RULE_QUESTIONS)] + suffix, "chat_type": "gpt"
+            }))
+        elif endpoint == "rule-summary":
+            payloads.append(("POST", "/rule-summary", {"game_name": game_name}))
+        elif endpoint == "games":
+            payloads.append(("GET", "/games", None))
+    return payloads
+
+
+def is_success(response):
+    """HTTP 200 + status=success이고, 본문 텍스트가 서비스 오류 메시지가 아닌 응답만 성공"""
+    if response.status_code != 200:
+        return False
+    body = response.json()
+    if body.get("status", "success") != "success":
+        return False
+    data = body.get("data") or {}
+    for key in ("recommendation", "answer", "summary"):
+        text = data.get(key)
+        if isinstance(text, str) and text.strip().startswith(SERVICE_ERROR_PREFIXES):
+            return False
+    return True
+
+
+async def service_error_count(client):
+    """/metrics의 bovi_errors_total 합계 (서비스 안에서 잡힌 예외 수)"""
+    try:
+        response = await client.get("/metrics")
+    except httpx.HTTPError:
+        return 0
+    total = 0.0
+    for line in response.text.splitlines():
+        if line.startswith("bovi_errors_total"):
+            total += float(line.rsplit(" ", 1)[1])
+    return int(total)
+
+
+def summarize(latencies_ms, errors, elapsed, service_errors=0):
+    latencies = np.array(latencies_ms) if latencies_ms else np.zeros(1)
+    # 예외는 응답 본문 오류와 bovi_errors 증가로 함께 나타날 수 있으므로 둘 중 큰 값을 실패 수로 사용
+    requests = len(latencies_ms) + errors
+    errors = min(requests, max(errors, service_errors))
+    completed = requests - errors
+    return {
+        "requests": requests,
+        "errors": errors,
+        "service_errors": service_errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_rps": round(completed / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "p50": round(float(np.percentile(latencies, 50)), 2),
+            "p95": round(float(np.percentile(latencies, 95)), 2),
+            "p99": round(float(np.percentile(latencies, 99)), 2),
+            "mean": round(float(latencies.mean()), 2),
+            "max": round(float(latencies.max()), 2)
+        }
+    }
+
+
+async def run_endpoint(client, payloads, concurrency):
+    """payloads를 concurrency개의 워커로 나눠 보내고 지연시간 통계 반환"""
+    queue = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while True:
+            try:
+                method, path, body = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                ok = is_success(response)
+            except (httpx.HTTPError, ValueError):
+                ok = False
+            if ok:
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                errors += 1
+
+    service_errors_before = await service_error_count(client)
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    service_errors = await service_error_count(client) - service_errors_before
+    return summarize(latencies, errors, elapsed, service_errors)
+
+
+async def wait_until_ready(client, process, timeout):
+    """서비스 초기화가 끝날 때까지 /health 폴링. 반환: 대기 시간(초)"""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"API 서버가 종료되었습니다 (exit code {process.returncode})")
+        try:
+            response = await client.get("/health")
+            if response.status_code == 200 and response.json().get("services_loaded"):
+                return time.perf_counter() - start
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.5)
+    raise TimeoutError(f"{timeout}초 안에 서비스가 준비되지 않았습니다.")
+
+
+def _start(module, port, env, extra_args=()):
+    return subprocess.Popen(
+        [sys.executable, "-m", module, "--port", str(port), *extra_args],
+        env=env, stdout=subprocess.DEVNULL, stderr=None
+    )
+
+
+async def run_suite(args):
+    with open("data/game_names.json", "r", encoding="utf-8") as f:
+        game_names = list(dict.fromkeys(json.load(f)))[:args.games]
+
+    llm_port, api_port = _free_port(), _free_port()
+    workdir = tempfile.mkdtemp(prefix="bovi-bench-")
+    env = {
+        **os.environ,
+        "OPENAI_API_BASE": f"http://127.0.0.1:{llm_port}/v1",
+        "OPENAI_API_KEY": "stub",
+        "HF_HUB_OFFLINE": "1",
+        "TRANSFORMERS_OFFLINE": "1",
+        # 벤치마크가 운영 데이터 파일을 건드리지 않도록 임시 경로 사용
+        "RULE_SUMMARY_STORE_PATH": os.path.join(workdir, "rule_summaries.sqlite"),
+        "BENCH_STUB_ENCODER": "1" if args.stub_encoder else "0",
+        "FINETUNING_ENABLED": "1" if args.with_finetuning else "0"
+    }
+
+    llm_process = _start("benchmarks.stub_llm", llm_port, env,
+                         ["--latency-ms", str(args.llm_latency_ms), "--token-ms", str(args.llm_token_ms)])
+    api_process = _start("benchmarks.serve", api_port, env)
+
+    try:
+        timeout = httpx.Timeout(args.request_timeout)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{api_port}", timeout=timeout) as client:
+            startup_seconds = await wait_until_ready(client, api_process, args.startup_timeout)
+
+            monitor = RSSMonitor(api_process.pid)
+            monitor.start()
+            results = {}
+            for concurrency in args.concurrency:
+                for endpoint in args.endpoints:
+                    payloads = build_payloads(endpoint, args.requests, game_names, args.unique)
+                    if args.warmup:
+                        await run_endpoint(client, payloads[:args.warmup], concurrency)
+                    stats = await run_endpoint(client, payloads, concurrency)
+                    results.setdefault(str(concurrency), {})[endpoint] = stats
+                    print(f"  c={concurrency:<3} {endpoint:<14} {stats['throughput_rps']:>8} req/s  "
+                          f"p50 {stats['latency_ms']['p50']}ms  p99 {stats['latency_ms']['p99']}ms  "
+                          f"errors {stats['errors']} (service {stats['service_errors']})", file=sys.stderr)
+            await monitor.stop()
+            health = (await client.get("/health")).json()
+    finally:
+        for process in (api_process, llm_process):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpu_count": os.cpu_count()},
+        "config": {
+            "endpoints": args.endpoints,
+            "concurrency": args.concurrency,
+            "requests_per_endpoint": args.requests,
+            "warmup": args.warmup,
+            "unique_queries": args.unique,
+            "stub_encoder": args.stub_encoder,
+            "with_finetuning": args.with_finetuning,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_token_ms": args.llm_token_ms
+        },
+        "startup_seconds": round(startup_seconds, 2),
+        "peak_rss_bytes": monitor.peak(),
+        "results": results,
+        "health": health
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="오프라인 부하 테스트 / 지연시간 벤치마크")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help=f"쉼표 구분 ({', '.join(ENDPOINTS)})")
+    parser.add_argument("--concurrency", default="8", help="동시성, 쉼표로 여러 단계 지정 가능 (예: 1,8,32)")
+    parser.add_argument("--requests", type=int, default=200, help="엔드포인트별 요청 수")
+    parser.add_argument("--warmup", type=int, default=10, help="측정 전 워밍업 요청 수")
+    parser.add_argument("--games", type=int, default=20, help="룰 질문/요약에 사용할 게임 수")
+    parser.add_argument("--unique", action="store_true", help="질문마다 번호를 붙여 임베딩/답변 캐시 우회")
+    parser.add_argument("--stub-encoder", action="store_true", help="bge-m3 대신 결정적 스텁 인코더 사용")
+    parser.add_argument("--with-finetuning", action="store_true", help="파인튜닝 모델도 로드 (기본: 생략)")
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--llm-token-ms", type=float, default=5.0)
+    parser.add_argument("--startup-timeout", type=float, default=600.0)
+    parser.add_argument("--request-timeout", type=float, default=120.0)
+    parser.add_argument("--output", help="결과 JSON 저장 경로 (없으면 표준 출력)")
+    args = parser.parse_args()
+
+    args.endpoints = [e.strip() for e in args.endpoints.split(",") if e.strip()]
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"지원하지 않는 엔드포인트: {', '.join(sorted(unknown))}")
+    args.concurrency = [int(c) for c in args.concurrency.split(",")]
+
+    report = asyncio.run(run_suite(args))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
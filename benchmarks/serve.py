@@ -0,0 +1,94 @@
+"""
+부하 테스트용으로 main:app 실행 (선택적으로 스텁 인코더 사용)
+
+환경변수:
+    BENCH_STUB_ENCODER=1        bge-m3 대신 텍스트 해시 기반 결정적 벡터 (모델 다운로드 없이 실행)
+    BENCH_STUB_TOKENIZER=auto   auto | 1 | 0  tiktoken BPE 파일을 불러올 수 없으면(오프라인) 글자 단위 스텁 인코딩 사용
+    FINETUNING_ENABLED=0        KoAlpaca 로드 생략 (/explain-rules는 chat_type=gpt 경로만 측정)
+
+사용법:
+    python -m benchmarks.serve --port 8900
+"""
+
+import os
+import hashlib
+import argparse
+
+import numpy as np
+import uvicorn
+
+# bge-m3 출력 차원 (game_index.faiss와 같아야 검색 가능)
+STUB_EMBED_DIM = 1024
+
+
+class StubEncoder:
+    """SentenceTransformer.encode와 같은 시그니처의 결정적 인코더 (같은 텍스트 → 같은 벡터)"""
+
+    def __init__(self, dim=STUB_EMBED_DIM):
+        self.dim = dim
+        self.max_seq_length = 512
+
+    def _vector(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        return np.random.default_rng(seed).standard_normal(self.dim).astype("float32")
+
+    def encode(self, texts, batch_size=32, normalize_embeddings=False, **kwargs):
+        single = isinstance(texts, str)
+        vectors = np.vstack([self._vector(text) for text in ([texts] if single else texts)])
+        if normalize_embeddings:
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors[0] if single else vectors
+
+
+class StubEncoding:
+    """tiktoken Encoding의 encode/decode만 흉내 내는 글자 단위 인코딩 (네트워크 없이 컨텍스트 예산 계산)"""
+
+    name = "bench-stub"
+
+    def encode(self, text, **kwargs):
+        return [ord(ch) for ch in text]
+
+    def decode(self, tokens, **kwargs):
+        return "".join(chr(token) for token in tokens)
+
+
+def _tiktoken_available():
+    try:
+        import tiktoken
+        tiktoken.get_encoding("cl100k_base")  # TIKTOKEN_CACHE_DIR에 없으면 다운로드를 시도하다 실패
+        return True
+    except Exception:
+        return False
+
+
+def _load_stub_embedding_model(model_name="BAAI/bge-m3", *args, **kwargs):
+    return StubEncoder(), {"device": "cpu", "quantize": "stub", "num_threads": None, "max_seq_length": 512}
+
+
+def patch_services():
+    """main을 import하기 전에 호출해야 적용됨"""
+    if os.getenv("BENCH_STUB_ENCODER") == "1":
+        import services.embedding_backend
+        services.embedding_backend.load_embedding_model = _load_stub_embedding_model
+
+    stub_tokenizer = os.getenv("BENCH_STUB_TOKENIZER", "auto")
+    if stub_tokenizer == "1" or (stub_tokenizer == "auto" and not _tiktoken_available()):
+        import services.tokens
+        encoding = StubEncoding()
+        services.tokens._get_encoding = lambda model_name: encoding
+
+
+def main():
+    parser = argparse.ArgumentParser(description="부하 테스트용 API 서버 실행")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    args = parser.parse_args()
+
+    patch_services()
+    from main import app
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+결정적(deterministic) 응답을 주는 OpenAI 호환 스텁 LLM 서버 (네트워크/API 키 없이 부하 테스트용)
+
+같은 메시지에는 항상 같은 답변을 주고, 지연시간은 고정 지연 + 토큰당 지연으로 흉내냅니다.
+ChatOpenAI는 OPENAI_API_BASE=http://127.0.0.1:<port>/v1 로 이 서버를 사용합니다.
+
+사용법:
+    python -m benchmarks.stub_llm --port 8901 --latency-ms 200 --token-ms 5
+"""
+
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+# 응답에 섞어 쓸 문장 (추천 형식/마커를 포함해 후처리 경로도 실행되도록)
+_SENTENCES = [
+    "이 게임은 규칙이 간단해서 처음 하는 사람도 쉽게 배울 수 있습니다.",
+    "차례마다 카드를 한 장 내고 효과를 적용합니다.",
+    "가장 먼저 목표 점수에 도달한 사람이 승리합니다.",
+    "인원수에 따라 준비하는 카드 수가 달라집니다.",
+    "협력과 블러핑이 중요한 게임입니다.",
+    "라운드가 끝나면 점수를 계산하고 다음 라운드를 준비합니다."
+]
+
+
+def build_reply(messages, num_sentences):
+    """메시지 해시로 문장을 골라 결정적인 답변 생성"""
+    digest = hashlib.sha256(json.dumps(messages, ensure_ascii=False, sort_keys=True).encode("utf-8")).digest()
+    lines = [_SENTENCES[digest[i] % len(_SENTENCES)] for i in range(num_sentences)]
+    system = next((m.get("content", "") for m in messages if m.get("role") == "system"), "")
+    if "추천 완료!" in system:
+        lines = [f"게임{i + 1}: {line}" for i, line in enumerate(lines)] + ["추천 완료!"]
+    return "\n".join(lines)
+
+
+def create_app(latency_ms=200.0, token_ms=5.0, num_sentences=4):
+    app = FastAPI(title="stub-llm")
+    app.state.requests = 0
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        reply = build_reply(body.get("messages", []), num_sentences)
+        pieces = reply.split(" ")
+        model = body.get("model", "stub")
+        created = int(time.time())
+        completion_id = f"chatcmpl-stub-{app.state.requests}"
+
+        await asyncio.sleep(latency_ms / 1000)
+
+        if body.get("stream"):
+            async def events():
+                for i, piece in enumerate(pieces):
+                    text = piece if i == len(pieces) - 1 else piece + " "
+                    chunk = {
+                        "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                        "choices": [{"index": 0, "delta": {"role": "assistant", "content": text}, "finish_reason": None}]
+                    }
+                    yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                    await asyncio.sleep(token_ms / 1000)
+                done = {
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+                }
+                yield f"data: {json.dumps(done)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(token_ms * len(pieces) / 1000)
+        return {
+            "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(pieces), "total_tokens": len(pieces)}
+        }
+
+    @app.get("/v1/models")
+    async def models():
+        return {"object": "list", "data": [{"id": "gpt-3.5-turbo", "object": "model", "owned_by": "stub"}]}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI 호환 스텁 LLM 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="요청당 고정 지연")
+    parser.add_argument("--token-ms", type=float, default=5.0, help="토큰(단어)당 지연")
+    parser.add_argument("--sentences", type=int, default=4, help="답변 문장 수")
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.latency_ms, args.token_ms, args.sentences),
+                host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
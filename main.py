@@ -1,15 +1,24 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from starlette.routing import Match
+from pydantic import BaseModel, Field
 import uvicorn
 import os
+import json
+import time
+import uuid
+import asyncio
 import logging
 from typing import List, Optional
 
 # 서비스 import
 from services.embedding_service import EmbeddingService
 from services.finetuning_service import FinetuningService
-from services.rag_service import RAGService
+from services.generation_scheduler import GenerationQueueFull, max_new_tokens_limit
+from services.rag_service import RAGService, session_store
+from services.metrics import REGISTRY, REQUEST_LATENCY, REQUESTS, IN_FLIGHT, FALLBACKS
+from services.shared_state import worker_count, is_multi_worker
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
@@ -30,70 +39,270 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def _route_path(request: Request) -> str:
+    """메트릭 라벨용 라우트 경로 템플릿 (경로 파라미터 값으로 라벨이 늘어나지 않도록)"""
+    for route in app.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """엔드포인트별 진행 중 요청 수, 지연시간, 상태 코드 집계 (스트리밍은 헤더 전송 시점까지)"""
+    endpoint = _route_path(request)
+    start = time.perf_counter()
+    status = 500
+    try:
+        with IN_FLIGHT.track(endpoint=endpoint):
+            response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        REQUEST_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint)
+        REQUESTS.inc(endpoint=endpoint, status=status)
+
 # Request/Response 모델들
 class GameRecommendationRequest(BaseModel):
     query: str
     top_k: int = 3
+    session_id: Optional[str] = None  # 없으면 요청마다 새 세션 (대화 이어가기는 응답의 session_id 재사용)
 
 class RuleQuestionRequest(BaseModel):
     game_name: str
     question: str
     chat_type: str = "gpt"
+    max_new_tokens: int = Field(128, ge=1, le=max_new_tokens_limit())  # chat_type="finetuning"일 때 생성할 최대 토큰 수
+    session_id: Optional[str] = None
 
 class GameRuleSummaryRequest(BaseModel):
     game_name: str
     chat_type: str = "gpt"
+    session_id: Optional[str] = None
+
+class BatchRecommendationRequest(BaseModel):
+    items: List[GameRecommendationRequest]
+
+class BatchRuleQuestionRequest(BaseModel):
+    items: List[RuleQuestionRequest]
 
 class APIResponse(BaseModel):
     status: str
     data: Optional[dict] = None
     message: Optional[str] = None
 
+def _session_id(request) -> str:
+    """요청의 세션 ID (없으면 새로 발급해 세션 간 히스토리가 섞이지 않도록 함)"""
+    return request.session_id or uuid.uuid4().hex
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "32"))
+
+def _check_batch(items):
+    if not items:
+        raise HTTPException(status_code=400, detail="items가 비어 있습니다.")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"한 번에 최대 {BATCH_MAX_ITEMS}개까지 요청할 수 있습니다.")
+
+def _batch_response(results, session_ids, what):
+    """항목별 결과에 세션 ID를 붙이고 성공 개수를 메시지로"""
+    for result, session_id in zip(results, session_ids):
+        result["session_id"] = session_id
+    succeeded = sum(result["status"] == "success" for result in results)
+    return APIResponse(
+        status="success",
+        data={"results": results},
+        message=f"{what} {len(results)}개 중 {succeeded}개가 완료되었습니다."
+    )
+
 # 전역 변수로 서비스 인스턴스 저장
-services_initialized = False
+services_initialized = False  # RAG(추천/룰 설명) 준비 완료 여부. 파인튜닝 모델은 기다리지 않음
 embedding_service = None
 finetuning_service = None
 rag_service = None
 
-@app.on_event("startup")
-async def startup_event():
-    """서버 시작 시 AI 모델들을 로드"""
-    global services_initialized
-    logger.info("🚀 AI 백엔드 서버를 시작합니다...")
-    
+# 컴포넌트별 준비 상태와 로드/워밍업 시간 (/health에 노출)
+component_status = {
+    name: {"status": "pending", "load_seconds": None, "warmup_seconds": None, "error": None}
+    for name in ("embedding", "rag", "finetuning")
+}
+_startup_tasks = set()
+
+async def _load_component(name, load, warmup=None):
+    """load()를 백그라운드 스레드에서 실행하고 워밍업까지 끝나면 ready로 표시. 실패하면 None"""
+    status = component_status[name]
+    status["status"] = "loading"
+    start = time.perf_counter()
     try:
-        # 서비스 초기화 (실제 모델 로드)
-        global embedding_service, finetuning_service, rag_service
+        component = await asyncio.to_thread(load)
+        status["load_seconds"] = round(time.perf_counter() - start, 2)
         
-        # RAG 서비스는 필수 (게임 추천 및 룰 설명)
-        rag_service = RAGService()
-        
-        # 파인튜닝 서비스는 선택사항 (모델 파일이 있을 때만)
-        try:
-            finetuning_service = FinetuningService()
-        except Exception as e:
-            logger.warning(f"⚠️ 파인튜닝 서비스 로드 실패 (계속 진행): {str(e)}")
-            finetuning_service = None
-        
-        # 임베딩 서비스는 현재 RAG에 포함되어 있어 별도 로드하지 않음
-        # embedding_service = EmbeddingService()
-        
-        services_initialized = True
-        logger.info("✅ 모든 AI 서비스가 성공적으로 초기화되었습니다!")
+        if warmup and os.getenv("STARTUP_WARMUP", "1") == "1":
+            status["status"] = "warming_up"
+            warmup_start = time.perf_counter()
+            await warmup(component)
+            status["warmup_seconds"] = round(time.perf_counter() - warmup_start, 2)
         
+        status["status"] = "ready"
+        logger.info(f"✅ {name} 준비 완료 (로드 {status['load_seconds']}초, 워밍업 {status['warmup_seconds']}초)")
+        return component
+    
     except Exception as e:
-        logger.error(f"❌ 서비스 초기화 실패: {str(e)}")
-        services_initialized = False
+        status["status"] = "failed"
+        status["error"] = str(e)
+        if status["load_seconds"] is None:
+            status["load_seconds"] = round(time.perf_counter() - start, 2)
+        logger.error(f"❌ {name} 로드 실패: {str(e)}")
+        return None
+
+def _load_embedding_service():
+    service = EmbeddingService()
+    if service.model is None:
+        raise RuntimeError("임베딩 모델이 로드되지 않았습니다.")
+    return service
+
+def _load_finetuning_service():
+    service = FinetuningService()
+    if service.model is None:
+        raise RuntimeError("파인튜닝 모델이 로드되지 않았습니다.")
+    return service
+
+async def _start_rag_services():
+    """임베딩 → RAG 순서로 로드. RAG가 준비되는 즉시 추천/룰 설명/게임 목록 API를 열어줌"""
+    global embedding_service, rag_service, services_initialized
+    
+    # 임베딩 서비스 (RAG 서비스가 공유해서 사용, 동시 요청을 배치로 묶어 인코딩)
+    embedding_service = await _load_component(
+        "embedding", _load_embedding_service, lambda service: asyncio.to_thread(service.warmup)
+    )
+    if embedding_service is None:
+        component_status["rag"].update(status="failed", error="임베딩 서비스 로드 실패")
+        return
+    
+    # RAG 서비스는 필수 (게임 추천 및 룰 설명)
+    rag_service = await _load_component(
+        "rag", lambda: RAGService(embedding_service=embedding_service), lambda service: asyncio.to_thread(service.warmup)
+    )
+    services_initialized = rag_service is not None
+
+async def _start_finetuning_service():
+    """파인튜닝 서비스는 선택사항: 로드 중이거나 실패하면 chat_type="finetuning" 요청은 RAG로 처리"""
+    global finetuning_service
+    if os.getenv("FINETUNING_ENABLED", "1") != "1":
+        component_status["finetuning"]["status"] = "disabled"
+        return
+    if is_multi_worker():
+        # 5.8B 모델을 워커마다 올리면 메모리가 워커 수만큼 늘어나므로 멀티 워커에서는 로드하지 않음
+        logger.warning(
+            f"⚠️ 워커가 {worker_count()}개라 파인튜닝 모델을 로드하지 않습니다 (FINETUNING_ENABLED=0으로 동작). "
+            "파인튜닝 모델은 WEB_CONCURRENCY=1인 별도 프로세스에서 서비스하세요."
+        )
+        component_status["finetuning"]["status"] = "disabled"
+        return
+    finetuning_service = await _load_component(
+        "finetuning", _load_finetuning_service, lambda service: service.warmup()
+    )
+
+@app.on_event("startup")
+async def startup_event():
+    """서버 시작 시 AI 모델 로드를 백그라운드에서 시작 (RAG와 파인튜닝 모델을 동시에 로드)"""
+    logger.info("🚀 AI 백엔드 서버를 시작합니다...")
+    for coroutine in (_start_rag_services(), _start_finetuning_service()):
+        task = asyncio.create_task(coroutine)
+        _startup_tasks.add(task)
+        task.add_done_callback(_startup_tasks.discard)
+
+def _overall_status():
+    statuses = {name: state["status"] for name, state in component_status.items()}
+    if statuses["rag"] == "failed":
+        return "failed"
+    if not services_initialized:
+        return "initializing"
+    if statuses["finetuning"] in ("ready", "disabled"):
+        return "healthy"
+    return "partial"  # RAG API는 사용 가능, 파인튜닝 모델은 로드 중이거나 실패
 
 @app.get("/health")
 async def health_check():
     """헬스체크 엔드포인트"""
     return {
-        "status": "healthy" if services_initialized else "initializing",
+        "status": _overall_status(),
         "services_loaded": services_initialized,
+        "components": component_status,
+        "rule_index": rag_service.rule_index_registry.get_stats() if rag_service and rag_service.rule_index_registry else None,
+        "corpus": rag_service.corpus.get_stats() if rag_service and rag_service.corpus else None,
+        "game_attributes": rag_service.attributes.get_stats() if rag_service and rag_service.attributes else None,
+        "similar_games": rag_service.similar_games.get_stats() if rag_service and rag_service.similar_games else None,
+        "embedding": embedding_service.get_model_info() if embedding_service else None,
+        "finetuning": finetuning_service.get_model_info() if finetuning_service else None,
+        "rule_summary_store": rag_service.summary_store.get_stats() if rag_service else None,
+        "rule_summary_reducer": rag_service.rule_text_reducer.get_stats() if rag_service else None,
+        "rule_answer_cache": rag_service.answer_cache.get_stats() if rag_service else None,
+        "sessions": session_store.get_stats(),
         "message": "보드게임 AI 백엔드가 정상 작동 중입니다!"
     }
 
+def _collect_service_metrics():
+    """각 서비스가 집계 중인 캐시/큐 통계를 스크레이프 시점에 Prometheus 메트릭으로 변환"""
+    cache_requests = []
+    queue_depth = []
+    if embedding_service:
+        embedding = embedding_service.get_model_info()
+        cache = embedding["cache"]
+        cache_requests += [
+            ({"cache": "embedding", "result": "hit"}, cache["memory_hits"] + cache["disk_hits"]),
+            ({"cache": "embedding", "result": "miss"}, cache["misses"])
+        ]
+        queue_depth.append(({"queue": "embedding"}, embedding["queue_depth"]))
+    if rag_service:
+        answer_cache = rag_service.answer_cache.get_stats()
+        summary_store = rag_service.summary_store.get_stats()
+        cache_requests += [
+            ({"cache": "rule_answer", "result": "hit"}, answer_cache["hits"]),
+            ({"cache": "rule_answer", "result": "miss"}, answer_cache["misses"]),
+            ({"cache": "rule_summary", "result": "hit"}, summary_store["hits"]),
+            ({"cache": "rule_summary", "result": "stale"}, summary_store["stale_hits"]),
+            ({"cache": "rule_summary", "result": "miss"}, summary_store["misses"])
+        ]
+        if rag_service.rule_index_registry:
+            registry = rag_service.rule_index_registry.get_stats()
+            cache_requests += [
+                ({"cache": "rule_index", "result": "hit"}, registry["hits"]),
+                ({"cache": "rule_index", "result": "miss"}, registry["misses"])
+            ]
+    active_sequences = []
+    prefix_saved_seconds = []
+    prefix_saved_tokens = []
+    generation_rejected = []
+    if finetuning_service and finetuning_service.scheduler:
+        scheduler = finetuning_service.scheduler.get_stats()
+        queue_depth.append(({"queue": "generation"}, scheduler["queue_depth"]))
+        active_sequences.append(({}, scheduler["active_sequences"]))
+        prefix_cache = scheduler["prefix_cache"]
+        cache_requests += [
+            ({"cache": "prefix_kv", "result": "hit"}, prefix_cache["hits"]),
+            ({"cache": "prefix_kv", "result": "miss"}, prefix_cache["misses"])
+        ]
+        prefix_saved_seconds.append(({}, prefix_cache["prefill_seconds_saved"]))
+        prefix_saved_tokens.append(({}, prefix_cache["prefill_tokens_saved"]))
+        generation_rejected.append(({}, scheduler["rejected"]))
+    sessions = session_store.get_stats()
+    return [
+        ("bovi_prefix_prefill_saved_seconds", "counter", "Prefill time skipped by prefix KV cache hits", prefix_saved_seconds),
+        ("bovi_prefix_prefill_saved_tokens", "counter", "Prefill tokens skipped by prefix KV cache hits", prefix_saved_tokens),
+        ("bovi_cache_requests", "counter", "Cache lookups by cache and result", cache_requests),
+        ("bovi_queue_depth", "gauge", "Requests waiting in batching queues", queue_depth),
+        ("bovi_generation_active_sequences", "gauge", "Sequences in the active generation batch", active_sequences),
+        ("bovi_generation_rejected", "counter", "Generation requests rejected because the queue was full", generation_rejected),
+        ("bovi_sessions", "gauge", "Chat sessions held in memory", [({}, sessions["sessions"])])
+    ]
+
+REGISTRY.add_collector(_collect_service_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus 텍스트 형식 메트릭"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.post("/recommend", response_model=APIResponse)
 async def recommend_games(request: GameRecommendationRequest):
     """게임 추천 API"""
@@ -104,18 +313,51 @@ async def recommend_games(request: GameRecommendationRequest):
         logger.info(f"게임 추천 요청: {request.query}")
         
         # RAG 서비스 호출
-        result = await rag_service.recommend_games(request.query, request.top_k)
+        session_id = _session_id(request)
+        result = await rag_service.recommend_games(request.query, session_id=session_id, top_k=request.top_k)
         
         return APIResponse(
             status="success",
-            data={"recommendation": result},
+            data={"recommendation": result, "session_id": session_id},
             message="게임 추천이 완료되었습니다."
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"게임 추천 오류: {str(e)}")
         raise HTTPException(status_code=500, detail=f"게임 추천 중 오류가 발생했습니다: {str(e)}")
 
+@app.post("/recommend/batch", response_model=APIResponse)
+async def recommend_games_batch(request: BatchRecommendationRequest):
+    """게임 추천 배치 API (임베딩/검색은 한 번에, LLM 호출은 BATCH_LLM_CONCURRENCY까지 동시에). 결과와 오류는 항목별로 반환"""
+    if not services_initialized:
+        raise HTTPException(status_code=503, detail="서비스가 아직 초기화되지 않았습니다.")
+    _check_batch(request.items)
+    
+    logger.info(f"게임 추천 배치 요청: {len(request.items)}개")
+    session_ids = [_session_id(item) for item in request.items]
+    try:
+        results = await rag_service.recommend_games_batch(
+            [(item.query, session_id, item.top_k) for item, session_id in zip(request.items, session_ids)]
+        )
+    except Exception as e:
+        logger.error(f"게임 추천 배치 오류: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"게임 추천 중 오류가 발생했습니다: {str(e)}")
+    return _batch_response(results, session_ids, "게임 추천")
+
+def _use_finetuning(request):
+    """chat_type="finetuning" 요청을 파인튜닝 모델로 처리할지. 모델이 없거나 생성 대기열이 가득 차면 RAG로 대체"""
+    if request.chat_type != "finetuning":
+        return False
+    if not finetuning_service:
+        FALLBACKS.inc(kind="finetuning_to_rag")
+        return False
+    if finetuning_service.is_busy():
+        FALLBACKS.inc(kind="finetuning_busy_to_rag")
+        return False
+    return True
+
 @app.post("/explain-rules", response_model=APIResponse)
 async def explain_rules(request: RuleQuestionRequest):
     """룰 설명 API"""
@@ -126,21 +368,83 @@ async def explain_rules(request: RuleQuestionRequest):
         logger.info(f"룰 질문: {request.game_name} - {request.question}")
         
         # 서비스 호출
-        if request.chat_type == "finetuning" and finetuning_service:
-            result = await finetuning_service.answer_question(request.game_name, request.question)
+        session_id = _session_id(request)
+        if _use_finetuning(request):
+            result = await _finetuning_answer_or_rag(request, session_id)
         else:
-            result = await rag_service.answer_rule_question(request.game_name, request.question)
+            result = await rag_service.answer_rule_question(request.game_name, request.question, session_id=session_id)
         
         return APIResponse(
             status="success",
-            data={"answer": result},
+            data={"answer": result, "session_id": session_id},
             message="룰 설명이 완료되었습니다."
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"룰 설명 오류: {str(e)}")
         raise HTTPException(status_code=500, detail=f"룰 설명 중 오류가 발생했습니다: {str(e)}")
 
+async def _finetuning_answer_or_rag(request, session_id):
+    """파인튜닝 모델 답변. is_busy() 확인 이후 대기열이 가득 차 제출이 거부되면 RAG로 대체"""
+    game_name = rag_service.resolve_game_name(request.game_name) or request.game_name
+    try:
+        return await finetuning_service.answer_question(game_name, request.question, max_new_tokens=request.max_new_tokens)
+    except GenerationQueueFull:
+        FALLBACKS.inc(kind="finetuning_busy_to_rag")
+        return await rag_service.answer_rule_question(request.game_name, request.question, session_id=session_id)
+
+async def _finetuning_stream_or_rag(request, session_id):
+    """파인튜닝 모델 답변 스트리밍. 대기열이 가득 차 거부되면 (첫 조각 전이므로) RAG 스트리밍으로 대체"""
+    game_name = rag_service.resolve_game_name(request.game_name) or request.game_name
+    try:
+        async for text in finetuning_service.stream_answer(game_name, request.question, max_new_tokens=request.max_new_tokens):
+            yield text
+    except GenerationQueueFull:
+        FALLBACKS.inc(kind="finetuning_busy_to_rag")
+        async for text in rag_service.stream_rule_answer(request.game_name, request.question, session_id=session_id):
+            yield text
+
+async def _finetuning_batch(items, session_ids):
+    """chat_type="finetuning" 항목은 생성 스케줄러가 함께 배치 처리하도록 동시에 제출 (대기열이 차면 항목별로 RAG)"""
+    async def answer(item, session_id):
+        return {"answer": await _finetuning_answer_or_rag(item, session_id)}
+    
+    results = await asyncio.gather(*(answer(item, session_id) for item, session_id in zip(items, session_ids)), return_exceptions=True)
+    return [
+        {"status": "error", "message": str(result)} if isinstance(result, Exception) else {"status": "success", **result}
+        for result in results
+    ]
+
+@app.post("/explain-rules/batch", response_model=APIResponse)
+async def explain_rules_batch(request: BatchRuleQuestionRequest):
+    """룰 설명 배치 API (질문 임베딩/게임별 검색은 한 번에, LLM 호출은 BATCH_LLM_CONCURRENCY까지 동시에). 결과와 오류는 항목별로 반환"""
+    if not services_initialized:
+        raise HTTPException(status_code=503, detail="서비스가 아직 초기화되지 않았습니다.")
+    _check_batch(request.items)
+    
+    logger.info(f"룰 질문 배치 요청: {len(request.items)}개")
+    session_ids = [_session_id(item) for item in request.items]
+    finetuning = [i for i, item in enumerate(request.items) if _use_finetuning(item)]
+    rag = sorted(set(range(len(request.items))) - set(finetuning))
+    
+    try:
+        finetuning_results, rag_results = await asyncio.gather(
+            _finetuning_batch([request.items[i] for i in finetuning], [session_ids[i] for i in finetuning]),
+            rag_service.answer_rule_questions_batch(
+                [(request.items[i].game_name, request.items[i].question, session_ids[i]) for i in rag]
+            ) if rag else asyncio.sleep(0, result=[])
+        )
+    except Exception as e:
+        logger.error(f"룰 설명 배치 오류: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"룰 설명 중 오류가 발생했습니다: {str(e)}")
+    
+    results = [None] * len(request.items)
+    for i, result in zip(finetuning + rag, finetuning_results + rag_results):
+        results[i] = result
+    return _batch_response(results, session_ids, "룰 설명")
+
 @app.post("/rule-summary", response_model=APIResponse)
 async def get_rule_summary(request: GameRuleSummaryRequest):
     """게임 룰 요약 API"""
@@ -151,21 +455,82 @@ async def get_rule_summary(request: GameRuleSummaryRequest):
         logger.info(f"룰 요약 요청: {request.game_name}")
         
         # RAG 서비스 호출
-        result = await rag_service.get_rule_summary(request.game_name, request.chat_type)
+        session_id = _session_id(request)
+        result = await rag_service.get_rule_summary(request.game_name, session_id=session_id)
         
         return APIResponse(
             status="success",
-            data={"summary": result},
+            data={"summary": result, "session_id": session_id},
             message="룰 요약이 완료되었습니다."
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"룰 요약 오류: {str(e)}")
         raise HTTPException(status_code=500, detail=f"룰 요약 중 오류가 발생했습니다: {str(e)}")
 
+async def _sse_events(text_stream, session_id):
+    """텍스트 토큰 스트림을 server-sent events 형식으로 변환 (첫 이벤트로 대화를 이어갈 session_id를 보냄)"""
+    yield f"event: session\ndata: {json.dumps({'session_id': session_id})}\n\n"
+    try:
+        async for text in text_stream:
+            yield f"data: {json.dumps({'token': text}, ensure_ascii=False)}\n\n"
+        yield "event: done\ndata: {}\n\n"
+    except Exception as e:
+        logger.error(f"스트리밍 오류: {str(e)}")
+        yield f"event: error\ndata: {json.dumps({'message': str(e)}, ensure_ascii=False)}\n\n"
+
+def _sse_response(text_stream, session_id):
+    return StreamingResponse(
+        _sse_events(text_stream, session_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", "X-Session-Id": session_id}
+    )
+
+@app.post("/recommend/stream")
+async def recommend_games_stream(request: GameRecommendationRequest):
+    """게임 추천 스트리밍 API (SSE)"""
+    if not services_initialized:
+        raise HTTPException(status_code=503, detail="서비스가 아직 초기화되지 않았습니다.")
+    
+    logger.info(f"게임 추천 스트리밍 요청: {request.query}")
+    session_id = _session_id(request)
+    return _sse_response(
+        rag_service.stream_recommendation(request.query, session_id=session_id, top_k=request.top_k), session_id
+    )
+
+@app.post("/explain-rules/stream")
+async def explain_rules_stream(request: RuleQuestionRequest):
+    """룰 설명 스트리밍 API (SSE)"""
+    if not services_initialized:
+        raise HTTPException(status_code=503, detail="서비스가 아직 초기화되지 않았습니다.")
+    
+    logger.info(f"룰 질문 스트리밍: {request.game_name} - {request.question}")
+    session_id = _session_id(request)
+    if _use_finetuning(request):
+        return _sse_response(_finetuning_stream_or_rag(request, session_id), session_id)
+    
+    return _sse_response(
+        rag_service.stream_rule_answer(request.game_name, request.question, session_id=session_id), session_id
+    )
+
+@app.post("/rule-summary/stream")
+async def get_rule_summary_stream(request: GameRuleSummaryRequest):
+    """게임 룰 요약 스트리밍 API (SSE)"""
+    if not services_initialized:
+        raise HTTPException(status_code=503, detail="서비스가 아직 초기화되지 않았습니다.")
+    
+    logger.info(f"룰 요약 스트리밍 요청: {request.game_name}")
+    session_id = _session_id(request)
+    return _sse_response(rag_service.stream_rule_summary(request.game_name, session_id=session_id), session_id)
+
 @app.get("/games")
 async def get_available_games():
     """사용 가능한 게임 목록 API"""
+    if not services_initialized:
+        raise HTTPException(status_code=503, detail="서비스가 아직 초기화되지 않았습니다.")
+    
     try:
         # 게임 목록 로드
         games = rag_service.get_available_games()
@@ -180,6 +545,24 @@ async def get_available_games():
         logger.error(f"게임 목록 조회 오류: {str(e)}")
         raise HTTPException(status_code=500, detail=f"게임 목록 조회 중 오류가 발생했습니다: {str(e)}")
 
+@app.get("/similar/{game_name}", response_model=APIResponse)
+async def get_similar_games(game_name: str, limit: int = Query(10, ge=1, le=50)):
+    """비슷한 게임 API (미리 계산한 이웃 테이블 조회, LLM 호출 없음)"""
+    if not services_initialized:
+        raise HTTPException(status_code=503, detail="서비스가 아직 초기화되지 않았습니다.")
+    if not rag_service.similar_games:
+        raise HTTPException(status_code=503, detail="비슷한 게임 테이블이 준비되지 않았습니다.")
+    
+    result = rag_service.find_similar_games(game_name, limit=limit)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"'{game_name}' 게임을 찾을 수 없습니다." + rag_service.did_you_mean(game_name))
+    
+    return APIResponse(
+        status="success",
+        data=result,
+        message=f"'{result['game_name']}'와 비슷한 게임 {len(result['similar'])}개를 찾았습니다."
+    )
+
 @app.get("/")
 async def root():
     """루트 엔드포인트"""
@@ -189,10 +572,17 @@ async def root():
         "status": "running",
         "endpoints": {
             "health": "/health",
+            "metrics": "/metrics",
             "recommend": "/recommend",
+            "recommend_stream": "/recommend/stream",
+            "recommend_batch": "/recommend/batch",
             "explain_rules": "/explain-rules",
+            "explain_rules_stream": "/explain-rules/stream",
+            "explain_rules_batch": "/explain-rules/batch",
             "rule_summary": "/rule-summary",
-            "games": "/games"
+            "rule_summary_stream": "/rule-summary/stream",
+            "games": "/games",
+            "similar": "/similar/{game_name}"
         }
     }
 
@@ -217,5 +607,6 @@ if __name__ == "__main__":
         port=port,
         reload=False,  # 프로덕션에서는 reload=False
         log_level="info",
-        access_log=True
+        access_log=True,
+        workers=worker_count()  # 2 이상이면 인덱스는 mmap, 세션/캐시는 공유 SQLite 사용 (services/shared_state.py)
     )
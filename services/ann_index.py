@@ -0,0 +1,231 @@
+"""
+추천 인덱스 타입 (정확/근사/압축) 생성·로드와 recall-지연시간 벤치마크
+
+지원 타입:
+    flat   IndexFlatIP (정확 검색, 기준)
+    hnsw   IndexHNSWFlat     (M, ef_construction, ef_search)
+    ivfpq  IndexIVFPQ        (nlist, m, nbits, nprobe)
+    fp16   IndexScalarQuantizer fp16 (메모리 절반, 정확도 거의 동일)
+    pca    PCA 차원 축소 + IndexFlatIP (dim)
+
+사용법:
+    python -m services.ann_index benchmark --k 10 --synthetic 20000
+"""
+
+import os
+import json
+import time
+import argparse
+import logging
+
+import faiss
+import numpy as np
+
+from services.shared_state import read_index
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "hnsw", "ivfpq", "fp16", "pca")
+
+DEFAULT_PARAMS = {
+    "flat": {},
+    "hnsw": {"M": 32, "ef_construction": 200, "ef_search": 64},
+    "ivfpq": {"nlist": 256, "m": 64, "nbits": 8, "nprobe": 16},
+    "fp16": {},
+    "pca": {"dim": 256}
+}
+
+
+def build_index(vectors, index_type="flat", params=None):
+    """정규화된 float32 벡터로 지정한 타입의 내적(IP) 인덱스 생성. 반환: (index, 실제 사용한 params)"""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"지원하지 않는 인덱스 타입입니다: {index_type} (가능: {', '.join(INDEX_TYPES)})")
+
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    n, d = vectors.shape
+    params = {**DEFAULT_PARAMS[index_type], **(params or {})}
+
+    if index_type == "flat":
+        index = faiss.IndexFlatIP(d)
+
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(d, params["M"], faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = params["ef_construction"]
+
+    elif index_type == "ivfpq":
+        # 학습 데이터가 적으면 클러스터 수와 코드 비트를 줄여야 학습이 가능
+        params["nlist"] = max(1, min(params["nlist"], n // 39))
+        params["nbits"] = max(1, min(params["nbits"], int(np.log2(max(n, 2)))))
+        if d % params["m"] != 0:
+            raise ValueError(f"PQ 서브벡터 수 m={params['m']}은 차원 {d}의 약수여야 합니다.")
+        quantizer = faiss.IndexFlatIP(d)
+        index = faiss.IndexIVFPQ(quantizer, d, params["nlist"], params["m"], params["nbits"], faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+
+    elif index_type == "fp16":
+        index = faiss.IndexScalarQuantizer(d, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+
+    elif index_type == "pca":
+        params["dim"] = min(params["dim"], d, n)
+        pca = faiss.PCAMatrix(d, params["dim"])
+        index = faiss.IndexPreTransform(pca, faiss.IndexFlatIP(params["dim"]))
+        index.train(vectors)
+
+    index.add(vectors)
+    configure_search(index, index_type, params)
+    return index, params
+
+
+def configure_search(index, index_type, params):
+    """검색 시점 파라미터 적용 (파일에 저장되지 않는 값)"""
+    if index_type == "hnsw":
+        index.hnsw.efSearch = params.get("ef_search", DEFAULT_PARAMS["hnsw"]["ef_search"])
+    elif index_type == "ivfpq":
+        faiss.extract_index_ivf(index).nprobe = params.get("nprobe", DEFAULT_PARAMS["ivfpq"]["nprobe"])
+
+
+def load_index(index_path, spec=None, io_flags=None):
+    """매니페스트의 인덱스 스펙({"index_type", "index_params"})에 맞춰 로드하고 검색 파라미터 적용
+    (io_flags가 None이면 FAISS_MMAP 설정을 따름)"""
+    index = read_index(index_path, io_flags)
+    spec = spec or {}
+    index_type = spec.get("index_type", "flat")
+    configure_search(index, index_type, spec.get("index_params", {}))
+    logger.info(f"✅ 추천 인덱스 로드: {index_type} (벡터 {index.ntotal}개)")
+    return index
+
+
+def _selector_params(index, selector):
+    """인덱스 타입에 맞는 SearchParameters (검색 파라미터는 인덱스에 설정된 값을 유지)"""
+    if isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW()
+        params.efSearch = index.hnsw.efSearch
+    elif isinstance(index, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF()
+        params.nprobe = index.nprobe
+    else:
+        params = faiss.SearchParameters()
+    params.sel = selector
+    return params
+
+
+def search_subset(index, queries, k, mask):
+    """
+    mask(bool, 인덱스 행 수)가 True인 행 안에서만 top-k 검색.
+    IDSelectorBitmap을 지원하지 않는 인덱스(PCA 등)는 전체를 검색한 뒤 마스크로 거름
+    """
+    queries = np.ascontiguousarray(queries, dtype="float32")
+    k = max(1, min(k, int(np.count_nonzero(mask))))
+    bitmap = np.packbits(mask, bitorder="little")
+    try:
+        selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+        return index.search(queries, k, params=_selector_params(index, selector))
+    except (AttributeError, RuntimeError, TypeError):
+        D, I = index.search(queries, index.ntotal)
+        keep = (I >= 0) & mask[np.clip(I, 0, len(mask) - 1)]
+        order = np.argsort(~keep, axis=1, kind="stable")[:, :k]
+        D, I = np.take_along_axis(D, order, axis=1), np.take_along_axis(I, order, axis=1)
+        I[~np.take_along_axis(keep, order, axis=1)] = -1
+        return D, I
+
+
+def _index_bytes(index):
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def _rss_bytes():
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss
+    except ImportError:
+        return None
+
+
+def run_benchmark(vectors, index_types=INDEX_TYPES, k=10, num_queries=200, params=None, seed=0):
+    """
+    각 인덱스 타입에 대해 flat(정확 검색) 대비 recall@k, 쿼리당 지연시간, 메모리 사용량 측정.
+    쿼리는 코퍼스 벡터에 노이즈를 더해 만든 근접 쿼리를 사용합니다 (모델 없이 CPU에서 실행 가능).
+    """
+    rng = np.random.default_rng(seed)
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    picked = vectors[rng.integers(0, len(vectors), size=num_queries)]
+    queries = picked + rng.normal(scale=0.05, size=picked.shape).astype("float32")
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    exact, _ = build_index(vectors, "flat")
+    _, truth = exact.search(queries, k)
+
+    results = []
+    for index_type in index_types:
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        index, used_params = build_index(vectors, index_type, (params or {}).get(index_type))
+        build_seconds = time.perf_counter() - start
+        rss_after = _rss_bytes()
+
+        latencies = []
+        found = np.empty_like(truth)
+        for i in range(num_queries):
+            t0 = time.perf_counter()
+            _, ids = index.search(queries[i:i + 1], k)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            found[i] = ids[0]
+
+        recall = np.mean([len(set(t) & set(f)) / k for t, f in zip(truth, found)])
+        results.append({
+            "index_type": index_type,
+            "params": used_params,
+            f"recall@{k}": round(float(recall), 4),
+            "latency_ms_p50": round(float(np.percentile(latencies, 50)), 4),
+            "latency_ms_p95": round(float(np.percentile(latencies, 95)), 4),
+            "build_seconds": round(build_seconds, 3),
+            "index_bytes": _index_bytes(index),
+            "rss_delta_bytes": (rss_after - rss_before) if rss_before is not None else None
+        })
+        del index
+
+    return {"num_vectors": len(vectors), "dim": vectors.shape[1], "k": k, "num_queries": num_queries, "results": results}
+
+
+def load_corpus_vectors(vectors_path="data/game_vectors.npy", index_path="data/game_index.faiss"):
+    """정확한 코퍼스 벡터 로드 (빌드 시 저장한 .npy, 없으면 flat 인덱스에서 복원)"""
+    if os.path.exists(vectors_path):
+        return np.load(vectors_path)
+    index = faiss.read_index(index_path)
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="추천 인덱스 벤치마크")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    bench_parser = subparsers.add_parser("benchmark", help="인덱스 타입별 recall@k / 지연시간 / 메모리 비교")
+    bench_parser.add_argument("--k", type=int, default=10)
+    bench_parser.add_argument("--queries", type=int, default=200)
+    bench_parser.add_argument("--types", default=",".join(INDEX_TYPES))
+    bench_parser.add_argument("--synthetic", type=int, default=0,
+                              help="코퍼스를 노이즈 복제해 N개로 늘려 카탈로그 확장 상황을 측정")
+    bench_parser.add_argument("--params", default="{}", help='타입별 파라미터 JSON, 예: \'{"hnsw": {"M": 16}}\'')
+    bench_parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    vectors = load_corpus_vectors()
+    if args.synthetic > len(vectors):
+        rng = np.random.default_rng(1)
+        extra = vectors[rng.integers(0, len(vectors), size=args.synthetic - len(vectors))]
+        extra = extra + rng.normal(scale=0.1, size=extra.shape).astype("float32")
+        extra /= np.linalg.norm(extra, axis=1, keepdims=True)
+        vectors = np.vstack([vectors, extra])
+
+    report = run_benchmark(vectors, args.types.split(","), k=args.k, num_queries=args.queries,
+                           params=json.loads(args.params))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
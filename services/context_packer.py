@@ -0,0 +1,124 @@
+import re
+import logging
+
+from services.tokens import count_tokens, truncate_tokens
+
+logger = logging.getLogger(__name__)
+
+# 문장 끝(. ! ? 。 뒤 공백) 또는 줄바꿈에서 자름. 구분 공백은 앞 문장에 붙여 원문 형식을 보존
+_SENTENCE_END = re.compile(r"(?<=[.!?。])\s+|\n+")
+
+# 남은 예산이 이보다 작으면 블록을 잘라 넣지 않음 (의미 없는 조각 방지)
+MIN_BLOCK_TOKENS = 32
+
+
+def split_sentences(text):
+    """문장 단위로 분할. "".join(결과) == text"""
+    sentences = []
+    start = 0
+    for match in _SENTENCE_END.finditer(text):
+        sentences.append(text[start:match.end()])
+        start = match.end()
+    if start < len(text):
+        sentences.append(text[start:])
+    return sentences
+
+
+def _sentence_key(sentence):
+    return " ".join(sentence.split())
+
+
+def truncate_to_budget(sentences, token_budget):
+    """앞에서부터 예산 안에 들어가는 문장만 남김. 반환: (남긴 문장 목록, 토큰 수)
+
+    첫 문장부터 예산을 넘으면 그 문장을 토큰 단위로 자름.
+    """
+    kept = []
+    used = 0
+    for sentence in sentences:
+        tokens = count_tokens(sentence)
+        if used + tokens > token_budget:
+            if not kept:
+                return [truncate_tokens(sentence, token_budget)], token_budget
+            break
+        kept.append(sentence)
+        used += tokens
+    return kept, used
+
+
+def pack_blocks(blocks, token_budget, separator="\n\n", block_budget=None):
+    """
+    검색 결과 블록을 점수 순으로 토큰 예산까지 채움. 반환: 들어간 블록 문자열 목록 (점수 순)
+
+    blocks: [{"text", "score", "title"(선택)}]. title이 있으면 "[title]\\n본문" 형식.
+    - 이미 들어간 문장과 같은 문장은 제거 (청크 간 겹치는 구간, 같은 게임의 중복 항목)
+    - 예산을 넘는 마지막 블록은 문장 경계에서 잘라 넣음
+    - block_budget을 주면 블록 하나(제목, 구분자 포함)도 그 안에서 잘라 앞 블록이 예산을 독차지하지 않음
+    """
+    seen = set()
+    packed = []
+    used = 0
+    separator_tokens = count_tokens(separator)
+
+    for block in sorted(blocks, key=lambda b: b.get("score", 0.0), reverse=True):
+        sentences = []
+        for sentence in split_sentences(block["text"]):
+            key = _sentence_key(sentence)
+            if key and key in seen:
+                continue
+            sentences.append(sentence)
+        if not any(_sentence_key(s) for s in sentences):
+            continue
+
+        header = f"[{block['title']}]\n" if block.get("title") else ""
+        overhead = count_tokens(header) + (separator_tokens if packed else 0)
+        remaining = token_budget - used
+        if block_budget:
+            remaining = min(remaining, block_budget)
+        remaining -= overhead
+        if remaining < MIN_BLOCK_TOKENS:
+            break
+
+        kept, body_tokens = truncate_to_budget(sentences, remaining)
+        body = "".join(kept).strip()
+        if not body:
+            continue
+        packed.append(header + body)
+        used += overhead + body_tokens
+        seen.update(_sentence_key(s) for s in kept)
+
+    logger.debug(f"컨텍스트 패킹: 블록 {len(packed)}/{len(blocks)}개, 약 {used}/{token_budget} 토큰")
+    return packed
+
+
+def pack_context(blocks, token_budget, separator="\n\n", block_budget=None):
+    """pack_blocks 결과를 하나의 컨텍스트 문자열로 합침"""
+    return separator.join(pack_blocks(blocks, token_budget, separator, block_budget))
+
+
+def split_into_windows(texts, max_tokens):
+    """여러 텍스트를 문장 경계 기준 max_tokens 이하의 구간으로 나눔 (중복 문장 제거, 순서 유지)"""
+    windows = []
+    current = []
+    used = 0
+    seen = set()
+
+    for text in texts:
+        for sentence in split_sentences(text):
+            key = _sentence_key(sentence)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+
+            tokens = count_tokens(sentence)
+            if tokens > max_tokens:
+                sentence, tokens = truncate_tokens(sentence, max_tokens), max_tokens
+            if current and used + tokens > max_tokens:
+                windows.append("".join(current).strip())
+                current, used = [], 0
+            current.append(sentence if sentence[-1:].isspace() else sentence + "\n")
+            used += tokens
+
+    if current:
+        windows.append("".join(current).strip())
+    return windows
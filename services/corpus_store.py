@@ -0,0 +1,296 @@
+"""
+게임 코퍼스 바이너리 저장소 (game.json / texts.json / game_names.json / chunked_game_rules.json / 게임별 청크 JSON 대체)
+
+파일 형식 (little-endian):
+    header  magic(8) "BOVICORP" | version(uint32) | n_rules(uint32) | n_games(uint64) | n_spans(uint64) | blob_size(uint64)
+    games   n_games × GAME_DTYPE        — 필드 값은 spans 행 번호, chunk_start/chunk_end는 그 게임 룰 청크의 spans 행 범위
+    rules   n_rules × RULE_DTYPE        — 룰 인덱스 키(chunked_game_rules.json 키, 공백→'_') → 청크 spans 행 범위
+    spans   n_spans × (start, end) uint64 — blob 안의 UTF-8 바이트 구간
+    blob    UTF-8 바이트
+
+같은 문자열(texts.json과 game.json의 text 등)은 blob에 한 번만 저장하고, 룰 청크가 게임 룰 텍스트의 일부이면
+따로 저장하지 않고 텍스트 안의 바이트 구간을 가리킵니다. 파일은 mmap으로 열고, 조회할 때 해당 구간만 디코딩합니다.
+texts / game_names / game_data / 게임별 청크는 모두 이 저장소 위의 읽기 전용 뷰입니다.
+
+사용법:
+    python -m services.corpus_store build    # data/corpus.bin 생성 (index_builder build도 함께 갱신)
+    python -m services.corpus_store stats
+"""
+
+import os
+import json
+import mmap
+import struct
+import argparse
+import logging
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CORPUS_PATH = os.path.join("data", "corpus.bin")
+MAGIC = b"BOVICORP"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<8sIIQQQ")
+
+GAME_FIELDS = ("id", "game_name", "section", "text", "players")
+GAME_DTYPE = np.dtype([(field, "<u4") for field in GAME_FIELDS] + [("chunk_start", "<u4"), ("chunk_end", "<u4")])
+RULE_DTYPE = np.dtype([("key", "<u4"), ("chunk_start", "<u4"), ("chunk_end", "<u4")])
+
+
+def _rule_key(game_name):
+    """게임별 룰 인덱스 파일 이름 (공백→'_')"""
+    return game_name.replace(" ", "_")
+
+
+class _BlobWriter:
+    """blob과 spans 테이블을 만들면서 같은 문자열은 한 번만 저장"""
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+        self.spans = []
+        self._ranges = {}  # text -> (start, end)
+        self._rows = {}    # text -> spans 행 번호 (게임 필드 재사용용)
+
+    def _range(self, text):
+        byte_range = self._ranges.get(text)
+        if byte_range is None:
+            data = text.encode("utf-8")
+            byte_range = self._ranges[text] = (self.size, self.size + len(data))
+            self.parts.append(data)
+            self.size += len(data)
+        return byte_range
+
+    def add(self, text):
+        """문자열의 spans 행 번호 (같은 문자열이면 같은 행)"""
+        row = self._rows.get(text)
+        if row is None:
+            row = self._rows[text] = len(self.spans)
+            self.spans.append(self._range(text))
+        return row
+
+    def add_within(self, text, parent):
+        """새 spans 행 추가. parent 문자열 안에 있으면 그 바이트 구간을 가리킴 (청크가 연속된 행이 되도록 항상 새 행)"""
+        idx = parent.find(text) if parent else -1
+        if idx == -1:
+            self.spans.append(self._range(text))
+        else:
+            start = self._range(parent)[0] + len(parent[:idx].encode("utf-8"))
+            self.spans.append((start, start + len(text.encode("utf-8"))))
+        return len(self.spans) - 1
+
+
+def write_corpus(path, game_data, chunked_rules):
+    """
+    game.json 항목 목록(순서 = 추천 인덱스 벡터 순서)과 chunked_game_rules.json으로 저장소 파일 기록.
+    룰 청크는 인덱스 빌드와 같게 빈 청크를 제외하고, 같은 이름의 게임 항목은 같은 청크 범위를 공유합니다.
+    """
+    writer = _BlobWriter()
+    texts_by_name = {}
+    for game in game_data:
+        texts_by_name.setdefault(game.get("game_name", ""), game.get("text", ""))
+
+    # 룰 청크를 먼저 기록해 게임마다 연속된 spans 행 범위를 얻음 (키는 인덱스 빌드와 같은 chunked_game_rules.json 키)
+    rule_ranges = {}     # 룰 인덱스 키 -> 범위
+    ranges_by_name = {}  # game.json 게임 이름 -> 범위
+    for name in sorted(chunked_rules):
+        entry = chunked_rules[name]
+        game_name = entry.get("game_name", name)
+        chunks = [chunk for chunk in entry.get("chunks", []) if chunk.strip()]
+        if not chunks:
+            continue
+        parent = texts_by_name.get(game_name) or texts_by_name.get(name, "")
+        start = len(writer.spans)
+        for chunk in chunks:
+            writer.add_within(chunk, parent)
+        rule_ranges[_rule_key(name)] = (start, len(writer.spans))
+        ranges_by_name.setdefault(game_name, rule_ranges[_rule_key(name)])
+        ranges_by_name.setdefault(name, rule_ranges[_rule_key(name)])
+
+    games = np.zeros(len(game_data), dtype=GAME_DTYPE)
+    for row, game in enumerate(game_data):
+        for field in GAME_FIELDS:
+            games[field][row] = writer.add(str(game.get(field, "") or ""))
+        games["chunk_start"][row], games["chunk_end"][row] = ranges_by_name.get(game.get("game_name", ""), (0, 0))
+
+    rules = np.zeros(len(rule_ranges), dtype=RULE_DTYPE)
+    for row, (key, (start, end)) in enumerate(rule_ranges.items()):
+        rules[row] = (writer.add(key), start, end)
+
+    tables = games.tobytes() + rules.tobytes()
+    padding = b"\0" * (-(_HEADER.size + len(tables)) % 8)  # spans(uint64) 8바이트 정렬
+    spans = np.asarray(writer.spans, dtype="<u8").reshape(-1, 2)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(rules), len(games), len(spans), writer.size))
+        f.write(tables)
+        f.write(padding)
+        f.write(spans.tobytes())
+        for data in writer.parts:
+            f.write(data)
+    os.replace(tmp_path, path)
+
+    logger.info(f"✅ 코퍼스 저장소 저장: 게임 {len(games)}개, 룰 청크 게임 {len(rules)}개, "
+                f"blob {writer.size / 1024:.0f}KB → {path}")
+
+
+class _SpanView(Sequence):
+    """spans 행 범위를 문자열 목록처럼 보여주는 뷰 (조회할 때만 디코딩)"""
+
+    def __init__(self, store, rows):
+        self._store = store
+        self._rows = rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._store.string(row) for row in self._rows[i]]
+        return self._store.string(self._rows[i])
+
+
+class GameRecord(Mapping):
+    """game.json 항목 하나의 읽기 전용 뷰 (dict처럼 game["text"], game.get("players"))"""
+
+    def __init__(self, store, row):
+        self._store = store
+        self._row = row
+
+    def __getitem__(self, field):
+        if field not in GAME_FIELDS:
+            raise KeyError(field)
+        return self._store.string(int(self._store.games[field][self._row]))
+
+    def __iter__(self):
+        return iter(GAME_FIELDS)
+
+    def __len__(self):
+        return len(GAME_FIELDS)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class _GameList(Sequence):
+    def __init__(self, store):
+        self._store = store
+
+    def __len__(self):
+        return len(self._store.games)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [GameRecord(self._store, row) for row in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return GameRecord(self._store, i)
+
+
+class CorpusStore:
+    """mmap으로 연 코퍼스 저장소"""
+
+    def __init__(self, path=CORPUS_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, n_rules, n_games, n_spans, blob_size = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"코퍼스 저장소 파일이 아닙니다: {path}")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 코퍼스 저장소 버전: {version} (필요: {FORMAT_VERSION}), 다시 빌드하세요.")
+
+        offset = _HEADER.size
+        self.games = np.frombuffer(self._mmap, dtype=GAME_DTYPE, count=n_games, offset=offset)
+        offset += self.games.nbytes
+        self.rules = np.frombuffer(self._mmap, dtype=RULE_DTYPE, count=n_rules, offset=offset)
+        offset += self.rules.nbytes
+        offset += -offset % 8
+        self.spans = np.frombuffer(self._mmap, dtype="<u8", count=n_spans * 2, offset=offset).reshape(-1, 2)
+        self._blob = memoryview(self._mmap)[offset + self.spans.nbytes:offset + self.spans.nbytes + blob_size]
+
+        self.texts = _SpanView(self, self.games["text"])
+        self.game_names = _SpanView(self, self.games["game_name"])
+        self.game_data = _GameList(self)
+
+        # 룰 인덱스 키 → 청크 spans 범위. 게임 이름(공백→'_')으로도 찾을 수 있게 게임 테이블 범위를 추가
+        self._chunk_ranges = {
+            self.string(key): (int(start), int(end)) for key, start, end in self.rules.tolist()
+        }
+        self._rule_keys = set(self._chunk_ranges)
+        for name, start, end in zip(self.game_names, self.games["chunk_start"].tolist(), self.games["chunk_end"].tolist()):
+            if end > start:
+                self._chunk_ranges.setdefault(_rule_key(name), (start, end))
+
+    def string(self, row):
+        start, end = self.spans[row]
+        return str(self._blob[start:end], "utf-8")
+
+    def chunks(self, game_name):
+        """게임 룰 청크 뷰 (게임 이름 또는 룰 인덱스 키). 없으면 None"""
+        chunk_range = self._chunk_ranges.get(_rule_key(game_name))
+        if chunk_range is None:
+            return None
+        return _SpanView(self, range(*chunk_range))
+
+    def rule_keys(self):
+        """룰 인덱스 키 (게임별 .faiss 파일 이름과 같음)"""
+        return set(self._rule_keys)
+
+    def get_stats(self):
+        return {
+            "path": self.path,
+            "games": len(self.games),
+            "rule_games": len(self.rules),
+            "spans": len(self.spans),
+            "blob_bytes": len(self._blob),
+            "file_bytes": len(self._mmap)
+        }
+
+
+def open_corpus(path=None):
+    """CORPUS_STORE_PATH(기본 data/corpus.bin)가 있으면 CorpusStore, 없거나 읽을 수 없으면 None (JSON 파일 사용)"""
+    path = path or os.getenv("CORPUS_STORE_PATH", CORPUS_PATH)
+    if not os.path.exists(path):
+        return None
+    try:
+        return CorpusStore(path)
+    except Exception as e:
+        logger.warning(f"⚠️ 코퍼스 저장소를 열 수 없어 JSON 파일을 사용합니다 ({path}): {str(e)}")
+        return None
+
+
+def build_corpus(game_json_path="data/game.json", chunked_rules_path="data/chunked_game_rules.json", path=CORPUS_PATH):
+    with open(game_json_path, "r", encoding="utf-8") as f:
+        game_data = json.load(f)
+    chunked_rules = {}
+    if os.path.exists(chunked_rules_path):
+        with open(chunked_rules_path, "r", encoding="utf-8") as f:
+            chunked_rules = json.load(f)
+    write_corpus(path, game_data, chunked_rules)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="게임 코퍼스 바이너리 저장소")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="game.json / chunked_game_rules.json에서 저장소 생성")
+    build_parser.add_argument("--output", default=CORPUS_PATH)
+    stats_parser = subparsers.add_parser("stats", help="저장소 크기/항목 수 출력")
+    stats_parser.add_argument("--path", default=CORPUS_PATH)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_corpus(path=args.output)
+    elif args.command == "stats":
+        print(json.dumps(CorpusStore(args.path).get_stats(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+임베딩 모델 백엔드 (디바이스 자동 감지, CPU int8 동적 양자화, 스레드/시퀀스 길이 설정)
+
+환경변수:
+    EMBED_DEVICE          auto | cuda | cpu  (기본 auto: CUDA가 있으면 cuda)
+    EMBED_QUANTIZE        auto | int8 | none (기본 auto: cpu일 때만 int8)
+    EMBED_NUM_THREADS     CPU intra-op 스레드 수 (기본: torch 기본값)
+    EMBED_MAX_SEQ_LENGTH  최대 토큰 길이 (짧은 쿼리용, 기본 512)
+
+양자화 후에도 추천 결과가 같은지 확인:
+    python -m services.embedding_backend parity --k 5
+"""
+
+import os
+import sys
+import json
+import argparse
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+PARITY_QUERIES = [
+    "2명이서 할 만한 게임",
+    "가족끼리 할 수 있는 쉬운 보드게임",
+    "파티에서 많은 인원이 즐길 수 있는 게임",
+    "전략적인 보드게임 추천해줘",
+    "30분 안에 끝나는 가벼운 게임",
+    "추리 게임 좋아하는데 뭐가 있을까",
+    "협력해서 하는 게임",
+    "아이들과 함께 할 수 있는 순발력 게임",
+    "카드 게임 추천",
+    "블러핑이 중요한 게임",
+    "주사위를 굴리는 게임",
+    "단어나 말로 하는 게임"
+]
+
+
+def resolve_device(device=None):
+    """EMBED_DEVICE 또는 CUDA 사용 가능 여부로 디바이스 결정"""
+    import torch
+
+    device = (device or os.getenv("EMBED_DEVICE", "auto")).lower()
+    if device == "auto":
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    if device.startswith("cuda") and not torch.cuda.is_available():
+        logger.warning("⚠️ CUDA를 사용할 수 없어 CPU로 임베딩합니다.")
+        return "cpu"
+    return device
+
+
+def load_embedding_model(model_name="BAAI/bge-m3", device=None, quantize=None, num_threads=None, max_seq_length=None):
+    """
+    SentenceTransformer 로드 후 디바이스에 맞게 최적화.
+    반환: (model, info dict)
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    device = resolve_device(device)
+
+    if quantize is None:
+        quantize = os.getenv("EMBED_QUANTIZE", "auto").lower()
+    if quantize == "auto":
+        quantize = "int8" if device == "cpu" else "none"
+    if quantize == "int8" and device != "cpu":
+        logger.warning("⚠️ int8 동적 양자화는 CPU에서만 지원되어 적용하지 않습니다.")
+        quantize = "none"
+
+    if num_threads is None and os.getenv("EMBED_NUM_THREADS"):
+        num_threads = int(os.getenv("EMBED_NUM_THREADS"))
+    if device == "cpu" and num_threads:
+        torch.set_num_threads(num_threads)
+
+    model = SentenceTransformer(model_name, device=device)
+
+    if max_seq_length is None:
+        max_seq_length = int(os.getenv("EMBED_MAX_SEQ_LENGTH", "512"))
+    if max_seq_length:
+        model.max_seq_length = max_seq_length
+
+    if quantize == "int8":
+        # Linear 레이어 가중치를 int8로, 활성값은 실행 시 동적으로 양자화
+        torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+    info = {
+        "device": device,
+        "quantize": quantize,
+        "num_threads": torch.get_num_threads() if device == "cpu" else None,
+        "max_seq_length": model.max_seq_length
+    }
+    logger.info(f"✅ 임베딩 백엔드 준비: {model_name} {info}")
+    return model, info
+
+
+def run_parity_check(model_name="BAAI/bge-m3", index_path="data/game_index.faiss",
+                     names_path="data/game_names.json", k=5, queries=None):
+    """
+    fp32 기준 모델과 CPU int8 양자화 모델로 같은 쿼리를 검색해 top-k 게임이 얼마나 일치하는지 비교
+    """
+    import faiss
+
+    queries = queries or PARITY_QUERIES
+    index = faiss.read_index(index_path)
+    with open(names_path, "r", encoding="utf-8") as f:
+        game_names = json.load(f)
+
+    reference, _ = load_embedding_model(model_name, device="cpu", quantize="none")
+    quantized, _ = load_embedding_model(model_name, device="cpu", quantize="int8")
+
+    ref_vecs = np.asarray(reference.encode(queries, normalize_embeddings=True), dtype="float32")
+    q_vecs = np.asarray(quantized.encode(queries, normalize_embeddings=True), dtype="float32")
+
+    _, ref_ids = index.search(ref_vecs, k)
+    _, q_ids = index.search(q_vecs, k)
+
+    per_query = []
+    for query, ref_row, q_row, ref_vec, q_vec in zip(queries, ref_ids, q_ids, ref_vecs, q_vecs):
+        per_query.append({
+            "query": query,
+            "overlap": len(set(ref_row) & set(q_row)) / k,
+            "top1_match": bool(ref_row[0] == q_row[0]),
+            "cosine": float(ref_vec @ q_vec),
+            "reference": [game_names[i] for i in ref_row if 0 <= i < len(game_names)],
+            "quantized": [game_names[i] for i in q_row if 0 <= i < len(game_names)]
+        })
+
+    return {
+        "k": k,
+        "mean_overlap": float(np.mean([r["overlap"] for r in per_query])),
+        "top1_agreement": float(np.mean([r["top1_match"] for r in per_query])),
+        "mean_cosine": float(np.mean([r["cosine"] for r in per_query])),
+        "queries": per_query
+    }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="임베딩 백엔드 도구")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    parity_parser = subparsers.add_parser("parity", help="int8 양자화 모델의 top-k 검색 결과 일치도 확인")
+    parity_parser.add_argument("--k", type=int, default=5)
+    parity_parser.add_argument("--min-overlap", type=float, default=0.9, help="평균 top-k 일치율 하한 (미달 시 종료 코드 1)")
+    args = parser.parse_args()
+
+    if args.command == "parity":
+        report = run_parity_check(k=args.k)
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        if report["mean_overlap"] < args.min_overlap:
+            logger.error(f"❌ top-{args.k} 일치율 {report['mean_overlap']:.3f} < {args.min_overlap}")
+            sys.exit(1)
+        logger.info(f"✅ top-{args.k} 일치율 {report['mean_overlap']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
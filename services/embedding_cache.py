@@ -0,0 +1,142 @@
+import os
+import re
+import asyncio
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+from services.shared_state import is_multi_worker, shared_state_path, connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """캐시 키용 정규화: 유니코드 NFKC, 소문자, 공백 정리"""
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class EmbeddingCache:
+    """쿼리 임베딩 캐시 (메모리 LRU + 선택적 SQLite 영속 계층)
+
+    키는 (모델 ID, 정규화된 쿼리 텍스트)이므로 모델이 바뀌면 자동으로 분리됩니다.
+    멀티 워커에서는 EMBEDDING_CACHE_PATH가 없어도 SHARED_STATE_DIR/embeddings.sqlite를 함께 사용합니다.
+    비동기 호출(alookup_many/astore_many)은 메모리 적중만 이벤트 루프에서 처리하고,
+    SQLite 조회와 쓰기는 여러 텍스트를 한 번에 묶어 루프 밖의 스레드에서 실행합니다.
+    """
+
+    def __init__(self, model_id, max_entries=None, persist_path=None):
+        self.model_id = model_id
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+        if persist_path is None:
+            persist_path = os.getenv("EMBEDDING_CACHE_PATH", "") or \
+                (shared_state_path("embeddings.sqlite") if is_multi_worker() else "")
+
+        self._memory = OrderedDict()  # key -> np.ndarray
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if persist_path:
+            try:
+                self._db = connect_sqlite(persist_path)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, dim INTEGER, vector BLOB)"
+                )
+                self._db.commit()
+                logger.info(f"✅ 임베딩 영속 캐시 연결: {persist_path}")
+            except Exception as e:
+                logger.warning(f"⚠️ 임베딩 영속 캐시를 사용할 수 없습니다 (메모리 캐시만 사용): {str(e)}")
+                self._db = None
+
+    def _key(self, text):
+        raw = f"{self.model_id}\0{normalize_query(text)}"
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def _remember(self, key, vector):
+        """메모리 LRU에 저장 (lock 보유 상태에서 호출)"""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _memory_lookup(self, keys):
+        """메모리 LRU 조회. 반환: 키별 벡터 또는 None (없는 키의 miss는 아직 세지 않음)"""
+        with self._lock:
+            vectors = []
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                vectors.append(vector)
+            return vectors
+
+    def _disk_lookup(self, keys):
+        """메모리에 없는 키를 SQLite에서 한 번의 쿼리로 조회. 반환: {key: 벡터}"""
+        with self._lock:
+            found = {}
+            if self._db is not None:
+                placeholders = ",".join("?" * len(keys))
+                for key, dim, vector in self._db.execute(
+                    f"SELECT key, dim, vector FROM embeddings WHERE key IN ({placeholders})", keys
+                ).fetchall():
+                    found[key] = np.frombuffer(vector, dtype="float32").reshape(dim)
+                    self._remember(key, found[key])
+            self.disk_hits += len(found)
+            self.misses += len(keys) - len(found)
+            return found
+
+    def _store_many(self, keys, vectors):
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector)
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, dim, vector) VALUES (?, ?, ?)",
+                    [(key, vector.shape[0], vector.tobytes()) for key, vector in zip(keys, vectors)]
+                )
+                self._db.commit()
+
+    async def alookup_many(self, texts):
+        """texts별 캐시된 임베딩 또는 None. SQLite 조회는 이벤트 루프 밖에서 한 번에 실행"""
+        keys = [self._key(text) for text in texts]
+        vectors = self._memory_lookup(keys)
+        missing = list(dict.fromkeys(key for key, vector in zip(keys, vectors) if vector is None))
+        if missing:
+            if self._db is None:
+                found = self._disk_lookup(missing)
+            else:
+                found = await asyncio.to_thread(self._disk_lookup, missing)
+            vectors = [found.get(key) if vector is None else vector for key, vector in zip(keys, vectors)]
+        return vectors
+
+    async def astore_many(self, texts, vectors):
+        """여러 임베딩을 한 트랜잭션으로 저장. SQLite 쓰기는 이벤트 루프 밖에서 실행"""
+        keys = [self._key(text) for text in texts]
+        vectors = [np.ascontiguousarray(vector, dtype="float32") for vector in vectors]
+        if self._db is None:
+            self._store_many(keys, vectors)
+        else:
+            await asyncio.to_thread(self._store_many, keys, vectors)
+
+    def get_stats(self):
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        return {
+            "model_id": self.model_id,
+            "entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "persistent": self._db is not None,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / total, 4) if total else 0.0
+        }
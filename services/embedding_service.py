@@ -1,40 +1,159 @@
+import os
+import asyncio
 import logging
-from sentence_transformers import SentenceTransformer
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from services.embedding_cache import EmbeddingCache
+from services.embedding_backend import load_embedding_model
 
 logger = logging.getLogger(__name__)
 
 class EmbeddingService:
-    """임베딩 모델 서비스 (현재는 RAGService에 포함되어 있어 별도 사용하지 않음)"""
-    
-    def __init__(self):
+    """임베딩 모델 서비스 (RAGService가 공유해서 사용)
+
+    비동기 요청은 마이크로 배치로 묶어 이벤트 루프 밖의 전용 스레드에서 한 번에 인코딩합니다.
+    - EMBED_MAX_BATCH_SIZE: 한 배치에 묶을 최대 쿼리 수
+    - EMBED_MAX_WAIT_MS: 첫 쿼리 도착 후 배치를 채우기 위해 기다리는 최대 시간
+    """
+
+    def __init__(self, model_name="BAAI/bge-m3", max_batch_size=None, max_wait_ms=None):
         logger.info("🔧 임베딩 서비스를 초기화합니다...")
-        
+
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size or int(os.getenv("EMBED_MAX_BATCH_SIZE", "32"))
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else float(os.getenv("EMBED_MAX_WAIT_MS", "5"))) / 1000
+
+        # 인코딩 전용 단일 워커 스레드 (이벤트 루프를 막지 않도록)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embed")
+        self._queue = None
+        self._worker_task = None
+
+        self.batches = 0
+        self.batched_queries = 0
+        self.max_observed_batch = 0
+
         try:
-            # 임베딩 모델 로드
-            self.model = SentenceTransformer("BAAI/bge-m3", device="cuda")
+            # 임베딩 모델 로드 (디바이스 자동 감지, CPU에서는 int8 동적 양자화)
+            self.model, self.backend_info = load_embedding_model(model_name)
             logger.info("✅ 임베딩 모델 로드 완료")
-            
+
         except Exception as e:
             logger.error(f"❌ 임베딩 모델 로드 실패: {str(e)}")
             self.model = None
-    
+            self.backend_info = {}
+
+        # 쿼리 임베딩 캐시 (추천/룰 검색 공용). 양자화 여부에 따라 벡터가 달라지므로 키에 포함
+        self.cache = EmbeddingCache(f"{model_name}:{self.backend_info.get('quantize', 'none')}")
+
     def encode(self, texts, normalize=True):
         """텍스트를 임베딩으로 변환"""
         try:
             if not self.model:
                 raise Exception("임베딩 모델이 로드되지 않았습니다.")
-            
+
             embeddings = self.model.encode(texts, normalize_embeddings=normalize)
             return embeddings
-            
+
         except Exception as e:
             logger.error(f"❌ 임베딩 생성 실패: {str(e)}")
             return None
-    
+
+    def warmup(self):
+        """여러 배치 크기로 한 번씩 인코딩해 CUDA 커널/스레드 풀 초기화를 첫 요청 전에 끝냄 (캐시에는 넣지 않음)"""
+        if not self.model:
+            return
+        for batch_size in (1, min(8, self.max_batch_size)):
+            self._encode_batch(["보드게임 추천 워밍업 문장입니다."] * batch_size)
+
+    def _encode_batch(self, texts):
+        """워커 스레드에서 실행되는 배치 인코딩"""
+        if not self.model:
+            raise RuntimeError("임베딩 모델이 로드되지 않았습니다.")
+        vectors = self.model.encode(texts, batch_size=len(texts), normalize_embeddings=True)
+        return np.asarray(vectors, dtype="float32")
+
+    def _ensure_worker(self):
+        """현재 이벤트 루프에서 배치 워커를 (재)시작"""
+        if self._worker_task is None or self._worker_task.done():
+            self._queue = asyncio.Queue()
+            self._worker_task = asyncio.get_running_loop().create_task(self._batch_worker())
+
+    async def _batch_worker(self):
+        """큐에 쌓인 쿼리를 크기/시간 창 단위로 묶어 인코딩하고 각 future에 결과 전달"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                vectors = await loop.run_in_executor(self._executor, self._encode_batch, texts)
+            except Exception as e:
+                logger.error(f"❌ 배치 임베딩 실패: {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.batched_queries += len(batch)
+            self.max_observed_batch = max(self.max_observed_batch, len(batch))
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+    async def _submit(self, text):
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def aencode(self, texts):
+        """
+        비동기 임베딩: (len(texts), dim) float32 배열 반환.
+        캐시에 없는 텍스트만 배치 큐에 넣고, 동시 요청과 함께 한 번에 인코딩됩니다.
+        배치 요청처럼 캐시에 없는 텍스트가 여러 개면 큐를 거치지 않고 한 번의 encode 호출로 인코딩합니다.
+        """
+        vectors = await self.cache.alookup_many(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+
+        if len(missing) > 1:
+            loop = asyncio.get_running_loop()
+            encoded = await loop.run_in_executor(self._executor, self._encode_batch, [texts[i] for i in missing])
+            self.batches += 1
+            self.batched_queries += len(missing)
+            self.max_observed_batch = max(self.max_observed_batch, len(missing))
+        elif missing:
+            encoded = await asyncio.gather(*(self._submit(texts[i]) for i in missing))
+        if missing:
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+            await self.cache.astore_many([texts[i] for i in missing], encoded)
+
+        return np.vstack(vectors)
+
     def get_model_info(self):
         """모델 정보 반환"""
         return {
             "model_loaded": self.model is not None,
-            "model_name": "BAAI/bge-m3",
-            "device": "cuda" if self.model and hasattr(self.model, 'device') else "unknown"
+            "model_name": self.model_name,
+            "device": self.backend_info.get("device", "unknown"),
+            "quantize": self.backend_info.get("quantize"),
+            "num_threads": self.backend_info.get("num_threads"),
+            "max_seq_length": self.backend_info.get("max_seq_length"),
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_queries / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_observed_batch,
+            "cache": self.cache.get_stats()
         }
@@ -5,25 +5,65 @@ from transformers import AutoTokenizer, AutoModelForCausalLM
 from peft import PeftModel
 from dotenv import load_dotenv
 
+from services.generation_scheduler import GenerationScheduler, GenerationQueueFull
+from services.model_export import (
+    MERGED_MODEL_PATH, is_merged_snapshot, load_merged_model,
+    resolve_device, resolve_cpu_dtype, load_options, prepare_cpu_model
+)
+from services.metrics import STAGE_LATENCY, ERRORS, FALLBACKS
+
 logger = logging.getLogger(__name__)
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
 
+
+def build_prompt_parts(game_name: str, question: str):
+    """(게임별 고정 prefix, 질문 부분). prefix의 KV는 스케줄러가 게임별로 캐시해 재사용"""
+    return f"이 질문은 '{game_name}'이라는 보드게임에 대한 것이다.\n### 질문:", f" {question}"
+
+
 class FinetuningService:
     """파인튜닝된 모델을 사용한 룰 설명 서비스"""
     
     def __init__(self):
         logger.info("🔧 파인튜닝 서비스를 초기화합니다...")
         
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        logger.info(f"💻 디바이스: {self.device}")
+        self.device = resolve_device()
+        # CPU에서는 fp16 대신 bf16 또는 int8 동적 양자화 (FINETUNING_CPU_DTYPE)
+        self.cpu_dtype = resolve_cpu_dtype() if self.device == "cpu" else None
+        self.num_threads = int(os.getenv("FINETUNING_NUM_THREADS", "0")) or None
+        self.load_options = load_options(self.device, self.cpu_dtype)
+        logger.info(f"💻 디바이스: {self.device}" + (f" ({self.cpu_dtype})" if self.cpu_dtype else ""))
+        self.model_source = None
         
         # 모델 로드
-        self._load_model()
+        with STAGE_LATENCY.time(service="finetuning", stage="model_load"):
+            self._load_model()
+            if self.model is not None and self.device == "cpu":
+                self._prepare_cpu_model()
+        
+        # 배치 생성 스케줄러 (전용 워커 스레드에서 연속 배치 디코딩, 이벤트 루프에서는 생성하지 않음)
+        self.scheduler = None
+        if self.model and self.tokenizer:
+            self.model.eval()
+            self.scheduler = GenerationScheduler(self.model, self.tokenizer, self.device, num_threads=self.num_threads)
         
         logger.info("✅ 파인튜닝 서비스 초기화 완료")
     
     def _load_model(self):
-        """파인튜닝된 모델 로드 (base 모델 + PEFT 어댑터)"""
+        """파인튜닝된 모델 로드 (병합 스냅샷이 있으면 로컬에서, 없으면 base 모델 + PEFT 어댑터)"""
+        # python -m services.model_export merge 로 만든 스냅샷: 네트워크/어댑터 연산 없이 mmap 로드 + fast tokenizer
+        merged_path = os.getenv("FINETUNED_MERGED_PATH", MERGED_MODEL_PATH)
+        if is_merged_snapshot(merged_path):
+            try:
+                logger.info(f"📥 병합된 파인튜닝 모델 로드 중: {merged_path}")
+                self.model, self.tokenizer = load_merged_model(merged_path, **self.load_options)
+                self.model_source = "merged"
+                logger.info("✅ 병합된 파인튜닝 모델 로드 완료")
+                return
+            except Exception as e:
+                logger.error(f"❌ 병합 스냅샷 로드 실패, 어댑터 경로로 대체: {str(e)}")
+                FALLBACKS.inc(kind="finetuning_merged_to_adapter")
+        
         try:
             finetuned_model_name = os.getenv("FINETUNING_MODEL_ID")
             revision = "master" 
@@ -36,8 +76,7 @@ class FinetuningService:
             # 2. base 모델 로드
             base_model = AutoModelForCausalLM.from_pretrained(
                 base_model_name,
-                device_map="auto",
-                torch_dtype=torch.float16,
+                **self.load_options,
                 trust_remote_code=True
             )
             
@@ -46,8 +85,7 @@ class FinetuningService:
                 base_model,
                 finetuned_model_name,
                 revision=revision,
-                device_map="auto",
-                torch_dtype=torch.float16,
+                **self.load_options,
                 trust_remote_code=True
             )
             
@@ -59,11 +97,13 @@ class FinetuningService:
                 trust_remote_code=True
             )
             
+            self.model_source = "adapter"
             logger.info("✅ 파인튜닝 모델(어댑터) 로드 완료")
                 
         except Exception as e:
             logger.error(f"❌ 모델 로드 실패: {str(e)}")
             logger.info("🔄 기본 모델로 대체 시도...")
+            FALLBACKS.inc(kind="finetuning_adapter_to_base_model")
             
             try:
                 base_model_name = "beomi/KoAlpaca-Polyglot-5.8B"
@@ -71,8 +111,7 @@ class FinetuningService:
                 
                 self.model = AutoModelForCausalLM.from_pretrained(
                     base_model_name,
-                    device_map="auto",
-                    torch_dtype=torch.float16,
+                    **self.load_options,
                     trust_remote_code=True
                 )
                 
@@ -82,6 +121,7 @@ class FinetuningService:
                     trust_remote_code=True
                 )
                 
+                self.model_source = "base"
                 logger.info("✅ 기본 모델 로드 완료")
                 
             except Exception as backup_e:
@@ -89,44 +129,86 @@ class FinetuningService:
                 self.model = None
                 self.tokenizer = None
     
-    async def answer_question(self, game_name: str, question: str):
-        """파인튜닝된 모델로 질문 답변"""
+    def _prepare_cpu_model(self):
+        """CPU 추론 준비: 어댑터는 base 가중치에 병합(토큰마다 LoRA 연산 생략)한 뒤 int8이면 양자화"""
+        if hasattr(self.model, "merge_and_unload"):
+            self.model = self.model.merge_and_unload()
+        self.model = prepare_cpu_model(self.model, self.cpu_dtype)
+        logger.info(f"✅ CPU 추론 모드 준비 완료 ({self.cpu_dtype}, 스레드: {self.num_threads or torch.get_num_threads()})")
+    
+    def is_busy(self):
+        """생성 대기열이 가득 찼는지 (가득 차면 요청을 RAG로 보냄)"""
+        return self.scheduler is not None and self.scheduler.is_busy()
+    
+    async def warmup(self):
+        """짧은 생성 한 번으로 CUDA 컨텍스트/커널 초기화 비용을 첫 요청 전에 치름"""
+        if self.scheduler:
+            with STAGE_LATENCY.time(service="finetuning", stage="warmup"):
+                prefix, prompt = build_prompt_parts("뱅", "몇 명이서 하나요?")
+                await self.scheduler.generate(prompt, max_new_tokens=4, prefix=prefix)
+    
+    async def answer_question(self, game_name: str, question: str, max_new_tokens: int = 128):
+        """파인튜닝된 모델로 질문 답변 (배치 스케줄러를 통해 greedy 디코딩). 대기열이 가득 차면 GenerationQueueFull"""
         try:
-            if not self.model or not self.tokenizer:
+            if not self.model or not self.tokenizer or not self.scheduler:
                 return "파인튜닝 모델이 로드되지 않았습니다."
             
-            prompt = f"이 질문은 '{game_name}'이라는 보드게임에 대한 것이다.\n### 질문: {question}"
-            inputs = self.tokenizer(prompt, return_tensors="pt").to(self.device)
-            inputs.pop("token_type_ids", None)
+            prefix, prompt = build_prompt_parts(game_name, question)
             
-            with torch.no_grad():
-                output = self.model.generate(
-                    **inputs,
-                    max_new_tokens=128,
-                    do_sample=False,
-                    temperature=0.0,
-                    top_p=1.0,
-                    pad_token_id=self.tokenizer.eos_token_id,
-                    eos_token_id=self.tokenizer.eos_token_id
-                )
-            
-            result = self.tokenizer.decode(output[0], skip_special_tokens=True)
-            answer = result.replace(prompt, "").strip()
+            # 스케줄러는 프롬프트 이후 새로 생성된 토큰만 디코딩해서 돌려줌 (게임별 prefix KV는 캐시 재사용)
+            with STAGE_LATENCY.time(service="finetuning", stage="generate"):
+                answer = (await self.scheduler.generate(prompt, max_new_tokens=max_new_tokens, prefix=prefix)).strip()
             
             if not answer:
                 answer = f"'{game_name}' 게임에 대한 '{question}' 질문에 대한 답변을 생성할 수 없습니다."
             
             return answer
             
+        except GenerationQueueFull:
+            raise  # 호출하는 쪽(main.py)에서 RAG로 대체
         except Exception as e:
+            ERRORS.inc(service="finetuning", operation="answer_question")
             logger.error(f"❌ 파인튜닝 모델 답변 생성 실패: {str(e)}")
             return f"파인튜닝 모델 답변 생성 중 오류가 발생했습니다: {str(e)}"
     
+    async def stream_answer(self, game_name: str, question: str, max_new_tokens: int = 128):
+        """파인튜닝 모델 답변 스트리밍 (새로 생성된 토큰만, 다음 ### 마커 전까지). 대기열이 가득 차면 첫 조각 전에 GenerationQueueFull"""
+        try:
+            if not self.model or not self.tokenizer or not self.scheduler:
+                yield "파인튜닝 모델이 로드되지 않았습니다."
+                return
+            
+            prefix, prompt = build_prompt_parts(game_name, question)
+            
+            started = False
+            with STAGE_LATENCY.time(service="finetuning", stage="generate"):
+                async for text in self.scheduler.stream(prompt, max_new_tokens=max_new_tokens, prefix=prefix):
+                    # answer_question의 strip()과 같게 앞쪽 공백은 내보내지 않음
+                    if not started:
+                        text = text.lstrip()
+                        if not text:
+                            continue
+                        started = True
+                    yield text
+            
+            if not started:
+                yield f"'{game_name}' 게임에 대한 '{question}' 질문에 대한 답변을 생성할 수 없습니다."
+            
+        except GenerationQueueFull:
+            raise
+        except Exception as e:
+            ERRORS.inc(service="finetuning", operation="answer_stream")
+            logger.error(f"❌ 파인튜닝 모델 답변 스트리밍 실패: {str(e)}")
+            yield f"파인튜닝 모델 답변 생성 중 오류가 발생했습니다: {str(e)}"
+    
     def get_model_info(self):
         return {
             "model_loaded": self.model is not None,
             "tokenizer_loaded": self.tokenizer is not None,
             "device": self.device,
+            "cpu_dtype": self.cpu_dtype,
+            "model_source": self.model_source,
+            "scheduler": self.scheduler.get_stats() if self.scheduler else None,
             "finetuned_model": os.getenv("FINETUNING_MODEL_ID"),
             "base_model": os.getenv("BASE_MODEL_ID", "beomi/KoAlpaca-Polyglot-5.8B")
         }
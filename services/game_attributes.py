@@ -0,0 +1,346 @@
+"""
+게임 속성 컬럼 (인원 / 플레이 시간 / 카테고리)과 추천 쿼리의 조건 파싱
+
+game.json에서 게임마다 속성을 뽑아 NumPy 컬럼(data/game_attributes.npz, 추천 인덱스와 같은 행 순서)으로 저장하고,
+"2명", "30분 이내", "파티 게임" 같은 쿼리 조건을 벡터화된 후보 마스크와 점수 가산값으로 바꿉니다.
+
+    min_players / max_players   game.json "players" ("2~6", "2", "1~" → 상한 없음, "~" → 모름). 0은 모름
+    play_time                   본문의 "play time: 20분" / "플레이 시간 30분" 표기 (분). 0은 모름
+    categories                  CATEGORIES 순서의 비트 마스크 (본문 키워드, 파티는 최대 8인 이상도 포함)
+    curated                     GAME_ATTRIBUTES_OVERRIDES JSON({게임 이름: {"play_time": 30, "categories": ["party"]}})에서
+                                직접 지정한 값의 비트 (CURATED_PLAY_TIME, CURATED_CATEGORIES)
+
+인원(game.json의 구조화된 값)과 overrides에서 지정한 플레이 시간·카테고리만 하드 조건으로 후보를 거르고,
+본문 키워드에서 추출한 카테고리와 플레이 시간은 조건에 맞는 게임의 검색 점수를 올리는 데만 씁니다.
+값을 모르는 게임은 해당 조건으로 제외하지 않습니다.
+
+사용법:
+    python -m services.game_attributes build
+    python -m services.game_attributes parse "30분 이내로 4명이서 할 파티 게임"
+"""
+
+import os
+import re
+import json
+import argparse
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ATTRIBUTES_PATH = os.path.join("data", "game_attributes.npz")
+OVERRIDES_PATH = os.path.join("data", "game_attributes_overrides.json")
+
+# (이름, 쿼리 키워드, 본문 키워드)
+CATEGORIES = (
+    ("party", ("파티",), ("파티", "여럿이", "단체")),
+    ("coop", ("협력",), ("협력",)),
+    ("deduction", ("추리", "마피아", "정체"), ("추리", "정체를", "범인")),
+    ("bluff", ("블러핑", "심리", "눈치"), ("블러핑", "심리", "눈치", "거짓말")),
+    ("trade", ("경매", "거래", "협상"), ("경매", "거래", "협상")),
+    ("dice", ("주사위",), ("주사위",)),
+    ("tile", ("타일",), ("타일",)),
+    ("word", ("단어", "말하기", "그림"), ("단어", "그림을")),
+    ("dexterity", ("순발력", "손기술", "쌓기", "균형"), ("순발력", "쌓", "균형", "흔들")),
+    ("team", ("팀전", "팀 게임", "팀게임"), ("팀전", "팀을", "팀으로")),
+)
+CATEGORY_BITS = {name: 1 << bit for bit, (name, _, _) in enumerate(CATEGORIES)}
+PARTY_MIN_PLAYERS = 8
+
+CURATED_PLAY_TIME = 1
+CURATED_CATEGORIES = 2
+
+COLUMNS = ("min_players", "max_players", "play_time", "categories", "curated")
+_DTYPES = {"min_players": "<u2", "max_players": "<u2", "play_time": "<u2", "categories": "<u4", "curated": "u1"}
+
+# 키워드로 추출한 속성이 쿼리 조건과 맞을 때 검색 점수(코사인 유사도)에 더하는 기본값
+DEFAULT_BOOST = 0.05
+
+_PLAY_TIME = re.compile(r"(?:play\s*time|플레이\s*시간|게임\s*시간|소요\s*시간)\s*[:：]?\s*약?\s*(\d+)(?:\s*~\s*(\d+))?\s*분", re.I)
+
+# 쿼리 조건
+_KOREAN_NUMBERS = {"한": 1, "두": 2, "둘": 2, "세": 3, "셋": 3, "네": 4, "넷": 4, "다섯": 5,
+                   "여섯": 6, "일곱": 7, "여덟": 8, "아홉": 9, "열": 10}
+_PLAYER_RANGE = re.compile(r"(\d+)\s*[~\-]\s*(\d+)\s*(?:명|인)")
+_PLAYER_COUNT = re.compile(r"(\d+)\s*(?:명|인(?!기|원|데|가|지))")
+_PLAYER_WORD = re.compile(r"(다섯|여섯|일곱|여덟|아홉|한|두|세|네|열)\s*(?:명|사람)|(둘|셋|넷|다섯|여섯)\s*이서")
+_PLAYER_BOUND = re.compile(r"\s*(이상|넘게|넘는|초과|이하|까지|미만)")
+_TIME = re.compile(r"(\d+)\s*(분|시간)\s*(이내|이하|안쪽|안에|안|미만|내로|내외|정도|이상|넘는|넘게|짜리)?")
+
+
+def _parse_players(value):
+    """ "2~6" → (2, 6), "2" → (2, 2), "1~" → (1, 0), "~" → (0, 0)"""
+    numbers = [int(n) if n else 0 for n in (re.sub(r"[^\d]", "", part) for part in str(value or "").split("~"))]
+    if len(numbers) == 1:
+        return numbers[0], numbers[0]
+    return numbers[0], numbers[-1]
+
+
+def extract_attributes(game):
+    """game.json 항목 하나의 속성 dict"""
+    text = game.get("text", "") or ""
+    min_players, max_players = _parse_players(game.get("players"))
+
+    play_time = 0
+    match = _PLAY_TIME.search(text)
+    if match:
+        play_time = int(match.group(2) or match.group(1))
+
+    categories = 0
+    for name, _, keywords in CATEGORIES:
+        if any(keyword in text for keyword in keywords):
+            categories |= CATEGORY_BITS[name]
+    if max_players >= PARTY_MIN_PLAYERS:
+        categories |= CATEGORY_BITS["party"]
+
+    return {"min_players": min_players, "max_players": max_players, "play_time": play_time, "categories": categories,
+            "curated": 0}
+
+
+def _load_overrides(path=None):
+    path = path or os.getenv("GAME_ATTRIBUTES_OVERRIDES", OVERRIDES_PATH)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _apply_override(attributes, override):
+    for column in ("min_players", "max_players", "play_time"):
+        if column in override:
+            attributes[column] = int(override[column])
+    if "play_time" in override:
+        attributes["curated"] |= CURATED_PLAY_TIME
+    if "categories" in override:
+        attributes["curated"] |= CURATED_CATEGORIES
+        unknown = set(override["categories"]) - set(CATEGORY_BITS)
+        if unknown:
+            logger.warning(f"⚠️ 알 수 없는 카테고리: {', '.join(sorted(unknown))}")
+        attributes["categories"] = sum(CATEGORY_BITS[name] for name in set(override["categories"]) & set(CATEGORY_BITS))
+
+
+def build_columns(game_data, overrides=None):
+    """game.json 순서의 속성 컬럼 {column: ndarray}"""
+    overrides = _load_overrides() if overrides is None else overrides
+    rows = []
+    for game in game_data:
+        attributes = extract_attributes(game)
+        override = overrides.get(game.get("game_name", "")) or overrides.get(game.get("id", ""))
+        if override:
+            _apply_override(attributes, override)
+        rows.append(attributes)
+    return {column: np.array([row[column] for row in rows], dtype=_DTYPES[column]) for column in COLUMNS}
+
+
+def write_attributes(path, game_data, overrides=None):
+    """속성 컬럼을 .npz로 저장 (임시 파일에 쓴 뒤 교체)"""
+    columns = build_columns(game_data, overrides)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(tmp_path, **columns)
+    os.replace(tmp_path, path)
+    logger.info(f"✅ 게임 속성 저장: {len(game_data)}개 게임 ({path})")
+    return columns
+
+
+def parse_constraints(query):
+    """
+    추천 쿼리의 조건. 조건이 없으면 빈 dict
+        players     (최소, 최대) 함께 할 인원, 열린 쪽은 None
+                    ("4명" → (4, 4), "3~5명" → (3, 5), "5인 이상" → (5, None), "4명 이하" → (None, 4))
+        max_time    최대 플레이 시간(분)  ("30분 이내", "1시간 정도")
+        min_time    최소 플레이 시간(분)  ("1시간 이상")
+        categories  카테고리 이름 목록
+    """
+    constraints = {}
+    text = query or ""
+
+    match = _PLAYER_RANGE.search(text)
+    if match:
+        low, high = sorted((int(match.group(1)), int(match.group(2))))
+        constraints["players"] = (low, high)
+    else:
+        match = _PLAYER_COUNT.search(text) or _PLAYER_WORD.search(text)
+        if match:
+            count = int(match.group(1)) if match.re is _PLAYER_COUNT else _KOREAN_NUMBERS[match.group(1) or match.group(2)]
+        else:
+            count = 1 if "혼자" in text else 0
+        if count:
+            bound = _PLAYER_BOUND.match(text, match.end()) if match else None
+            qualifier = bound.group(1) if bound else None
+            if qualifier == "이상":
+                constraints["players"] = (count, None)
+            elif qualifier in ("넘게", "넘는", "초과"):
+                constraints["players"] = (count + 1, None)
+            elif qualifier in ("이하", "까지"):
+                constraints["players"] = (None, count)
+            elif qualifier == "미만":
+                constraints["players"] = (None, max(1, count - 1))
+            else:
+                constraints["players"] = (count, count)
+
+    match = _TIME.search(text)
+    if match:
+        minutes = int(match.group(1)) * (60 if match.group(2) == "시간" else 1)
+        if match.group(3) in ("이상", "넘는", "넘게"):
+            constraints["min_time"] = minutes
+        else:
+            constraints["max_time"] = minutes
+
+    categories = [name for name, keywords, _ in CATEGORIES if any(keyword in text for keyword in keywords)]
+    if categories:
+        constraints["categories"] = categories
+    return constraints
+
+
+def rerank(scores, ids, boost, k):
+    """검색 결과(행마다 후보 점수, 행 번호)에 행별 boost를 더해 다시 정렬한 상위 k개. 반환: (scores, ids)"""
+    valid = ids >= 0
+    boosted = np.where(valid, scores + boost[np.where(valid, ids, 0)], -np.inf).astype("float32")
+    order = np.argsort(-boosted, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(boosted, order, axis=1), np.take_along_axis(ids, order, axis=1)
+
+
+class GameAttributes:
+    """추천 인덱스 행 순서의 속성 컬럼과 조건 → 후보 마스크 / 점수 가산값 계산"""
+
+    def __init__(self, columns, source=None):
+        self.columns = columns
+        self.source = source
+        self.size = len(columns["min_players"])
+
+    def __len__(self):
+        return self.size
+
+    def _time_match(self, constraints):
+        """플레이 시간을 알고 시간 조건을 만족하는 행. 시간 조건이 없으면 None"""
+        if "max_time" not in constraints and "min_time" not in constraints:
+            return None
+        play_time = self.columns["play_time"]
+        match = play_time > 0
+        if "max_time" in constraints:
+            match &= play_time <= constraints["max_time"]
+        if "min_time" in constraints:
+            match &= play_time >= constraints["min_time"]
+        return match
+
+    def mask(self, constraints):
+        """
+        하드 조건(인원, overrides로 지정한 플레이 시간·카테고리)을 만족하는 행의 bool 마스크.
+        거를 조건이 없으면 None (값을 모르는 게임과 키워드로만 추출한 값은 통과)
+        """
+        c = self.columns
+        mask = None
+
+        if "players" in constraints:
+            low, high = constraints["players"]
+            mask = np.ones(self.size, dtype=bool)
+            if low is not None and high is not None:
+                # 인원 범위 전체를 지원하는 게임
+                mask &= (c["min_players"] == 0) | (c["min_players"] <= low)
+                mask &= (c["max_players"] == 0) | (c["max_players"] >= high)
+            elif low is not None:
+                # low명 이상 중 한 인원이라도 지원 (최대 인원 0은 상한 없음)
+                mask &= (c["max_players"] == 0) | (c["max_players"] >= low)
+            else:
+                mask &= (c["min_players"] == 0) | (c["min_players"] <= high)
+
+        time_match = self._time_match(constraints)
+        curated_time = (c["curated"] & CURATED_PLAY_TIME) != 0
+        if time_match is not None and curated_time.any():
+            mask = np.ones(self.size, dtype=bool) if mask is None else mask
+            mask &= ~curated_time | time_match
+
+        curated_categories = (c["curated"] & CURATED_CATEGORIES) != 0
+        if constraints.get("categories") and curated_categories.any():
+            bits = sum(CATEGORY_BITS[name] for name in constraints["categories"])
+            mask = np.ones(self.size, dtype=bool) if mask is None else mask
+            mask &= ~curated_categories | ((c["categories"] & bits) == bits)
+
+        return mask
+
+    def boost(self, constraints, weight=None):
+        """
+        키워드로 추출한 카테고리·플레이 시간이 조건과 맞는 행의 검색 점수 가산값 (float32).
+        카테고리는 맞은 비율만큼, 시간은 맞으면 weight. 점수를 바꿀 조건이 없으면 None
+        """
+        weight = DEFAULT_BOOST if weight is None else weight
+        categories = constraints.get("categories")
+        time_match = self._time_match(constraints)
+        if not weight or (not categories and time_match is None):
+            return None
+
+        boost = np.zeros(self.size, dtype="float32")
+        if categories:
+            for name in categories:
+                boost += (self.columns["categories"] & CATEGORY_BITS[name]) != 0
+            boost *= weight / len(categories)
+        if time_match is not None:
+            boost += weight * time_match
+        return boost
+
+    def get_stats(self):
+        c = self.columns
+        return {
+            "source": self.source,
+            "games": self.size,
+            "known_players": int(np.count_nonzero(c["min_players"])),
+            "known_play_time": int(np.count_nonzero(c["play_time"])),
+            "curated_play_time": int(np.count_nonzero(c["curated"] & CURATED_PLAY_TIME)),
+            "curated_categories": int(np.count_nonzero(c["curated"] & CURATED_CATEGORIES)),
+            "categories": {name: int(np.count_nonzero(c["categories"] & bit)) for name, bit in CATEGORY_BITS.items()}
+        }
+
+
+def load_attributes(game_data, size, path=None):
+    """
+    저장된 속성 컬럼을 읽고, 없거나 행 수가 인덱스(size)와 다르면 game_data에서 바로 추출.
+    둘 다 맞지 않으면 None (사전 필터링 없이 검색)
+    """
+    path = path or os.getenv("GAME_ATTRIBUTES_PATH", ATTRIBUTES_PATH)
+    if os.path.exists(path):
+        try:
+            with np.load(path) as data:
+                columns = {column: data[column] for column in COLUMNS}
+            if len(columns["min_players"]) == size:
+                return GameAttributes(columns, source=path)
+            logger.warning(f"⚠️ 게임 속성 행 수({len(columns['min_players'])})가 추천 인덱스({size})와 달라 다시 추출합니다.")
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"⚠️ 게임 속성 파일을 읽을 수 없어 다시 추출합니다 ({path}): {str(e)}")
+
+    if len(game_data) != size:
+        logger.warning("⚠️ game.json과 추천 인덱스의 게임 수가 달라 속성 사전 필터링을 사용하지 않습니다.")
+        return None
+    return GameAttributes(build_columns(game_data), source="game.json")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="게임 속성 컬럼 / 쿼리 조건")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="game.json에서 속성 컬럼 생성")
+    build_parser.add_argument("--game-json", default=os.path.join("data", "game.json"))
+    build_parser.add_argument("--output", default=ATTRIBUTES_PATH)
+    parse_parser = subparsers.add_parser("parse", help="쿼리의 조건과 후보 게임 수 확인")
+    parse_parser.add_argument("query")
+    parse_parser.add_argument("--game-json", default=os.path.join("data", "game.json"))
+    args = parser.parse_args()
+
+    with open(args.game_json, "r", encoding="utf-8") as f:
+        game_data = json.load(f)
+
+    if args.command == "build":
+        columns = write_attributes(args.output, game_data)
+        print(json.dumps(GameAttributes(columns, source=args.output).get_stats(), ensure_ascii=False, indent=2))
+    elif args.command == "parse":
+        constraints = parse_constraints(args.query)
+        attributes = GameAttributes(build_columns(game_data))
+        mask = attributes.mask(constraints)
+        boost = attributes.boost(constraints)
+        candidates = len(game_data) if mask is None else int(mask.sum())
+        boosted = 0 if boost is None else int(np.count_nonzero(boost))
+        print(json.dumps({"constraints": constraints, "candidates": candidates, "boosted": boosted}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
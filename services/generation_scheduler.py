@@ -0,0 +1,552 @@
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+
+import torch
+
+from services.metrics import STAGE_LATENCY
+
+try:
+    from transformers import DynamicCache
+except ImportError:  # 구버전 transformers는 legacy tuple 캐시를 그대로 받음
+    DynamicCache = None
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationQueueFull(RuntimeError):
+    """대기열이 GEN_MAX_QUEUE만큼 차 있어 새 생성 요청을 받지 않음"""
+
+
+def max_new_tokens_limit():
+    """요청 하나가 생성할 수 있는 최대 토큰 수 (GEN_MAX_NEW_TOKENS, API 검증과 스케줄러 모두 사용)"""
+    return int(os.getenv("GEN_MAX_NEW_TOKENS", "512"))
+
+
+def _resolve(future, result=None, error=None):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+def _left_pad(tensor, pad, dim):
+    """dim 방향 앞쪽에 0을 pad개 붙임 (attention mask가 0인 위치라 값은 무시됨)"""
+    if pad == 0:
+        return tensor
+    shape = list(tensor.shape)
+    shape[dim] = pad
+    return torch.cat([tensor.new_zeros(shape), tensor], dim=dim)
+
+
+class PrefixKVCache:
+    """프롬프트 고정 앞부분(게임별 템플릿)의 past key/value LRU 캐시 (워커 스레드 전용)
+
+    - GEN_PREFIX_CACHE_MB: 캐시가 차지할 수 있는 최대 메모리 (넘으면 가장 오래 안 쓴 prefix부터 제거)
+    - hit마다 처음 계산할 때 걸린 prefill 시간과 토큰 수를 절약한 것으로 집계
+    """
+
+    def __init__(self, memory_budget_mb=None):
+        if memory_budget_mb is None:
+            memory_budget_mb = float(os.getenv("GEN_PREFIX_CACHE_MB", "256"))
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self._entries = OrderedDict()  # prefix -> (length, cache, nbytes, compute_seconds)
+        self._memory_used = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_tokens = 0
+        self.saved_seconds = 0.0
+
+    def get(self, prefix):
+        """(prefix 토큰 수, layer별 (key, value)) 또는 None"""
+        entry = self._entries.get(prefix)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(prefix)
+        self.hits += 1
+        self.saved_tokens += entry[0]
+        self.saved_seconds += entry[3]
+        return entry[0], entry[1]
+
+    def put(self, prefix, length, cache, compute_seconds):
+        nbytes = sum(k.numel() * k.element_size() + v.numel() * v.element_size() for k, v in cache)
+        if nbytes > self.memory_budget:
+            return
+        while self._entries and self._memory_used + nbytes > self.memory_budget:
+            _, (_, _, evicted_bytes, _) = self._entries.popitem(last=False)
+            self._memory_used -= evicted_bytes
+            self.evictions += 1
+        self._entries[prefix] = (length, cache, nbytes, compute_seconds)
+        self._memory_used += nbytes
+
+    def clear(self):
+        self._entries.clear()
+        self._memory_used = 0
+
+    def get_stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "memory_used_mb": round(self._memory_used / 1024 / 1024, 2),
+            "memory_budget_mb": round(self.memory_budget / 1024 / 1024, 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "prefill_tokens_saved": self.saved_tokens,
+            "prefill_seconds_saved": round(self.saved_seconds, 3)
+        }
+
+
+class GenerationRequest:
+    """스케줄러에 들어온 생성 요청 하나 (배치 안의 한 슬롯)
+
+    prefix가 있으면 그 부분의 KV는 PrefixKVCache에서 가져오고 prompt(이어지는 부분)만 prefill 합니다.
+    stream(asyncio.Queue)이 있으면 확정된 텍스트 조각을 생성되는 대로 넣고, 끝나면 None을 넣습니다.
+    """
+
+    def __init__(self, prompt, max_new_tokens, loop, future, prefix=None, stop=(), stream=None):
+        self.prompt = prompt
+        self.prefix = prefix
+        self.max_new_tokens = max_new_tokens
+        self.loop = loop
+        self.future = future
+        self.stop = tuple(stop)
+        self.stream = stream
+        self.enqueued_at = time.perf_counter()
+        self.generated = []
+        self.text = ""        # 지금까지 디코딩한 새 텍스트 (stop 시퀀스부터는 잘라냄)
+        self.emitted = 0      # stream으로 내보낸 글자 수
+        self.stopped = False
+        self.cancelled = False
+
+    def push(self, text):
+        self.loop.call_soon_threadsafe(self.stream.put_nowait, text)
+
+    def finish(self, text=None, error=None):
+        if self.stream is not None:
+            if text is not None and len(text) > self.emitted:
+                self.push(text[self.emitted:])
+            self.push(None)
+        self.loop.call_soon_threadsafe(_resolve, self.future, text, error)
+
+
+class GenerationScheduler:
+    """파인튜닝 모델용 연속 배치(continuous batching) 생성 스케줄러
+
+    전용 워커 스레드가 대기 중인 프롬프트를 left-padding 배치로 prefill 하고,
+    활성 배치 전체를 한 토큰씩 greedy 디코딩합니다. 끝난 시퀀스는 즉시 배치에서 빠지고
+    그 자리는 다음 스텝에서 대기 요청으로 채워집니다.
+    - GEN_MAX_BATCH_SIZE: 동시에 디코딩할 최대 시퀀스 수
+    - GEN_MAX_WAIT_MS: 유휴 상태에서 첫 요청 후 배치를 채우기 위해 기다리는 시간
+    - GEN_STOP_SEQUENCES: 쉼표로 구분한 기본 stop 시퀀스 (답변 내용 뒤에 나오면 그 자리에서 생성 종료)
+    - GEN_MAX_QUEUE: 배치에 들어가지 못하고 기다릴 수 있는 최대 요청 수 (넘으면 GenerationQueueFull, 0이면 무제한)
+    - GEN_MAX_NEW_TOKENS: 요청별 max_new_tokens 상한 (넘으면 상한으로 줄임, 한 요청이 배치 슬롯을 오래 점유하지 않도록)
+    num_threads를 주면 워커 스레드의 intra-op 스레드 수만 바꿔 임베딩 등 다른 스레드의 설정과 분리합니다.
+    """
+
+    def __init__(self, model, tokenizer, device, max_batch_size=None, max_wait_ms=None, max_queue=None,
+                 num_threads=None):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = device
+        self.max_batch_size = max_batch_size or int(os.getenv("GEN_MAX_BATCH_SIZE", "8"))
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else float(os.getenv("GEN_MAX_WAIT_MS", "10"))) / 1000
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("GEN_MAX_QUEUE", "32"))
+        self.num_threads = num_threads
+        self.max_new_tokens = max_new_tokens_limit()
+
+        self.eos_token_id = tokenizer.eos_token_id
+        self.pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+        self.stop_sequences = tuple(s for s in os.getenv("GEN_STOP_SEQUENCES", "###").split(",") if s)
+
+        self._waiting = queue.Queue(maxsize=self.max_queue)
+        self._stop = threading.Event()
+        self.prefix_cache = PrefixKVCache()
+
+        # 활성 배치 상태 (워커 스레드 전용)
+        self._active = []
+        self._cache = None          # layer별 (key, value) 튜플, [batch, heads, seq, head_dim]
+        self._attention_mask = None  # [batch, seq]
+        self._positions = None       # [batch] 다음 토큰의 position id
+        self._next_tokens = None     # [batch] 다음 스텝 입력 토큰
+
+        # 지표
+        self.steps = 0
+        self.completed = 0
+        self.prefill_batches = 0
+        self.step_batch_size_sum = 0
+        self.max_observed_batch = 0
+        self.stopped_early = 0
+        self.cancelled = 0
+        self.rejected = 0
+
+        self._thread = threading.Thread(target=self._run, name="generation-scheduler", daemon=True)
+        self._thread.start()
+
+    def _clamp(self, max_new_tokens):
+        return max(1, min(int(max_new_tokens), self.max_new_tokens))
+
+    async def generate(self, prompt, max_new_tokens=128, prefix=None, stop=None):
+        """
+        프롬프트를 큐에 넣고 생성된 새 토큰만 디코딩한 문자열을 반환.
+        prefix를 주면 prefix + prompt 전체에 대해 생성하되, prefix의 KV는 캐시해 재사용합니다.
+        (prompt는 공백으로 시작하도록 나눠야 토큰 경계가 전체 프롬프트를 토크나이즈할 때와 같음)
+        stop을 주지 않으면 GEN_STOP_SEQUENCES를 사용합니다.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        stop = self.stop_sequences if stop is None else stop
+        self._enqueue(GenerationRequest(prompt, self._clamp(max_new_tokens), loop, future, prefix, stop))
+        return await future
+
+    async def stream(self, prompt, max_new_tokens=128, prefix=None, stop=None):
+        """생성되는 새 텍스트 조각을 바로 내보내는 async generator (stop 시퀀스부터는 내보내지 않음)"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        chunks = asyncio.Queue()
+        stop = self.stop_sequences if stop is None else stop
+        request = GenerationRequest(prompt, self._clamp(max_new_tokens), loop, future, prefix, stop, chunks)
+        self._enqueue(request)
+        try:
+            while True:
+                text = await chunks.get()
+                if text is None:
+                    break
+                yield text
+            await future  # 워커 스레드에서 난 오류 전달
+        finally:
+            # 클라이언트가 중간에 끊으면 다음 스텝에서 배치에서 빼 연산 낭비를 막음
+            request.cancelled = True
+
+    def _enqueue(self, request):
+        try:
+            self._waiting.put_nowait(request)
+        except queue.Full:
+            self.rejected += 1
+            raise GenerationQueueFull(f"생성 대기열이 가득 찼습니다 (최대 {self.max_queue}개)")
+
+    def is_busy(self):
+        """대기열이 가득 차 새 요청을 받을 수 없는지"""
+        return self._waiting.full()
+
+    def shutdown(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    # ---- 워커 스레드 ----
+
+    def _run(self):
+        if self.num_threads:
+            # OpenMP 스레드 수는 호출한 스레드 기준이라 이 워커의 연산에만 적용됨
+            torch.set_num_threads(self.num_threads)
+        while not self._stop.is_set():
+            admitted = []
+            try:
+                admitted = self._admit()
+                if not self._active and not admitted:
+                    continue
+                with torch.no_grad():
+                    if admitted:
+                        self._prefill(admitted)
+                    self._collect_finished()
+                    if self._active:
+                        self._decode_step()
+                        self._collect_finished()
+            except Exception as e:
+                logger.error(f"❌ 배치 생성 실패: {str(e)}")
+                # prefill 도중 실패하면 admitted는 아직 활성 배치에 합쳐지지 않았으므로 함께 종료 (호출자가 멈추지 않도록)
+                for request in {id(r): r for r in admitted + self._active}.values():
+                    request.finish(error=e)
+                self._reset()
+
+    def _admit(self):
+        """빈 슬롯만큼 대기 요청을 가져옴. 유휴 상태면 첫 요청 뒤 짧게 기다려 배치를 채움"""
+        free = self.max_batch_size - len(self._active)
+        admitted = []
+        if free <= 0:
+            return admitted
+
+        if not self._active:
+            try:
+                admitted.append(self._waiting.get(timeout=0.1))
+            except queue.Empty:
+                return admitted
+            deadline = time.perf_counter() + self.max_wait
+            while len(admitted) < free:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    admitted.append(self._waiting.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+        while len(admitted) < free:
+            try:
+                admitted.append(self._waiting.get_nowait())
+            except queue.Empty:
+                break
+
+        # 대기 중에 끊긴 스트리밍 요청은 prefill 하지 않음
+        for request in admitted:
+            if request.cancelled:
+                request.finish("")
+                self.cancelled += 1
+        return [request for request in admitted if not request.cancelled]
+
+    def _forward(self, input_ids, attention_mask, position_ids, cache):
+        past_key_values = cache
+        if cache is not None and DynamicCache is not None:
+            past_key_values = DynamicCache.from_legacy_cache(cache)
+        output = self.model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            position_ids=position_ids,
+            past_key_values=past_key_values,
+            use_cache=True
+        )
+        new_cache = output.past_key_values
+        if hasattr(new_cache, "to_legacy_cache"):
+            new_cache = new_cache.to_legacy_cache()
+        return output.logits[:, -1, :], new_cache
+
+    def _prefix_kv(self, prefix):
+        """prefix의 (토큰 수, KV). 캐시에 없으면 한 번 계산해 저장"""
+        entry = self.prefix_cache.get(prefix)
+        if entry is not None:
+            return entry
+
+        start = time.perf_counter()
+        ids = self.tokenizer(prefix)["input_ids"]
+        input_ids = torch.tensor([ids], dtype=torch.long, device=self.device)
+        attention_mask = torch.ones_like(input_ids)
+        position_ids = torch.arange(len(ids), device=self.device).unsqueeze(0)
+        _, cache = self._forward(input_ids, attention_mask, position_ids, None)
+        cache = tuple((k.detach(), v.detach()) for k, v in cache)
+
+        seconds = time.perf_counter() - start
+        STAGE_LATENCY.observe(seconds, service="finetuning", stage="prefix_prefill")
+        self.prefix_cache.put(prefix, len(ids), cache, seconds)
+        return len(ids), cache
+
+    def _prefill(self, requests):
+        """
+        새 요청들을 배치로 prefill 하고 활성 배치에 합침.
+        prefix가 있는 요청은 캐시된 prefix KV를 왼쪽 패딩으로 맞춰 past로 넘기고, 나머지 부분만 계산합니다.
+        시퀀스 배치는 [패딩 | prefix | 패딩 | 나머지] 형태이고 패딩 위치는 attention mask로 가려집니다.
+        """
+        start = time.perf_counter()
+        for request in requests:
+            STAGE_LATENCY.observe(start - request.enqueued_at, service="finetuning", stage="queue_wait")
+
+        prefixes = [self._prefix_kv(request.prefix) if request.prefix else (0, None) for request in requests]
+        encoded = [
+            self.tokenizer(request.prompt, add_special_tokens=request.prefix is None)["input_ids"]
+            for request in requests
+        ]
+        length = max(len(ids) for ids in encoded)
+
+        input_ids = torch.full((len(encoded), length), self.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(encoded), length), dtype=torch.long)
+        for row, ids in enumerate(encoded):
+            input_ids[row, length - len(ids):] = torch.tensor(ids, dtype=torch.long)
+            attention_mask[row, length - len(ids):] = 1
+        input_ids = input_ids.to(self.device)
+        attention_mask = attention_mask.to(self.device)
+
+        prefix_lengths = torch.tensor([n for n, _ in prefixes], dtype=torch.long, device=self.device)
+        position_ids = (prefix_lengths.unsqueeze(-1) + attention_mask.cumsum(-1) - 1).clamp(min=0)
+
+        past = None
+        prefix_len = int(prefix_lengths.max())
+        if prefix_len > 0:
+            template = next(cache for _, cache in prefixes if cache is not None)
+            past = []
+            for layer, (template_k, template_v) in enumerate(template):
+                keys, values = [], []
+                for n, cache in prefixes:
+                    if cache is None:
+                        k = template_k.new_zeros(template_k.shape[:2] + (0,) + template_k.shape[3:])
+                        v = template_v.new_zeros(template_v.shape[:2] + (0,) + template_v.shape[3:])
+                    else:
+                        k, v = cache[layer]
+                    keys.append(_left_pad(k, prefix_len - n, 2))
+                    values.append(_left_pad(v, prefix_len - n, 2))
+                past.append((torch.cat(keys, dim=0), torch.cat(values, dim=0)))
+            past = tuple(past)
+
+            prefix_mask = torch.zeros((len(requests), prefix_len), dtype=torch.long, device=self.device)
+            for row, (n, _) in enumerate(prefixes):
+                prefix_mask[row, prefix_len - n:] = 1
+            attention_mask = torch.cat([prefix_mask, attention_mask], dim=1)
+
+        logits, cache = self._forward(input_ids, attention_mask, position_ids, past)
+        next_tokens = logits.argmax(-1)
+        positions = attention_mask.sum(-1)
+
+        self.prefill_batches += 1
+        STAGE_LATENCY.observe(time.perf_counter() - start, service="finetuning", stage="prefill")
+        self._merge(requests, cache, attention_mask, positions, next_tokens)
+
+    def _merge(self, requests, cache, attention_mask, positions, next_tokens):
+        """길이가 다른 두 배치의 KV 캐시를 왼쪽 패딩으로 맞춰 배치 차원으로 이어 붙임"""
+        for request, token in zip(requests, next_tokens.tolist()):
+            request.generated.append(token)
+            self._update_text(request)
+
+        if not self._active:
+            self._active = list(requests)
+            self._cache, self._attention_mask = cache, attention_mask
+            self._positions, self._next_tokens = positions, next_tokens
+            return
+
+        current_len = self._attention_mask.shape[1]
+        new_len = attention_mask.shape[1]
+        target = max(current_len, new_len)
+
+        merged_cache = []
+        for (old_k, old_v), (new_k, new_v) in zip(self._cache, cache):
+            merged_cache.append((
+                torch.cat([_left_pad(old_k, target - current_len, 2), _left_pad(new_k, target - new_len, 2)], dim=0),
+                torch.cat([_left_pad(old_v, target - current_len, 2), _left_pad(new_v, target - new_len, 2)], dim=0)
+            ))
+
+        self._cache = tuple(merged_cache)
+        self._attention_mask = torch.cat([
+            _left_pad(self._attention_mask, target - current_len, 1),
+            _left_pad(attention_mask, target - new_len, 1)
+        ], dim=0)
+        self._positions = torch.cat([self._positions, positions], dim=0)
+        self._next_tokens = torch.cat([self._next_tokens, next_tokens], dim=0)
+        self._active.extend(requests)
+
+    def _decode_step(self):
+        """활성 배치 전체에 대해 한 토큰 디코딩"""
+        batch_size = len(self._active)
+        start = time.perf_counter()
+        self._attention_mask = torch.cat(
+            [self._attention_mask, self._attention_mask.new_ones((batch_size, 1))], dim=1
+        )
+        logits, self._cache = self._forward(
+            self._next_tokens.unsqueeze(-1),
+            self._attention_mask,
+            self._positions.unsqueeze(-1),
+            self._cache
+        )
+        self._next_tokens = logits.argmax(-1)
+        self._positions = self._positions + 1
+
+        for request, token in zip(self._active, self._next_tokens.tolist()):
+            request.generated.append(token)
+            self._update_text(request)
+
+        STAGE_LATENCY.observe(time.perf_counter() - start, service="finetuning", stage="decode_step")
+        self.steps += 1
+        self.step_batch_size_sum += batch_size
+        self.max_observed_batch = max(self.max_observed_batch, batch_size)
+
+    def _decode(self, request):
+        tokens = [t for t in request.generated if t != self.eos_token_id]
+        return self.tokenizer.decode(tokens, skip_special_tokens=True)
+
+    def _update_text(self, request):
+        """새 토큰까지 디코딩해 stop 시퀀스를 확인하고, 스트리밍 요청이면 확정된 부분을 내보냄"""
+        if not request.stop and request.stream is None:
+            return
+        text = self._decode(request)
+
+        # 답변 앞의 헤더(예: "### 답변:")가 아니라 내용이 나온 뒤의 다음 마커에서 멈춤
+        cut = -1
+        for stop in request.stop:
+            idx = text.find(stop)
+            while idx != -1 and not text[:idx].strip():
+                idx = text.find(stop, idx + len(stop))
+            if idx != -1 and (cut == -1 or idx < cut):
+                cut = idx
+        if cut != -1:
+            text = text[:cut]
+            request.stopped = True
+        request.text = text
+
+        if request.stream is not None and not request.stopped:
+            # 디코딩이 덜 된 멀티바이트 문자(�)와 stop 시퀀스의 앞부분일 수 있는 끝부분은 남겨둠
+            hold = max((len(stop) for stop in request.stop), default=1) - 1
+            safe = min(len(text.rstrip("\ufffd")), len(text) - hold)
+            if safe > request.emitted:
+                request.push(text[request.emitted:safe])
+                request.emitted = safe
+
+    def _is_finished(self, request):
+        return request.stopped or request.cancelled or \
+            (request.generated and request.generated[-1] == self.eos_token_id) or \
+            len(request.generated) >= request.max_new_tokens
+
+    def _collect_finished(self):
+        """끝난 시퀀스를 결과로 돌려주고 배치에서 제거 (빈 슬롯은 다음 스텝에 재사용)"""
+        keep = []
+        for row, request in enumerate(self._active):
+            if self._is_finished(request):
+                text = request.text if (request.stop or request.stream is not None) else self._decode(request)
+                request.finish(text.rstrip("\ufffd"))
+                self.completed += 1
+                self.stopped_early += request.stopped
+                self.cancelled += request.cancelled
+            else:
+                keep.append(row)
+
+        if len(keep) == len(self._active):
+            return
+        if not keep:
+            self._reset()
+            return
+
+        index = torch.tensor(keep, dtype=torch.long, device=self._attention_mask.device)
+        attention_mask = self._attention_mask.index_select(0, index)
+
+        # 남은 시퀀스 모두가 패딩인 앞쪽 열은 잘라내 캐시 길이를 줄임
+        leading = int((attention_mask.sum(0) == 0).long().cumprod(0).sum())
+
+        self._cache = tuple(
+            (k.index_select(0, index.to(k.device))[:, :, leading:], v.index_select(0, index.to(v.device))[:, :, leading:])
+            for k, v in self._cache
+        )
+        self._attention_mask = attention_mask[:, leading:]
+        self._positions = self._positions.index_select(0, index)
+        self._next_tokens = self._next_tokens.index_select(0, index)
+        self._active = [self._active[row] for row in keep]
+
+    def _reset(self):
+        self._active = []
+        self._cache = None
+        self._attention_mask = None
+        self._positions = None
+        self._next_tokens = None
+
+    def get_stats(self):
+        return {
+            "queue_depth": self._waiting.qsize(),
+            "active_sequences": len(self._active),
+            "max_batch_size": self.max_batch_size,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "num_threads": self.num_threads,
+            "decode_steps": self.steps,
+            "prefill_batches": self.prefill_batches,
+            "completed": self.completed,
+            "avg_batch_size": round(self.step_batch_size_sum / self.steps, 2) if self.steps else 0.0,
+            "max_observed_batch": self.max_observed_batch,
+            "stopped_early": self.stopped_early,
+            "cancelled": self.cancelled,
+            "stop_sequences": list(self.stop_sequences),
+            "prefix_cache": self.prefix_cache.get_stats()
+        }
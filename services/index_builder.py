@@ -0,0 +1,323 @@
+"""
+인덱스 빌드 스크립트
+
+사용법:
+    python -m services.index_builder build         # game.json / chunked_game_rules.json에서 모든 인덱스와 코퍼스 저장소 생성 (변경분만 재임베딩)
+    python -m services.index_builder build --full  # 매니페스트를 무시하고 전체 재임베딩
+    python -m services.index_builder build --index-type hnsw --index-params '{"M": 32}'  # 추천 인덱스 타입 지정
+    python -m services.index_builder consolidate   # 게임별 룰 인덱스를 하나의 통합 인덱스로 병합
+"""
+
+import os
+import json
+import hashlib
+import argparse
+import logging
+
+import faiss
+import numpy as np
+
+from services.ann_index import INDEX_TYPES, build_index
+from services.corpus_store import CORPUS_PATH, write_corpus
+from services.game_attributes import ATTRIBUTES_PATH, write_attributes
+from services.similar_games import SIMILAR_PATH, build_similar_table
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = "data"
+GAME_VECTOR_BASE_PATH = os.path.join(DATA_DIR, "game_data", "game_data")
+RULES_INDEX_PATH = os.path.join(DATA_DIR, "rules_index.faiss")
+RULES_TABLE_PATH = os.path.join(DATA_DIR, "rules_table.json")
+GAME_JSON_PATH = os.path.join(DATA_DIR, "game.json")
+CHUNKED_RULES_PATH = os.path.join(DATA_DIR, "chunked_game_rules.json")
+GAME_INDEX_PATH = os.path.join(DATA_DIR, "game_index.faiss")
+GAME_VECTORS_PATH = os.path.join(DATA_DIR, "game_vectors.npy")  # 압축 인덱스와 별도로 보관하는 원본 벡터
+TEXTS_PATH = os.path.join(DATA_DIR, "texts.json")
+GAME_NAMES_PATH = os.path.join(DATA_DIR, "game_names.json")
+MANIFEST_PATH = os.path.join(DATA_DIR, "index_manifest.json")
+
+EMBED_MODEL_NAME = "BAAI/bge-m3"
+
+# 벡터 ID = game_id * GAME_ID_STRIDE + 게임 내 청크 번호
+GAME_ID_STRIDE = 1 << 16
+
+
+def _atomic_write_json(path, obj):
+    """임시 파일에 쓴 뒤 os.replace로 교체 (중간에 실패해도 기존 파일 유지)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _atomic_write_npy(path, array):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_path, path)
+
+
+def _atomic_write_index(index, path):
+    tmp_path = f"{path}.tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _content_hash(obj):
+    return hashlib.sha256(json.dumps(obj, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _display_names(game_data):
+    """파일 이름(공백→'_')을 game.json의 원래 게임 이름으로 매핑"""
+    return {game["game_name"].replace(" ", "_"): game["game_name"] for game in game_data if game.get("game_name")}
+
+
+def write_rules_index(game_entries, index_path=RULES_INDEX_PATH, table_path=RULES_TABLE_PATH):
+    """
+    (key, display_name, vectors, chunks) 목록으로 통합 인덱스와 게임 테이블을 기록.
+    벡터에는 게임 ID가 인코딩된 ID가 붙고, 청크 텍스트는 테이블에 넣지 않고 코퍼스 저장소(key별 룰 청크)에서 읽습니다.
+    """
+    dim = None
+    games, all_chunks, all_vectors, all_ids = [], [], [], []
+
+    for game_id, (key, display_name, vectors, chunks) in enumerate(game_entries):
+        if len(chunks) >= GAME_ID_STRIDE:
+            raise ValueError(f"'{key}' 게임의 청크 수가 너무 많습니다: {len(chunks)}")
+        vectors = np.asarray(vectors, dtype="float32")
+        dim = dim or vectors.shape[1]
+
+        start = len(all_chunks)
+        all_chunks.extend(chunks)
+        all_vectors.append(vectors)
+        all_ids.append(game_id * GAME_ID_STRIDE + np.arange(len(chunks), dtype="int64"))
+        games.append({
+            "game_id": game_id,
+            "key": key,
+            "game_name": display_name,
+            "start": start,
+            "end": len(all_chunks)
+        })
+
+    index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+    index.add_with_ids(np.vstack(all_vectors), np.concatenate(all_ids))
+
+    _atomic_write_index(index, index_path)
+    _atomic_write_json(table_path, {
+        "version": 3,
+        "dim": dim,
+        "id_stride": GAME_ID_STRIDE,
+        "games": games
+    })
+    logger.info(f"✅ 통합 룰 인덱스 저장 완료: 게임 {len(games)}개, 청크 {len(all_chunks)}개 → {index_path}")
+
+
+def consolidate_rule_indexes(base_path=GAME_VECTOR_BASE_PATH, index_path=RULES_INDEX_PATH,
+                             table_path=RULES_TABLE_PATH, game_json_path=GAME_JSON_PATH, corpus_path=CORPUS_PATH):
+    """기존 게임별 .faiss/.json 파일을 읽어 하나의 통합 인덱스로 병합하고, 같은 청크로 코퍼스 저장소를 다시 기록"""
+    game_data = []
+    if os.path.exists(game_json_path):
+        with open(game_json_path, "r", encoding="utf-8") as f:
+            game_data = json.load(f)
+    display_names = _display_names(game_data)
+
+    entries = []
+    for file_name in sorted(os.listdir(base_path)):
+        key, ext = os.path.splitext(file_name)
+        chunks_path = os.path.join(base_path, f"{key}.json")
+        if ext != ".faiss" or not os.path.exists(chunks_path):
+            continue
+
+        index = faiss.read_index(os.path.join(base_path, file_name))
+        with open(chunks_path, "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+        if index.ntotal != len(chunks):
+            logger.warning(f"⚠️ '{key}' 벡터 수({index.ntotal})와 청크 수({len(chunks)})가 달라 건너뜁니다.")
+            continue
+
+        entries.append((key, display_names.get(key, key.replace("_", " ")), index.reconstruct_n(0, index.ntotal), chunks))
+
+    write_rules_index(entries, index_path, table_path)
+    if not game_data:
+        logger.warning(f"⚠️ '{game_json_path}'이 없어 코퍼스 저장소를 만들지 못했습니다. 통합 룰 인덱스의 청크는 코퍼스 저장소에서 읽습니다.")
+        return
+    # 통합 인덱스의 청크 텍스트는 코퍼스 저장소에서 읽으므로 인덱스와 같은 게임별 청크로 기록
+    write_corpus(corpus_path, game_data, {key: {"game_name": name, "chunks": chunks} for key, name, _, chunks in entries})
+
+
+def _load_manifest(path, model_name):
+    """이전 빌드 매니페스트 로드. 모델이 바뀌었으면 재사용하지 않음"""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("model") != model_name:
+        logger.info(f"ℹ️ 임베딩 모델이 변경되어 전체 재임베딩합니다: {manifest.get('model')} → {model_name}")
+        return None
+    return manifest
+
+
+class _Encoder:
+    """bge-m3 모델 지연 로드 + 배치 인코딩 (재사용할 벡터만 있으면 모델을 아예 로드하지 않음)"""
+
+    def __init__(self, model_name, batch_size):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = None
+        self.encoded = 0
+
+    def encode(self, texts):
+        if self.model is None:
+            from services.embedding_backend import load_embedding_model
+            logger.info(f"📥 임베딩 모델 로드 중: {self.model_name}")
+            # 코퍼스 벡터는 기준 품질(fp32, 전체 길이)로 만들어야 하므로 양자화/길이 제한 없이 로드
+            self.model, _ = load_embedding_model(self.model_name, quantize="none", max_seq_length=0)
+
+        self.encoded += len(texts)
+        vectors = self.model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True,
+                                    show_progress_bar=len(texts) > self.batch_size)
+        return np.asarray(vectors, dtype="float32")
+
+
+def _load_previous_vectors(previous):
+    """이전 빌드의 원본 벡터 (game_vectors.npy, 없으면 flat 인덱스에서 복원)"""
+    old_spec = previous.get("recommendation", {})
+    old_hashes = old_spec.get("hashes", [])
+    if os.path.exists(GAME_VECTORS_PATH):
+        old_vectors = np.load(GAME_VECTORS_PATH)
+    elif os.path.exists(GAME_INDEX_PATH) and old_spec.get("index_type", "flat") == "flat":
+        old_index = faiss.read_index(GAME_INDEX_PATH)
+        old_vectors = old_index.reconstruct_n(0, old_index.ntotal)
+    else:
+        return {}
+    if len(old_vectors) != len(old_hashes):
+        return {}
+    return {h: old_vectors[i] for i, h in enumerate(old_hashes)}
+
+
+def _build_recommendation_index(game_data, previous, encoder, index_type="flat", index_params=None):
+    """game.json 순서대로 game_index.faiss / game_vectors.npy / texts.json / game_names.json 생성"""
+    texts = [game.get("text", "") for game in game_data]
+    names = [game.get("game_name", "") for game in game_data]
+    hashes = [_content_hash([name, text]) for name, text in zip(names, texts)]
+
+    # 이전 빌드에서 같은 내용의 벡터는 재사용 (인덱스 타입만 바뀐 경우도 재임베딩하지 않음)
+    reusable = _load_previous_vectors(previous) if previous else {}
+
+    to_encode = [i for i, h in enumerate(hashes) if h not in reusable]
+    encoded = dict(zip(to_encode, encoder.encode([texts[i] for i in to_encode]))) if to_encode else {}
+    vectors = np.vstack([encoded[i] if i in encoded else reusable[h] for i, h in enumerate(hashes)]).astype("float32")
+
+    index, used_params = build_index(vectors, index_type, index_params)
+    _atomic_write_npy(GAME_VECTORS_PATH, vectors)
+    _atomic_write_index(index, GAME_INDEX_PATH)
+    _atomic_write_json(TEXTS_PATH, texts)
+    _atomic_write_json(GAME_NAMES_PATH, names)
+
+    logger.info(f"✅ 추천 인덱스({index_type}) 저장: {len(hashes)}개 중 {len(to_encode)}개 재임베딩")
+    return {"hashes": hashes, "index_type": index_type, "index_params": used_params}
+
+
+def _build_rule_indexes(chunked_rules, display_names, previous, encoder):
+    """chunked_game_rules.json에서 게임별 룰 인덱스와 통합 룰 인덱스 생성"""
+    old_hashes = previous.get("rules", {}) if previous else {}
+    os.makedirs(GAME_VECTOR_BASE_PATH, exist_ok=True)
+
+    pending, entries, hashes = [], [], {}
+    for name in sorted(chunked_rules):
+        chunks = [chunk for chunk in chunked_rules[name].get("chunks", []) if chunk.strip()]
+        if not chunks:
+            continue
+        key = name.replace(" ", "_")
+        hashes[key] = _content_hash(chunks)
+
+        index_path = os.path.join(GAME_VECTOR_BASE_PATH, f"{key}.faiss")
+        vectors = None
+        if old_hashes.get(key) == hashes[key] and os.path.exists(index_path):
+            old_index = faiss.read_index(index_path)
+            if old_index.ntotal == len(chunks):
+                vectors = old_index.reconstruct_n(0, old_index.ntotal)
+        if vectors is None:
+            pending.append(len(entries))
+        entries.append([key, display_names.get(key, name), vectors, chunks])
+
+    # 변경된 게임의 청크만 모아서 한 번에 배치 인코딩
+    if pending:
+        flat_chunks = [chunk for i in pending for chunk in entries[i][3]]
+        flat_vectors = encoder.encode(flat_chunks)
+        offset = 0
+        for i in pending:
+            n = len(entries[i][3])
+            entries[i][2] = flat_vectors[offset:offset + n]
+            offset += n
+
+    for i in pending:
+        key, _, vectors, chunks = entries[i]
+        index = faiss.IndexFlatIP(vectors.shape[1])
+        index.add(vectors)
+        _atomic_write_index(index, os.path.join(GAME_VECTOR_BASE_PATH, f"{key}.faiss"))
+        _atomic_write_json(os.path.join(GAME_VECTOR_BASE_PATH, f"{key}.json"), chunks)
+
+    # 원본에서 사라진 게임의 파일 정리
+    for key in set(old_hashes) - set(hashes):
+        for ext in (".faiss", ".json"):
+            stale_path = os.path.join(GAME_VECTOR_BASE_PATH, f"{key}{ext}")
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+
+    write_rules_index([tuple(entry) for entry in entries])
+    logger.info(f"✅ 룰 인덱스 저장: 게임 {len(entries)}개 중 {len(pending)}개 재임베딩")
+    return hashes
+
+
+def build_indexes(full=False, model_name=EMBED_MODEL_NAME, batch_size=64, index_type="flat", index_params=None):
+    """
+    game.json / chunked_game_rules.json으로부터 모든 인덱스 산출물을 생성.
+    매니페스트의 콘텐츠 해시와 비교해 내용이 바뀐 게임만 재임베딩합니다.
+    """
+    with open(GAME_JSON_PATH, "r", encoding="utf-8") as f:
+        game_data = json.load(f)
+    with open(CHUNKED_RULES_PATH, "r", encoding="utf-8") as f:
+        chunked_rules = json.load(f)
+
+    previous = None if full else _load_manifest(MANIFEST_PATH, model_name)
+    encoder = _Encoder(model_name, batch_size)
+    display_names = _display_names(game_data)
+
+    manifest = {
+        "version": 1,
+        "model": model_name,
+        "recommendation": _build_recommendation_index(game_data, previous, encoder, index_type, index_params),
+        "rules": _build_rule_indexes(chunked_rules, display_names, previous, encoder)
+    }
+    # 서버가 JSON 코퍼스 대신 mmap으로 여는 바이너리 저장소 (추천 인덱스와 같은 game.json 순서)
+    write_corpus(CORPUS_PATH, game_data, chunked_rules)
+    # 추천 사전 필터링용 속성 컬럼 (같은 game.json 순서)
+    write_attributes(ATTRIBUTES_PATH, game_data)
+    # 비슷한 게임 이웃 테이블 (벡터가 바뀐 게임만 다시 계산)
+    build_similar_table(SIMILAR_PATH, GAME_INDEX_PATH)
+    # 매니페스트는 모든 산출물을 쓴 뒤 마지막에 기록 (중간 실패 시 다음 빌드에서 다시 임베딩)
+    _atomic_write_json(MANIFEST_PATH, manifest)
+    logger.info(f"🎉 인덱스 빌드 완료 (총 {encoder.encoded}개 텍스트 임베딩)")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="보드게임 인덱스 빌드")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="원본 데이터에서 모든 인덱스 생성 (변경분만 재임베딩)")
+    build_parser.add_argument("--full", action="store_true", help="매니페스트를 무시하고 전체 재임베딩")
+    build_parser.add_argument("--batch-size", type=int, default=64)
+    build_parser.add_argument("--index-type", default="flat", choices=INDEX_TYPES, help="추천 인덱스 타입")
+    build_parser.add_argument("--index-params", default="{}", help='인덱스 파라미터 JSON, 예: \'{"M": 32, "ef_search": 64}\'')
+    subparsers.add_parser("consolidate", help="게임별 룰 인덱스를 통합 인덱스로 병합")
+
+    args = parser.parse_args()
+    if args.command == "build":
+        build_indexes(full=args.full, batch_size=args.batch_size,
+                      index_type=args.index_type, index_params=json.loads(args.index_params))
+    elif args.command == "consolidate":
+        consolidate_rule_indexes()
+
+
+if __name__ == "__main__":
+    main()
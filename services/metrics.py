@@ -0,0 +1,202 @@
+"""
+Prometheus 텍스트 형식 메트릭 (외부 의존성 없이 카운터/게이지/히스토그램만 구현)
+
+요청 처리 단계별 지연시간은 STAGE_LATENCY 히스토그램에 (service, stage) 라벨로 기록하고,
+캐시/큐처럼 이미 각 서비스가 get_stats()로 집계하는 값은 스크레이프 시점에 collector로 읽어 내보냅니다.
+"""
+
+import abc
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# 지연시간 버킷 (초): 임베딩/검색의 ms 단위부터 LLM/생성의 수십 초까지
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(abc.ABC):
+    type_name = "untyped"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 라벨은 {self.labelnames} 이어야 합니다: {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abc.abstractmethod
+    def _samples(self):
+        """[(이름 접미사, 라벨 dict, 값)] 목록"""
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for suffix, labels, value in self._samples():
+            lines.append(f"{self.name}{suffix}{format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        # 카운터 이름은 _total 없이 선언하고 샘플에 붙임 (Prometheus 규칙)
+        return [("_total", dict(zip(self.labelnames, key)), value) for key, value in items]
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """블록 실행 동안 1 증가 (진행 중 요청 수 등)"""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [("", dict(zip(self.labelnames, key)), value) for key, value in items]
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """with 블록(내부 await 포함)의 경과 시간을 기록"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+
+        samples = []
+        for key, (counts, total, count) in items:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for upper, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                samples.append(("_bucket", {**labels, "le": _format_value(float(upper))}, cumulative))
+            samples.append(("_sum", labels, total))
+            samples.append(("_count", labels, count))
+        return samples
+
+
+class MetricsRegistry:
+    """등록된 메트릭과 collector 결과를 Prometheus 텍스트 형식으로 출력"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """collect() -> [(name, type, help, [(labels dict, value)])], 스크레이프마다 호출"""
+        self._collectors.append(collect)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            for name, type_name, documentation, samples in collect():
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {type_name}")
+                sample_name = name + "_total" if type_name == "counter" else name
+                for labels, value in samples:
+                    lines.append(f"{sample_name}{format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# 서비스 내부 단계별 지연시간 (rag: index_load/embed/search/context_pack/llm/llm_first_token/postprocess,
+# finetuning: model_load/queue_wait/prefill/decode_step/generate)
+STAGE_LATENCY = REGISTRY.register(Histogram(
+    "bovi_stage_latency_seconds", "Latency of internal processing stages", ["service", "stage"]
+))
+
+# HTTP 엔드포인트 단위
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "bovi_request_duration_seconds", "HTTP request latency by endpoint", ["endpoint"]
+))
+REQUESTS = REGISTRY.register(Counter(
+    "bovi_requests", "HTTP requests by endpoint and status code", ["endpoint", "status"]
+))
+IN_FLIGHT = REGISTRY.register(Gauge(
+    "bovi_requests_in_flight", "HTTP requests currently being processed", ["endpoint"]
+))
+
+# 서비스가 오류를 응답 문자열로 바꿔 200으로 돌려주는 경우도 포함
+ERRORS = REGISTRY.register(Counter(
+    "bovi_errors", "Errors caught inside services", ["service", "operation"]
+))
+FALLBACKS = REGISTRY.register(Counter(
+    "bovi_fallbacks", "Requests or loads served by a fallback path", ["kind"]
+))
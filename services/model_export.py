@@ -0,0 +1,363 @@
+"""
+파인튜닝 모델 병합 스냅샷 export / 로드 경로 비교 벤치마크
+
+LoRA 어댑터(query_key_value, dense, r=8)를 base 모델 가중치에 병합해 로컬 safetensors 스냅샷으로 저장합니다.
+서버는 스냅샷이 있으면 네트워크 없이 mmap으로 로드하고 fast tokenizer(tokenizer.json)를 사용하므로,
+매 forward마다 어댑터 연산을 거치지 않고 base 모델 다운로드도 하지 않습니다.
+
+사용법:
+    python -m services.model_export merge                          # → models/koalpaca-bang-merged
+    python -m services.model_export merge --output /workspace/merged --adapter minjeongHuggingFace/koalpaca-bang_e9
+    python -m services.model_export benchmark --output model_bench.json   # 어댑터 경로 vs 병합 스냅샷 비교
+    python -m services.model_export cpu-benchmark --modes fp16,bf16,int8 --threads 8   # CPU 추론 모드 비교
+
+CPU 추론 환경변수:
+    FINETUNING_DEVICE        auto | cuda | cpu  (기본 auto: CUDA가 있으면 cuda)
+    FINETUNING_CPU_DTYPE     bf16 | int8 | fp32 | fp16 (기본 bf16, int8은 Linear 레이어 동적 양자화)
+    FINETUNING_NUM_THREADS   생성 워커 스레드의 intra-op 스레드 수 (기본: torch 기본값)
+"""
+
+import os
+import gc
+import json
+import time
+import argparse
+import logging
+import multiprocessing
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+BASE_MODEL_NAME = "beomi/KoAlpaca-Polyglot-5.8B"
+MERGED_MODEL_PATH = "models/koalpaca-bang-merged"
+LOCAL_TOKENIZER_PATH = "2koalpaca-bang-model"  # 어댑터와 함께 배포된 fast tokenizer (tokenizer.json)
+ADAPTER_REVISION = "master"
+CPU_DTYPES = ("bf16", "int8", "fp32", "fp16")
+
+BENCHMARK_PROMPTS = [
+    "이 질문은 '뱅'이라는 보드게임에 대한 것이다.\n### 질문: 보안관은 어떻게 승리하나요?",
+    "이 질문은 '스플렌더'라는 보드게임에 대한 것이다.\n### 질문: 귀족 타일은 언제 가져오나요?",
+    "이 질문은 '카탄'이라는 보드게임에 대한 것이다.\n### 질문: 도둑은 언제 움직이나요?"
+]
+
+
+def is_merged_snapshot(path):
+    """병합 스냅샷 디렉터리인지 (config + safetensors 가중치 + 토크나이저)"""
+    if not path or not os.path.isdir(path):
+        return False
+    files = os.listdir(path)
+    return "config.json" in files and "tokenizer.json" in files and any(f.endswith(".safetensors") for f in files)
+
+
+def resolve_device(device=None):
+    """FINETUNING_DEVICE 또는 CUDA 사용 가능 여부로 생성 디바이스 결정"""
+    device = (device or os.getenv("FINETUNING_DEVICE", "auto")).lower()
+    if device == "auto":
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    if device.startswith("cuda") and not torch.cuda.is_available():
+        logger.warning("⚠️ CUDA를 사용할 수 없어 CPU에서 생성합니다.")
+        return "cpu"
+    return device
+
+
+def resolve_cpu_dtype(cpu_dtype=None):
+    cpu_dtype = (cpu_dtype or os.getenv("FINETUNING_CPU_DTYPE", "bf16")).lower()
+    if cpu_dtype not in CPU_DTYPES:
+        raise ValueError(f"지원하지 않는 FINETUNING_CPU_DTYPE: {cpu_dtype} ({', '.join(CPU_DTYPES)})")
+    return cpu_dtype
+
+
+def load_options(device, cpu_dtype="bf16"):
+    """from_pretrained에 넘길 device_map / torch_dtype"""
+    if device != "cpu":
+        return {"device_map": "auto", "torch_dtype": torch.float16}
+    # int8은 Linear만 양자화하므로 bf16으로 읽어 로드 중 메모리를 줄이고, 양자화 후 나머지를 fp32로 변환
+    dtype = {"bf16": torch.bfloat16, "int8": torch.bfloat16, "fp32": torch.float32, "fp16": torch.float16}[cpu_dtype]
+    return {"device_map": {"": "cpu"}, "torch_dtype": dtype}
+
+
+def prepare_cpu_model(model, cpu_dtype):
+    """CPU 추론용 후처리. int8이면 Linear 가중치를 int8로, 활성값은 실행 시 동적으로 양자화 (fp32로 실행)"""
+    if cpu_dtype == "int8":
+        torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        model.float()
+    return model
+
+
+def load_tokenizer(source, use_fast=True, local_files_only=False):
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(
+        source, use_fast=use_fast, trust_remote_code=True, local_files_only=local_files_only
+    )
+    if tokenizer.pad_token_id is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    return tokenizer
+
+
+def load_merged_model(path, device_map="auto", torch_dtype=torch.float16):
+    """로컬 병합 스냅샷 로드 (네트워크 없음, safetensors는 mmap으로 필요한 텐서만 읽음)"""
+    from transformers import AutoModelForCausalLM
+
+    model = AutoModelForCausalLM.from_pretrained(
+        path,
+        device_map=device_map,
+        torch_dtype=torch_dtype,
+        low_cpu_mem_usage=True,
+        use_safetensors=True,
+        local_files_only=True,
+        trust_remote_code=True
+    )
+    tokenizer = load_tokenizer(path, use_fast=True, local_files_only=True)
+    return model, tokenizer
+
+
+def load_adapter_model(adapter, base_model_name=BASE_MODEL_NAME, revision=ADAPTER_REVISION,
+                       device_map="auto", torch_dtype=torch.float16):
+    """base 모델 + PEFT 어댑터 (기존 서비스 로드 경로)"""
+    from transformers import AutoModelForCausalLM
+    from peft import PeftModel
+
+    base_model = AutoModelForCausalLM.from_pretrained(
+        base_model_name, device_map=device_map, torch_dtype=torch_dtype, low_cpu_mem_usage=True, trust_remote_code=True
+    )
+    return PeftModel.from_pretrained(base_model, adapter, revision=revision, torch_dtype=torch_dtype)
+
+
+def merge_adapter(adapter, output_path=MERGED_MODEL_PATH, base_model_name=BASE_MODEL_NAME,
+                  revision=ADAPTER_REVISION, tokenizer_source=None, max_shard_size="2GB"):
+    """어댑터를 base 가중치에 병합해 safetensors 스냅샷과 fast tokenizer를 output_path에 저장"""
+    start = time.perf_counter()
+    logger.info(f"📥 base 모델 + 어댑터 로드: {base_model_name} + {adapter} (revision: {revision})")
+
+    # 병합은 CPU에서 fp16으로 수행 (GPU 없이도 export 가능)
+    model = load_adapter_model(adapter, base_model_name, revision, device_map={"": "cpu"})
+    merged = model.merge_and_unload()
+
+    os.makedirs(output_path, exist_ok=True)
+    merged.save_pretrained(output_path, safe_serialization=True, max_shard_size=max_shard_size)
+
+    if tokenizer_source is None:
+        tokenizer_source = LOCAL_TOKENIZER_PATH if os.path.exists(os.path.join(LOCAL_TOKENIZER_PATH, "tokenizer.json")) \
+            else base_model_name
+    tokenizer = load_tokenizer(tokenizer_source, use_fast=True)
+    if not tokenizer.is_fast:
+        raise RuntimeError(f"fast tokenizer를 만들 수 없습니다: {tokenizer_source}")
+    tokenizer.save_pretrained(output_path)
+
+    info = {
+        "base_model": base_model_name,
+        "adapter": adapter,
+        "adapter_revision": revision,
+        "tokenizer_source": tokenizer_source,
+        "dtype": "float16",
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "export_seconds": round(time.perf_counter() - start, 1)
+    }
+    with open(os.path.join(output_path, "export_info.json"), "w", encoding="utf-8") as f:
+        json.dump(info, f, ensure_ascii=False, indent=2)
+
+    logger.info(f"✅ 병합 스냅샷 저장 완료: {output_path} ({info['export_seconds']}초)")
+    return info
+
+
+def _sync():
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+
+
+def measure_generation(model, tokenizer, prompts=BENCHMARK_PROMPTS, max_new_tokens=64, repeats=2):
+    """greedy 생성 tokens/sec와 토크나이저 인코딩 시간 측정 (첫 회는 워밍업으로 제외)"""
+    device = next(model.parameters()).device
+
+    start = time.perf_counter()
+    for _ in range(100):
+        for prompt in prompts:
+            tokenizer(prompt)
+    tokenize_ms = (time.perf_counter() - start) * 1000 / (100 * len(prompts))
+
+    generated_tokens = 0
+    elapsed = 0.0
+    with torch.no_grad():
+        for attempt in range(repeats + 1):
+            for prompt in prompts:
+                inputs = tokenizer(prompt, return_tensors="pt").to(device)
+                inputs.pop("token_type_ids", None)
+                _sync()
+                t0 = time.perf_counter()
+                output = model.generate(
+                    **inputs, max_new_tokens=max_new_tokens, min_new_tokens=max_new_tokens,
+                    do_sample=False, pad_token_id=tokenizer.pad_token_id
+                )
+                _sync()
+                if attempt == 0:
+                    continue
+                elapsed += time.perf_counter() - t0
+                generated_tokens += output.shape[1] - inputs["input_ids"].shape[1]
+
+    return {
+        "tokens_per_second": round(generated_tokens / elapsed, 2) if elapsed else 0.0,
+        "generated_tokens": generated_tokens,
+        "tokenize_ms_per_prompt": round(tokenize_ms, 4)
+    }
+
+
+def run_benchmark(adapter, merged_path=MERGED_MODEL_PATH, max_new_tokens=64):
+    """기존 경로(base + 어댑터, slow tokenizer)와 병합 스냅샷(fast tokenizer)의 로드 시간/생성 속도 비교"""
+    results = []
+
+    loaders = [
+        ("adapter", lambda: (load_adapter_model(adapter), load_tokenizer(BASE_MODEL_NAME, use_fast=False))),
+        ("merged", lambda: load_merged_model(merged_path))
+    ]
+    for name, load in loaders:
+        if name == "merged" and not is_merged_snapshot(merged_path):
+            logger.warning(f"⚠️ 병합 스냅샷이 없어 건너뜁니다: {merged_path} (먼저 merge 실행)")
+            continue
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        start = time.perf_counter()
+        model, tokenizer = load()
+        model.eval()
+        load_seconds = time.perf_counter() - start
+
+        result = {"path": name, "load_seconds": round(load_seconds, 2), "fast_tokenizer": tokenizer.is_fast}
+        result.update(measure_generation(model, tokenizer, max_new_tokens=max_new_tokens))
+        results.append(result)
+        logger.info(f"📊 {name}: {result}")
+        del model, tokenizer
+
+    return {
+        "device": "cuda" if torch.cuda.is_available() else "cpu",
+        "max_new_tokens": max_new_tokens,
+        "results": results
+    }
+
+
+def _peak_rss_bytes():
+    """현재 프로세스의 최대 RSS (Linux VmHWM, 없으면 현재 RSS)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import psutil
+    return psutil.Process().memory_info().rss
+
+
+def _cpu_benchmark_mode(mode, merged_path, adapter, num_threads, max_new_tokens):
+    """CPU에서 한 모드로 로드해 로드 시간/tokens/sec/최대 RSS 측정 (모드마다 새 프로세스에서 실행)"""
+    if num_threads:
+        torch.set_num_threads(num_threads)
+
+    start = time.perf_counter()
+    options = load_options("cpu", mode)
+    if is_merged_snapshot(merged_path):
+        model, tokenizer = load_merged_model(merged_path, **options)
+    else:
+        model = load_adapter_model(adapter, **options).merge_and_unload()
+        tokenizer = load_tokenizer(BASE_MODEL_NAME, use_fast=False)
+    model = prepare_cpu_model(model, mode)
+    model.eval()
+    load_seconds = time.perf_counter() - start
+    load_peak = _peak_rss_bytes()
+
+    result = {
+        "mode": mode,
+        "num_threads": torch.get_num_threads(),
+        "load_seconds": round(load_seconds, 2),
+        "peak_rss_after_load_mb": round(load_peak / 1024 / 1024, 1)
+    }
+    result.update(measure_generation(model, tokenizer, max_new_tokens=max_new_tokens, repeats=1))
+    result["peak_rss_mb"] = round(_peak_rss_bytes() / 1024 / 1024, 1)
+    return result
+
+
+def run_cpu_benchmark(modes, merged_path=MERGED_MODEL_PATH, adapter=None, num_threads=None, max_new_tokens=32):
+    """CPU 추론 모드별 비교 (fp16이 기존 로드 방식 기준선). 최대 RSS가 섞이지 않도록 모드마다 별도 프로세스"""
+    if not is_merged_snapshot(merged_path) and not adapter:
+        raise ValueError("병합 스냅샷이 없으면 --adapter 또는 FINETUNING_MODEL_ID가 필요합니다.")
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for mode in modes:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            result = executor.submit(
+                _cpu_benchmark_mode, mode, merged_path, adapter, num_threads, max_new_tokens
+            ).result()
+        results.append(result)
+        logger.info(f"📊 cpu/{mode}: {result}")
+
+    baseline = next((r for r in results if r["mode"] == "fp16"), None)
+    if baseline and baseline["tokens_per_second"]:
+        for result in results:
+            result["speedup_vs_fp16"] = round(result["tokens_per_second"] / baseline["tokens_per_second"], 2)
+            result["memory_vs_fp16"] = round(result["peak_rss_mb"] / baseline["peak_rss_mb"], 2)
+
+    return {
+        "device": "cpu",
+        "cpu_count": os.cpu_count(),
+        "source": "merged" if is_merged_snapshot(merged_path) else "adapter",
+        "max_new_tokens": max_new_tokens,
+        "results": results
+    }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="파인튜닝 모델 병합 스냅샷 관리")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    merge_parser = subparsers.add_parser("merge", help="LoRA 어댑터를 base 가중치에 병합해 로컬 스냅샷 저장")
+    merge_parser.add_argument("--adapter", default=os.getenv("FINETUNING_MODEL_ID"))
+    merge_parser.add_argument("--revision", default=ADAPTER_REVISION)
+    merge_parser.add_argument("--base-model", default=os.getenv("BASE_MODEL_ID", BASE_MODEL_NAME))
+    merge_parser.add_argument("--output", default=os.getenv("FINETUNED_MERGED_PATH", MERGED_MODEL_PATH))
+    merge_parser.add_argument("--tokenizer", help="fast tokenizer 경로 (기본: 2koalpaca-bang-model)")
+
+    bench_parser = subparsers.add_parser("benchmark", help="어댑터 경로 vs 병합 스냅샷 로드 시간/tokens/sec 비교")
+    bench_parser.add_argument("--adapter", default=os.getenv("FINETUNING_MODEL_ID"))
+    bench_parser.add_argument("--merged", default=os.getenv("FINETUNED_MERGED_PATH", MERGED_MODEL_PATH))
+    bench_parser.add_argument("--max-new-tokens", type=int, default=64)
+    bench_parser.add_argument("--output", help="결과 JSON 저장 경로")
+
+    cpu_parser = subparsers.add_parser("cpu-benchmark", help="CPU 추론 모드별 로드 시간/tokens/sec/최대 RSS 비교")
+    cpu_parser.add_argument("--modes", default="fp16,bf16,int8", help=f"쉼표 구분 ({', '.join(CPU_DTYPES)})")
+    cpu_parser.add_argument("--adapter", default=os.getenv("FINETUNING_MODEL_ID"), help="병합 스냅샷이 없을 때 사용")
+    cpu_parser.add_argument("--merged", default=os.getenv("FINETUNED_MERGED_PATH", MERGED_MODEL_PATH))
+    cpu_parser.add_argument("--threads", type=int, default=None, help="intra-op 스레드 수 (기본: torch 기본값)")
+    cpu_parser.add_argument("--max-new-tokens", type=int, default=32)
+    cpu_parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    if args.command != "cpu-benchmark" and not args.adapter:
+        parser.error("--adapter 또는 FINETUNING_MODEL_ID가 필요합니다.")
+
+    report = None
+    if args.command == "merge":
+        merge_adapter(args.adapter, args.output, args.base_model, args.revision, args.tokenizer)
+    elif args.command == "benchmark":
+        report = run_benchmark(args.adapter, args.merged, args.max_new_tokens)
+    elif args.command == "cpu-benchmark":
+        modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+        unknown = set(modes) - set(CPU_DTYPES)
+        if unknown:
+            parser.error(f"지원하지 않는 모드: {', '.join(sorted(unknown))}")
+        report = run_cpu_benchmark(modes, args.merged, args.adapter, args.threads, args.max_new_tokens)
+
+    if report is not None:
+        text = json.dumps(report, ensure_ascii=False, indent=2)
+        print(text)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import os
+import re
+import json
+import logging
+import unicodedata
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+# 공백, '_', 구두점 등은 이름 비교에서 무시
+_IGNORED_CHARS = re.compile(r"[\s_\-·:'\".,!?()\[\]]+")
+
+# 정규화 후 이 길이 이하인 이름은 bigram이 1~3개뿐이라 우연히 겹치기 쉬우므로 더 높은 임계값 적용
+SHORT_NAME_LENGTH = 4
+# "혹시 이 게임인가요?" 후보로 보여줄 최소 유사도
+SUGGEST_MIN_SCORE = 0.4
+
+
+def normalize_name(name: str) -> str:
+    """이름 정규화: NFKC, 소문자, 공백/밑줄/구두점 제거 ('bts 우노' == 'BTS_우노' == 'bts우노')"""
+    return _IGNORED_CHARS.sub("", unicodedata.normalize("NFKC", name).lower())
+
+
+def _ngrams(text, n=2):
+    if len(text) < n:
+        return {text} if text else set()
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class GameNameResolver:
+    """게임 이름 → 정규 게임 ID 해석 인덱스
+
+    1) 정확히 일치  2) 정규화 형태 일치  3) 별칭(data/game_aliases.json)  4) 문자 bigram 유사도(Dice)
+    순서로 찾고, 해석 결과는 메모이즈합니다.
+    유사도 매칭은 1위가 임계값(짧은 이름은 GAME_NAME_FUZZY_SHORT_THRESHOLD)을 넘고 2위 게임보다
+    GAME_NAME_FUZZY_MARGIN 이상 높을 때만 채택하고, 애매하면 None (suggest()로 후보 목록 제공).
+    """
+
+    def __init__(self, canonical_names, aliases=None, fuzzy_threshold=None, memo_size=10000,
+                 short_threshold=None, fuzzy_margin=None):
+        self.fuzzy_threshold = fuzzy_threshold if fuzzy_threshold is not None else \
+            float(os.getenv("GAME_NAME_FUZZY_THRESHOLD", "0.6"))
+        self.short_threshold = short_threshold if short_threshold is not None else \
+            float(os.getenv("GAME_NAME_FUZZY_SHORT_THRESHOLD", "0.8"))
+        self.fuzzy_margin = fuzzy_margin if fuzzy_margin is not None else \
+            float(os.getenv("GAME_NAME_FUZZY_MARGIN", "0.1"))
+        self.memo_size = memo_size
+
+        self.names = []
+        self._exact = {}
+        self._normalized = {}
+        for name in canonical_names:
+            if not name or name in self._exact or normalize_name(name) in self._normalized:
+                continue
+            game_id = len(self.names)
+            self.names.append(name)
+            self._exact[name] = game_id
+            self._normalized[normalize_name(name)] = game_id
+
+        # 별칭은 대상 이름이 해석될 때만 등록
+        for alias, target in (aliases or {}).items():
+            game_id = self._exact.get(target, self._normalized.get(normalize_name(target)))
+            if game_id is None:
+                logger.warning(f"⚠️ 별칭 대상 게임을 찾을 수 없습니다: {alias} → {target}")
+                continue
+            self._exact.setdefault(alias, game_id)
+            self._normalized.setdefault(normalize_name(alias), game_id)
+
+        # bigram 역색인 (정규화 형태 기준, 별칭 포함)
+        self._gram_index = defaultdict(set)
+        self._gram_counts = {}
+        for normalized, game_id in self._normalized.items():
+            grams = _ngrams(normalized)
+            self._gram_counts[normalized] = (game_id, len(grams))
+            for gram in grams:
+                self._gram_index[gram].add(normalized)
+
+        self._memo = {}
+
+    @classmethod
+    def from_sources(cls, canonical_names, aliases_path="data/game_aliases.json"):
+        aliases = {}
+        if aliases_path and os.path.exists(aliases_path):
+            with open(aliases_path, "r", encoding="utf-8") as f:
+                aliases = json.load(f)
+        return cls(canonical_names, aliases)
+
+    def _fuzzy_scores(self, normalized):
+        """게임 ID별 최고 bigram Dice 유사도 [(score, game_id)], 높은 순 (별칭과 원래 이름은 같은 게임으로 묶음)"""
+        grams = _ngrams(normalized)
+        if not grams:
+            return []
+
+        overlaps = defaultdict(int)
+        for gram in grams:
+            for candidate in self._gram_index.get(gram, ()):
+                overlaps[candidate] += 1
+
+        scores = {}
+        for candidate, overlap in overlaps.items():
+            game_id, count = self._gram_counts[candidate]
+            score = 2 * overlap / (len(grams) + count)
+            if score > scores.get(game_id, 0.0):
+                scores[game_id] = score
+        return sorted(((score, game_id) for game_id, score in scores.items()), key=lambda item: (-item[0], item[1]))
+
+    def _fuzzy(self, normalized):
+        ranked = self._fuzzy_scores(normalized)
+        if not ranked:
+            return None
+
+        threshold = self.short_threshold if len(normalized) <= SHORT_NAME_LENGTH else self.fuzzy_threshold
+        best_score, best_id = ranked[0]
+        runner_up = ranked[1][0] if len(ranked) > 1 else 0.0
+        if best_score < threshold or best_score - runner_up < self.fuzzy_margin:
+            return None
+        return best_id
+
+    def resolve_id(self, name):
+        """정규 게임 ID 반환, 해석할 수 없으면 None"""
+        if not name:
+            return None
+        game_id = self._exact.get(name)
+        if game_id is not None:
+            return game_id
+        if name in self._memo:
+            return self._memo[name]
+
+        normalized = normalize_name(name)
+        game_id = self._normalized.get(normalized)
+        if game_id is None:
+            game_id = self._fuzzy(normalized)
+
+        if len(self._memo) >= self.memo_size:
+            self._memo.clear()
+        self._memo[name] = game_id
+        return game_id
+
+    def resolve(self, name):
+        """정규 게임 이름 반환, 해석할 수 없으면 None"""
+        game_id = self.resolve_id(name)
+        return self.names[game_id] if game_id is not None else None
+
+    def suggest(self, name, limit=3):
+        """해석하지 못한 이름에 대해 "혹시 이 게임인가요?" 후보 이름 목록 (유사도 높은 순)"""
+        if not name:
+            return []
+        ranked = self._fuzzy_scores(normalize_name(name))
+        return [self.names[game_id] for score, game_id in ranked[:limit] if score >= SUGGEST_MIN_SCORE]
+
+    def __len__(self):
+        return len(self.names)
@@ -1,81 +1,188 @@
 import json
+import time
+import asyncio
 import faiss
 import numpy as np
 import os
 import re
 import logging
-from sentence_transformers import SentenceTransformer
 
 from langchain_core.messages import HumanMessage, AIMessage
-from langchain_core.chat_history import BaseChatMessageHistory
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_openai import ChatOpenAI
 from dotenv import load_dotenv
 
+from services.rule_index_registry import RuleIndexRegistry
+from services.rules_index import ConsolidatedRuleIndex
+from services.corpus_store import open_corpus
+from services.embedding_service import EmbeddingService
+from services.summary_store import SummaryStore
+from services.semantic_cache import SemanticAnswerCache
+from services.ann_index import load_index, search_subset
+from services.game_attributes import load_attributes, parse_constraints, rerank, DEFAULT_BOOST
+from services.similar_games import load_similar_games
+from services.name_resolver import GameNameResolver
+from services.session_store import SessionStore, BoundedHistory
+from services.context_packer import pack_context, pack_blocks
+from services.rule_summarizer import RuleTextReducer
+from services.metrics import STAGE_LATENCY, ERRORS, FALLBACKS
+
 logger = logging.getLogger(__name__)
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', '.env'))
 
-# 세션 기반 클래스 메모리 정의 (LangChain용)
-class InMemoryHistory(BaseChatMessageHistory):
-    def __init__(self):
-        self.messages = []
+def _stage(stage):
+    """RAG 처리 단계 지연시간 측정 (/metrics의 bovi_stage_latency_seconds)"""
+    return STAGE_LATENCY.time(service="rag", stage=stage)
+
+
+# 세션 저장소 (LangChain용, 토큰 예산 + LRU/TTL 제거 + 선택적 SQLite 계층)
+session_store = SessionStore()
+def get_session_history_for_rag(session_id: str) -> BoundedHistory:
+    return session_store.get(session_id)
+
+
+# OpenAI 모델 ID (룰 요약 저장소 키에도 사용)
+LLM_MODEL_ID = "gpt-3.5-turbo"
+
+# 룰 요약 프롬프트를 바꾸면 버전을 올려 저장된 요약을 stale로 만듦
+RULE_SUMMARY_PROMPT_VERSION = "v1"
 
-    def add_messages(self, messages):
-        self.messages.extend(messages)
 
-    def clear(self):
-        self.messages = []
+def build_rule_summary_prompt():
+    """룰 요약 프롬프트 (전체 룰 텍스트를 {game_rule_text}로 받음)"""
+    return ChatPromptTemplate.from_messages([
+        (
+            "system",
+            "너는 보드게임 룰 전문 AI야. 반드시 아래 규칙을 따라야 해:\n"
+            "- 사용자가 선택한 보드게임의 룰 전체를 보고, 그 게임의 룰을 알기 쉽게 설명해줘.\n"
+            "- 핵심 개념, 목표, 진행 방식, 승리 조건을 요약해줘.\n"
+            "- 설명은 간결하고 구조적으로 작성해."
+        ),
+        MessagesPlaceholder(variable_name="history"),
+        ("human", "게임 이름: {game_name}\n\n룰 전체:\n{game_rule_text}\n\n이 게임의 룰을 설명해주세요.")
+    ])
 
-    def __repr__(self):
-        return str(self.messages)
 
-# 세션 저장소 (LangChain용)
-store = {}
-def get_session_history_for_rag(session_id: str) -> InMemoryHistory:
-    if session_id not in store:
-        store[session_id] = InMemoryHistory()
-    return store[session_id]
+# 추천 응답 끝을 알리는 마커 (프롬프트에서 마지막 줄에 쓰도록 지시)
+RECOMMENDATION_END_MARKER = "추천 완료!"
+
+
+async def cut_at_marker(stream, marker):
+    """
+    텍스트 스트림에서 marker가 나오기 전까지만 내보냄.
+    마커가 토큰 경계에 걸쳐 나뉠 수 있으므로 마커 길이-1 만큼은 버퍼에 남겨두고,
+    마커 이후 스트림은 (세션 히스토리 기록을 위해) 끝까지 소비하되 내보내지 않음.
+    """
+    buffer = ""
+    found = False
+    async for text in stream:
+        if found:
+            continue
+        buffer += text
+        idx = buffer.find(marker)
+        if idx != -1:
+            found = True
+            if buffer[:idx]:
+                yield buffer[:idx]
+            buffer = ""
+            continue
+        safe = len(buffer) - (len(marker) - 1)
+        if safe > 0:
+            yield buffer[:safe]
+            buffer = buffer[safe:]
+    if buffer:
+        yield buffer
 
 
 class RAGService:
     """RAG 기반 게임 추천 및 룰 설명 서비스"""
     
-    def __init__(self):
+    def __init__(self, embedding_service=None):
         logger.info("🔧 RAG 서비스를 초기화합니다...")
         
-        # 임베딩 모델 로드
-        self.embed_model = SentenceTransformer("BAAI/bge-m3", device="cuda")
-        logger.info("✅ 임베딩 모델 로드 완료")
+        # 임베딩 서비스 (마이크로 배치 + 쿼리 임베딩 캐시), 없으면 직접 생성
+        self.embedding_service = embedding_service or EmbeddingService()
         
         # OpenAI 설정 (LangChain ChatOpenAI 사용)
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
-        self.model_id = "gpt-3.5-turbo" # 파인튜닝 모델 ID
+        self.model_id = LLM_MODEL_ID
         self.llm = ChatOpenAI(model_name=self.model_id, temperature=0.7, openai_api_key=self.openai_api_key)
         
+        # 프롬프트 컨텍스트 토큰 예산 (OpenAI 토크나이저 기준, 점수 순으로 채우고 문장 경계에서 자름)
+        # 추천 컨텍스트 예산은 게임당 예산 × top_k (RECOMMEND_CONTEXT_TOKENS는 상한)
+        self.recommend_game_tokens = int(os.getenv("RECOMMEND_CONTEXT_TOKENS_PER_GAME", "600"))
+        self.recommend_context_tokens = int(os.getenv("RECOMMEND_CONTEXT_TOKENS", "6000"))
+        self.rule_context_tokens = int(os.getenv("RULE_CONTEXT_TOKENS", "1500"))
+        self.rule_context_top_k = int(os.getenv("RULE_CONTEXT_TOP_K", "5"))
+        
+        # 코퍼스 바이너리 저장소 (python -m services.corpus_store build), 있으면 JSON 대신 mmap 뷰 사용
+        self.corpus = open_corpus()
+        
         # 게임 추천용 데이터 로드
         self._load_recommendation_data()
         
         # 게임 룰 데이터 로드
         self._load_game_rules_data()
         
+        # 추천 사전 필터링용 게임 속성 컬럼 (인원/플레이 시간/카테고리, 추천 인덱스 행 순서)
+        # 키워드로 추출한 속성은 후보를 top_k × RECOMMEND_BOOST_POOL개 뽑은 뒤 점수 가산으로만 반영
+        self.attributes = None
+        self.attribute_boost = float(os.getenv("RECOMMEND_ATTRIBUTE_BOOST", str(DEFAULT_BOOST)))
+        self.boost_pool = int(os.getenv("RECOMMEND_BOOST_POOL", "4"))
+        if self.index is not None and os.getenv("RECOMMEND_PREFILTER", "1") == "1":
+            self.attributes = load_attributes(self.game_data, self.index.ntotal)
+        
+        # 미리 계산한 비슷한 게임 이웃 테이블 (추천 인덱스가 바뀌었으면 변경분만 다시 계산)
+        self.similar_games = load_similar_games(self.index.ntotal) if self.index is not None else None
+        
+        # 게임 이름 해석 인덱스 (모든 엔드포인트의 game_name → 정규 게임 ID)
+        self._build_name_resolver()
+        
         # LangChain 체인 설정
         self._setup_langchain_chains()
         
+        # 미리 생성된 룰 요약 저장소 (python -m services.summary_store precompute)
+        self.summary_store = SummaryStore()
+        self._refreshing_summaries = set()
+        self._background_tasks = set()
+        
+        # 긴 룰은 구간별 부분 요약(캐시) 후 합쳐서 요약 (map-reduce)
+        self.rule_text_reducer = RuleTextReducer(self.llm, self.summary_store, self.model_id)
+        
+        # 룰 질문 시맨틱 답변 캐시 (비슷한 질문이면 검색/LLM 호출 생략)
+        self.answer_cache = SemanticAnswerCache()
+        
+        # 배치 엔드포인트에서 동시에 실행하는 LLM 호출 수 상한 (검색/캐시 적중 항목은 기다리지 않음)
+        self.batch_semaphore = asyncio.Semaphore(int(os.getenv("BATCH_LLM_CONCURRENCY", "8")))
+        
         logger.info("✅ RAG 서비스 초기화 완료")
     
     def _load_recommendation_data(self):
         """게임 추천용 데이터 로드"""
         try:
-            # 게임 추천용 FAISS 인덱스
+            # 게임 추천용 FAISS 인덱스 (빌드 매니페스트에 기록된 인덱스 타입/검색 파라미터 적용)
             index_path = "data/game_index.faiss"
+            manifest_path = "data/index_manifest.json"
             if os.path.exists(index_path):
-                self.index = faiss.read_index(index_path)
+                index_spec = {}
+                if os.path.exists(manifest_path):
+                    with open(manifest_path, "r", encoding="utf-8") as f:
+                        index_spec = json.load(f).get("recommendation", {})
+                with _stage("index_load"):
+                    self.index = load_index(index_path, index_spec)
                 logger.info("✅ 게임 추천 인덱스 로드 완료")
             else:
                 logger.warning("⚠️ 게임 추천 인덱스 파일이 없습니다. 'game_index.faiss' 경로를 확인하세요.")
                 self.index = None
             
+            # 게임 텍스트 / 이름 (코퍼스 저장소가 있으면 파싱 없이 mmap 뷰)
+            if self.corpus:
+                self.texts = self.corpus.texts
+                self.game_names = self.corpus.game_names
+                logger.info("✅ 게임 텍스트/이름 데이터 로드 완료 (코퍼스 저장소)")
+                return
+            
             # 게임 텍스트 데이터
             texts_path = "data/texts.json"
             if os.path.exists(texts_path):
@@ -107,7 +214,10 @@ class RAGService:
         try:
             # 게임 전체 룰 데이터
             game_data_path = "data/game.json" # 모든 게임의 상세 룰이 담긴 파일
-            if os.path.exists(game_data_path):
+            if self.corpus:
+                self.game_data = self.corpus.game_data
+                logger.info("✅ 게임 룰 데이터 로드 완료 (코퍼스 저장소)")
+            elif os.path.exists(game_data_path):
                 with open(game_data_path, "r", encoding="utf-8") as f:
                     self.game_data = json.load(f)
                 logger.info("✅ 게임 룰 데이터 로드 완료")
@@ -118,9 +228,73 @@ class RAGService:
             # 게임별 벡터 인덱스 경로 (개별 게임 룰 청크를 위한 폴더)
             self.game_vector_base_path = "data/game_data/game_data"
             
+            # 통합 룰 인덱스가 빌드되어 있으면 우선 사용 (python -m services.index_builder consolidate)
+            self.rules_index = None
+            self.rule_index_registry = None
+            rules_index_path = "data/rules_index.faiss"
+            rules_table_path = "data/rules_table.json"
+            if os.path.exists(rules_index_path) and os.path.exists(rules_table_path):
+                try:
+                    with _stage("index_load"):
+                        self.rules_index = ConsolidatedRuleIndex(rules_index_path, rules_table_path, corpus=self.corpus)
+                except ValueError as e:
+                    logger.warning(f"⚠️ 통합 룰 인덱스를 사용할 수 없어 게임별 인덱스를 사용합니다: {str(e)}")
+            if self.rules_index is None:
+                # 게임별 인덱스/청크를 한 번만 로드해 상주시킴 (요청마다 디스크 I/O 방지)
+                self.rule_index_registry = RuleIndexRegistry(self.game_vector_base_path, corpus=self.corpus)
+            
         except Exception as e:
             logger.error(f"❌ 게임 룰 데이터 로드 실패: {str(e)}")
             self.game_data = []
+            self.rules_index = None
+            self.rule_index_registry = None
+
+    def _build_name_resolver(self):
+        """모든 데이터 소스의 게임 이름을 정규 게임 ID 하나로 묶고, ID별 룰 인덱스 키와 룰 정보를 미리 매핑"""
+        if self.rules_index:
+            rule_keys = [game["key"] for game in self.rules_index.games]
+        elif self.rule_index_registry:
+            rule_keys = sorted(self.rule_index_registry.available)
+        else:
+            rule_keys = []
+        
+        canonical_names = [game.get("game_name") for game in self.game_data] + list(self.game_names) + \
+            [key.replace("_", " ") for key in rule_keys]
+        self.name_resolver = GameNameResolver.from_sources(canonical_names)
+        
+        self._rule_keys = {}   # game_id -> 룰 인덱스 키
+        for key in rule_keys:
+            game_id = self.name_resolver.resolve_id(key)
+            if game_id is not None:
+                self._rule_keys.setdefault(game_id, key)
+        
+        # 추천 인덱스 행 -> game_id, game_id -> 첫 번째 행 (비슷한 게임 조회용)
+        self._row_game_ids = [self.name_resolver.resolve_id(name) for name in self.game_names]
+        self._game_rows = {}
+        for row, game_id in enumerate(self._row_game_ids):
+            if game_id is not None:
+                self._game_rows.setdefault(game_id, row)
+        
+        self._game_info = {}   # game_id -> game.json 항목 (같은 이름이 여러 개면 첫 번째)
+        for game in self.game_data:
+            game_id = self.name_resolver.resolve_id(game.get("game_name"))
+            if game_id is not None:
+                self._game_info.setdefault(game_id, game)
+        
+        logger.info(f"✅ 게임 이름 해석 인덱스 생성 완료 (정규 게임 {len(self.name_resolver)}개)")
+    
+    def warmup(self):
+        """추천/룰 인덱스에 검색을 한 번씩 실행해 인덱스 페이지와 검색 경로를 미리 올려둠"""
+        if self.index is not None:
+            probe = np.zeros((1, self.index.d), dtype="float32")
+            probe[0, 0] = 1.0
+            self.index.search(probe, 1)
+            if self.rules_index:
+                self.rules_index.search(probe, k=1)
+    
+    def resolve_game_name(self, game_name: str):
+        """띄어쓰기/대소문자/별칭/오타가 섞인 게임 이름을 정규 이름으로 변환. 찾지 못하면 None"""
+        return self.name_resolver.resolve(game_name)
 
     def _setup_langchain_chains(self):
         """LangChain 체인 및 프롬프트 설정"""
@@ -169,152 +343,568 @@ class RAGService:
             history_messages_key="history"
         )
 
-        # 룰 요약 프롬프트 (전체 룰 텍스트를 {game_rule_text}로 받음)
-        rule_summary_prompt = ChatPromptTemplate.from_messages([
-            (
-                "system",
-                "너는 보드게임 룰 전문 AI야. 반드시 아래 규칙을 따라야 해:\n"
-                "- 사용자가 선택한 보드게임의 룰 전체를 보고, 그 게임의 룰을 알기 쉽게 설명해줘.\n"
-                "- 핵심 개념, 목표, 진행 방식, 승리 조건을 요약해줘.\n"
-                "- 설명은 간결하고 구조적으로 작성해."
-            ),
-            MessagesPlaceholder(variable_name="history"),
-            ("human", "게임 이름: {game_name}\n\n룰 전체:\n{game_rule_text}\n\n이 게임의 룰을 설명해주세요.")
-        ])
+        # 룰 요약 체인 (요약은 세션과 무관하게 저장소에 보관되므로 히스토리 없이 호출)
+        self.rule_summary_chain = build_rule_summary_prompt() | self.llm
 
-        # 룰 요약 체인
-        self.rule_summary_chain = RunnableWithMessageHistory(
-            rule_summary_prompt | self.llm,
-            get_session_history=get_session_history_for_rag,
-            input_messages_key="game_name", # 게임 이름이 주 입력값이 됨
-            history_messages_key="history"
-        )
+    async def _encode_query(self, text):
+        """쿼리 임베딩 (캐시 미스만 임베딩 서비스의 배치 큐로 전달, 이벤트 루프를 막지 않음)"""
+        with _stage("embed"):
+            return await self.embedding_service.aencode([text])
+
+    async def _encode_queries(self, texts):
+        """배치 요청의 쿼리를 한 번의 encode 호출로 임베딩. 반환: (len(texts), dim)"""
+        with _stage("embed"):
+            return await self.embedding_service.aencode(list(texts))
 
-    def _search_similar_context(self, query, top_k=3):
+    def _candidate_filter(self, query):
         """
-        첫 번째 코드의 search_similar_context 함수와 동일한 RAG 검색 로직.
-        쿼리를 임베딩하여 FAISS 인덱스에서 유사한 게임 설명을 찾습니다.
+        쿼리 조건 → (하드 조건 후보 마스크, 점수 가산값). 없으면 각각 None
+        후보 마스크가 비면 조건 없이 검색 (LLM이 가까운 게임을 설명)
         """
-        if not self.index or not self.texts or not self.game_names:
-            logger.warning("RAG 검색을 위한 인덱스나 텍스트 데이터가 로드되지 않았습니다.")
-            return ""
+        if self.attributes is None:
+            return None, None
+        with _stage("prefilter"):
+            constraints = parse_constraints(query)
+            mask = self.attributes.mask(constraints)
+            boost = self.attributes.boost(constraints, self.attribute_boost)
+        if mask is not None and not mask.any():
+            FALLBACKS.inc(kind="prefilter_empty_to_unfiltered")
+            mask = None
+        return mask, boost
+
+    def _recommendation_plan(self, query, top_k):
+        """쿼리에서 추천 개수, 후보 마스크, 점수 가산값 결정. 반환: (top_k, mask, boost)"""
+        # 쿼리에서 추천 개수 추출
+        number_match = re.search(r'(\d+)\s*개', query)
+        if number_match:
+            top_k = int(number_match.group(1))
 
-        query_vec = self.embed_model.encode([query], normalize_embeddings=True)
-        D, I = self.index.search(np.array(query_vec), top_k)
+        # 하드 조건으로 후보를 먼저 거르고, 후보가 top_k보다 적으면 그만큼만 추천
+        mask, boost = self._candidate_filter(query)
+        if mask is not None:
+            top_k = min(top_k, int(mask.sum()))
+        return top_k, mask, boost
 
+    def _search_games(self, query_vecs, top_k, mask=None, boost=None):
+        """추천 인덱스 검색. boost가 있으면 후보를 더 뽑아 속성 가산 점수 순으로 상위 top_k"""
+        fetch = min(top_k * self.boost_pool, self.index.ntotal) if boost is not None else top_k
+        if mask is not None:
+            D, I = search_subset(self.index, query_vecs, fetch, mask)
+        else:
+            D, I = self.index.search(np.ascontiguousarray(query_vecs, dtype="float32"), fetch)
+        if boost is not None:
+            D, I = rerank(D, I, boost, top_k)
+        return D, I
+
+    def _recommendation_context(self, scores, ids):
+        """
+        검색 결과 한 행(점수, 게임 행 번호)을 토큰 예산에 맞춘 추천 컨텍스트로 변환.
+        게임마다 RECOMMEND_CONTEXT_TOKENS_PER_GAME까지만 넣어 검색한 게임이 모두 들어가도록 함.
+        반환: (컨텍스트, 들어간 게임 수)
+        """
         context_blocks = []
-        for i in I[0]:
+        for score, i in zip(scores, ids):
             if 0 <= i < len(self.game_names) and 0 <= i < len(self.texts):
-                context_blocks.append(f"[{self.game_names[i]}]\n{self.texts[i]}")
+                context_blocks.append({"title": self.game_names[i], "text": self.texts[i], "score": float(score)})
             else:
                 logger.warning(f"인덱스 {i}에 해당하는 게임 이름 또는 텍스트를 찾을 수 없습니다.")
-        return "\n\n".join(context_blocks)
-    
-    async def recommend_games(self, query: str, session_id: str = "default_session", top_k: int = 3):
-        """게임 추천 (RAG 검색 후 LangChain으로 LLM 호출)"""
-        try:
-            # 쿼리에서 추천 개수 추출
-            number_match = re.search(r'(\d+)\s*개', query)
-            if number_match:
-                top_k = int(number_match.group(1))
+        budget = min(self.recommend_game_tokens * len(context_blocks), self.recommend_context_tokens)
+        with _stage("context_pack"):
+            packed = pack_blocks(context_blocks, budget, block_budget=self.recommend_game_tokens)
+        return "\n\n".join(packed), len(packed)
 
-            # 1. RAG 검색: query를 기반으로 유사한 게임 설명을 가져옴 (첫 번째 코드의 핵심 로직)
-            context = self._search_similar_context(query, top_k=top_k)
-            
-            if not context:
-                return "추천할 게임 데이터를 찾을 수 없습니다. 인덱스나 데이터 로드를 확인해주세요."
+    async def _search_similar_context(self, query, top_k=3, mask=None, boost=None):
+        """
+        첫 번째 코드의 search_similar_context 함수와 동일한 RAG 검색 로직.
+        쿼리를 임베딩하여 FAISS 인덱스에서 유사한 게임 설명을 찾습니다.
+        mask가 있으면 조건을 만족하는 게임 안에서만 검색하고, boost는 게임별 점수에 더합니다.
+        반환: (컨텍스트, 들어간 게임 수)
+        """
+        if not self.index or not self.texts or not self.game_names:
+            logger.warning("RAG 검색을 위한 인덱스나 텍스트 데이터가 로드되지 않았습니다.")
+            return "", 0
+
+        query_vec = await self._encode_query(query)
+        with _stage("search"):
+            D, I = self._search_games(query_vec, top_k, mask, boost)
+        return self._recommendation_context(D[0], I[0])
+    
+    async def _prepare_recommendation(self, query: str, top_k: int):
+        """추천 체인 입력 준비. (inputs, None) 또는 (None, 오류 메시지) 반환"""
+        top_k, mask, boost = self._recommendation_plan(query, top_k)
 
-            # 2. LangChain 체인 호출: 검색된 context와 사용자 쿼리를 LLM에 전달
+        # RAG 검색: query를 기반으로 유사한 게임 설명을 가져옴 (첫 번째 코드의 핵심 로직)
+        context, games = await self._search_similar_context(query, top_k=top_k, mask=mask, boost=boost)
+        
+        if not context:
+            return None, "추천할 게임 데이터를 찾을 수 없습니다. 인덱스나 데이터 로드를 확인해주세요."
+        # 프롬프트의 추천 개수는 컨텍스트에 실제로 들어간 게임 수를 넘지 않음 (목록에 없는 게임을 지어내지 않도록)
+        return {"query": query, "context": context, "top_k": min(top_k, games)}, None
+    
+    async def _run_recommendation_chain(self, inputs, session_id):
+        """추천 체인 호출 후 '추천 완료!' 마커 뒤를 잘라낸 답변 반환"""
+        # LangChain 체인 호출: 검색된 context와 사용자 쿼리를 LLM에 전달
+        with _stage("llm"):
             response = await self.recommendation_chain.ainvoke(
-                {"query": query, "context": context, "top_k": top_k},
+                inputs,
                 config={"configurable": {"session_id": session_id}}
             )
-            
+        
+        # 출력 후처리
+        with _stage("postprocess"):
             raw_output = response.content
-            
-            # 3. 출력 후처리
-            if "추천 완료!" in raw_output:
-                raw_output = raw_output.split("추천 완료!")[0]
-            
+            if RECOMMENDATION_END_MARKER in raw_output:
+                raw_output = raw_output.split(RECOMMENDATION_END_MARKER)[0]
             return raw_output.strip()
+    
+    async def recommend_games(self, query: str, session_id: str = "default_session", top_k: int = 3):
+        """게임 추천 (RAG 검색 후 LangChain으로 LLM 호출)"""
+        try:
+            # 1. RAG 검색
+            inputs, error = await self._prepare_recommendation(query, top_k)
+            if error:
+                return error
+
+            # 2. LLM 호출 및 후처리
+            return await self._run_recommendation_chain(inputs, session_id)
             
         except Exception as e:
+            ERRORS.inc(service="rag", operation="recommend")
             logger.error(f"❌ 게임 추천 실패: {str(e)}")
             return f"게임 추천 중 오류가 발생했습니다: {str(e)}"
     
-    async def answer_rule_question(self, game_name: str, question: str, session_id: str = "default_session"):
-        """룰 질문 답변 (룰 청크 검색 후 LangChain으로 LLM 호출)"""
-        try:
-            # 게임별 벡터 인덱스 로드
-            game_index_path = os.path.join(self.game_vector_base_path, f"{game_name}.faiss")
-            game_chunks_path = os.path.join(self.game_vector_base_path, f"{game_name}.json")
-            
-            if not os.path.exists(game_index_path) or not os.path.exists(game_chunks_path):
-                return f"'{game_name}' 게임의 룰 데이터를 찾을 수 없습니다. 해당 게임의 데이터가 올바른 경로에 있는지 확인해주세요."
-            
-            # 벡터 인덱스 및 청크 텍스트 로딩
-            index = faiss.read_index(game_index_path)
-            with open(game_chunks_path, "r", encoding="utf-8") as f:
-                chunks = json.load(f)
-            
-            # RAG 검색: 룰 질문에 대한 유사 청크 검색
-            q_vec = self.embed_model.encode([question], normalize_embeddings=True)
-            D, I = index.search(np.array(q_vec), k=3)
-            retrieved_chunks = [chunks[i] for i in I[0] if i < len(chunks)]
-            
-            context = "\n\n".join(retrieved_chunks)
-            
+    async def _fan_out(self, jobs, operation):
+        """
+        항목별 코루틴을 동시에 실행해 한 항목의 실패가 다른 항목에 영향을 주지 않도록 결과를 모음.
+        LookupError는 데이터가 없는 항목(오류 메트릭에 집계하지 않음).
+        반환: 항목별 {"status": "success", **결과} 또는 {"status": "error", "message"}
+        """
+        results = await asyncio.gather(*jobs, return_exceptions=True)
+        items = []
+        for result in results:
+            if isinstance(result, Exception):
+                if not isinstance(result, LookupError):
+                    ERRORS.inc(service="rag", operation=operation)
+                    logger.error(f"❌ 배치 항목 처리 실패 ({operation}): {str(result)}")
+                items.append({"status": "error", "message": str(result)})
+            else:
+                items.append({"status": "success", **result})
+        return items
+    
+    async def recommend_games_batch(self, requests):
+        """
+        여러 추천 요청을 한 번에 처리. requests: [(query, session_id, top_k)]
+        쿼리는 한 번의 encode로 임베딩하고, 조건이 없는 쿼리는 한 번의 행렬 검색으로 찾은 뒤
+        LLM 호출만 동시에 실행합니다. 반환: 요청 순서대로 항목별 결과
+        """
+        if not self.index or not self.texts or not self.game_names:
+            message = "추천할 게임 데이터를 찾을 수 없습니다. 인덱스나 데이터 로드를 확인해주세요."
+            return [{"status": "error", "message": message} for _ in requests]
+
+        plans = [self._recommendation_plan(query, top_k) for query, _, top_k in requests]
+        query_vecs = await self._encode_queries([query for query, _, _ in requests])
+
+        hits = [None] * len(requests)
+        with _stage("search"):
+            # 조건이 없는 쿼리는 가장 큰 top_k로 한 번에 검색한 뒤 항목별로 자름
+            unfiltered = [i for i, (_, mask, boost) in enumerate(plans) if mask is None and boost is None]
+            if unfiltered:
+                D, I = self.index.search(query_vecs[unfiltered], max(plans[i][0] for i in unfiltered))
+                for row, i in enumerate(unfiltered):
+                    top_k = plans[i][0]
+                    hits[i] = (D[row, :top_k], I[row, :top_k])
+            # 후보 마스크나 점수 가산값이 다른 쿼리는 각자 검색
+            for i, (top_k, mask, boost) in enumerate(plans):
+                if mask is not None or boost is not None:
+                    D, I = self._search_games(query_vecs[i:i + 1], top_k, mask, boost)
+                    hits[i] = (D[0], I[0])
+
+        async def recommend(i):
+            query, session_id, _ = requests[i]
+            context, games = self._recommendation_context(*hits[i])
             if not context:
-                return f"'{game_name}' 게임 룰에서 질문에 대한 관련 정보를 찾을 수 없습니다."
+                raise LookupError("추천할 게임 데이터를 찾을 수 없습니다. 인덱스나 데이터 로드를 확인해주세요.")
+            inputs = {"query": query, "context": context, "top_k": min(plans[i][0], games)}
+            async with self.batch_semaphore:
+                return {"recommendation": await self._run_recommendation_chain(inputs, session_id)}
 
-            # LangChain 체인 호출
+        return await self._fan_out([recommend(i) for i in range(len(requests))], "recommend_batch")
+    
+    def did_you_mean(self, game_name):
+        """해석하지 못한 게임 이름이면 비슷한 이름을 제안하는 문구, 해석되거나 후보가 없으면 빈 문자열"""
+        if self.name_resolver.resolve_id(game_name) is not None:
+            return ""
+        suggestions = self.name_resolver.suggest(game_name)
+        if not suggestions:
+            return ""
+        return " 혹시 " + ", ".join(f"'{name}'" for name in suggestions) + " 게임을 찾으셨나요?"
+    
+    def _resolve_rule_game(self, game_name):
+        """(정규 게임 이름, 룰 인덱스 키). 룰 데이터가 없는 게임이면 (None, None)"""
+        game_id = self.name_resolver.resolve_id(game_name)
+        rule_key = self._rule_keys.get(game_id)
+        if rule_key is None:
+            return None, None
+        return self.name_resolver.names[game_id], rule_key
+    
+    def _retrieve_rule_chunks(self, rule_key, query_vecs):
+        """
+        한 게임의 룰 청크에서 query_vecs 행마다 유사 청크 검색 (여러 질문도 한 번의 행렬 검색).
+        반환: 행별 [{"text", "score"}] 목록, 게임 인덱스를 찾지 못하면 None
+        """
+        if self.rules_index:
+            # 통합 인덱스에서 해당 게임 ID로 필터링해 검색
+            with _stage("search"):
+                results = self.rules_index.search_many(query_vecs, k=self.rule_context_top_k, game_name=rule_key)
+            return [[{"text": r["chunk"], "score": r["score"]} for r in rows] for rows in results]
+        
+        # 상주 레지스트리에서 게임별 벡터 인덱스 및 청크 텍스트 조회
+        entry = self.rule_index_registry.get(rule_key) if self.rule_index_registry else None
+        if entry is None:
+            return None
+        index, chunks = entry
+        
+        # RAG 검색: 룰 질문에 대한 유사 청크 검색
+        with _stage("search"):
+            D, I = index.search(np.asarray(query_vecs, dtype="float32"), k=self.rule_context_top_k)
+        return [
+            [{"text": chunks[i], "score": float(score)} for score, i in zip(d_row, i_row) if 0 <= i < len(chunks)]
+            for d_row, i_row in zip(D, I)
+        ]
+    
+    def _rule_question_inputs(self, game_name, question, retrieved_chunks):
+        """검색한 청크로 룰 질문 체인 입력 구성. (inputs, None) 또는 (None, 오류 메시지) 반환"""
+        # 점수 높은 청크부터 토큰 예산까지 (겹치는 문장 제거)
+        with _stage("context_pack"):
+            context = pack_context(retrieved_chunks, self.rule_context_tokens)
+        
+        if not context:
+            return None, f"'{game_name}' 게임 룰에서 질문에 대한 관련 정보를 찾을 수 없습니다."
+        return {"game_name": game_name, "question": question, "context": context}, None
+    
+    async def _prepare_rule_question(self, game_name: str, question: str):
+        """룰 질문 체인 입력 준비. (inputs, None) 또는 (None, 오류 메시지) 반환"""
+        resolved_name, rule_key = self._resolve_rule_game(game_name)
+        if rule_key is None:
+            return None, f"'{game_name}' 게임의 룰 데이터를 찾을 수 없습니다. 해당 게임의 데이터가 올바른 경로에 있는지 확인해주세요." \
+                + self.did_you_mean(game_name)
+        
+        q_vec = await self._encode_query(question)
+        retrieved = self._retrieve_rule_chunks(rule_key, q_vec)
+        if retrieved is None:
+            return None, f"'{resolved_name}' 게임의 룰 데이터를 찾을 수 없습니다. 해당 게임의 데이터가 올바른 경로에 있는지 확인해주세요."
+        return self._rule_question_inputs(resolved_name, question, retrieved[0])
+    
+    async def _uses_answer_cache(self, session_id):
+        """이전 대화가 있으면 같은 질문이라도 답이 달라지므로 세션 히스토리가 비어 있을 때만 시맨틱 캐시 사용"""
+        return not await get_session_history_for_rag(session_id).aget_messages()
+
+    async def _record_cached_answer(self, session_id, question, answer):
+        """캐시 답변도 체인 호출과 같이 세션 히스토리에 질문/답변 턴으로 기록"""
+        await get_session_history_for_rag(session_id).aadd_messages(
+            [HumanMessage(content=question), AIMessage(content=answer)]
+        )
+
+    async def _run_rule_question_chain(self, inputs, session_id, q_vec):
+        """룰 질문 체인 호출 후 답변을 시맨틱 캐시에 저장 (q_vec가 None이면 저장하지 않음)"""
+        # LangChain 체인 호출
+        with _stage("llm"):
             response = await self.rule_question_chain.ainvoke(
-                {"game_name": game_name, "question": question, "context": context},
+                inputs,
                 config={"configurable": {"session_id": session_id}}
             )
+        
+        with _stage("postprocess"):
+            answer = response.content.strip()
+        if q_vec is not None:
+            await self.answer_cache.astore(inputs["game_name"], q_vec, inputs["question"], answer)
+        return answer
+    
+    async def answer_rule_question(self, game_name: str, question: str, session_id: str = "default_session"):
+        """룰 질문 답변 (룰 청크 검색 후 LangChain으로 LLM 호출)"""
+        try:
+            # 새 세션에서 같은 게임에 대한 비슷한 질문의 답변이 캐시에 있으면 바로 반환
+            game_name = self.resolve_game_name(game_name) or game_name
+            q_vec = None
+            if await self._uses_answer_cache(session_id):
+                q_vec = await self._encode_query(question)
+                cached_answer = await self.answer_cache.alookup(game_name, q_vec)
+                if cached_answer is not None:
+                    await self._record_cached_answer(session_id, question, cached_answer)
+                    return cached_answer
             
-            answer = response.content
-            return answer.strip()
+            inputs, error = await self._prepare_rule_question(game_name, question)
+            if error:
+                return error
+
+            return await self._run_rule_question_chain(inputs, session_id, q_vec)
             
         except Exception as e:
+            ERRORS.inc(service="rag", operation="rule_question")
             logger.error(f"❌ 룰 질문 답변 실패: {str(e)}")
             return f"룰 질문 답변 중 오류가 발생했습니다: {str(e)}"
     
+    async def answer_rule_questions_batch(self, requests):
+        """
+        여러 룰 질문을 한 번에 처리. requests: [(game_name, question, session_id)]
+        질문은 한 번의 encode로 임베딩하고, 시맨틱 캐시에 없는 질문만 게임별로 묶어 한 번의 행렬 검색 후
+        LLM 호출을 동시에 실행합니다. 반환: 요청 순서대로 항목별 결과
+        시맨틱 캐시는 히스토리가 비어 있고 배치 안에서 한 번만 나오는 세션에만 사용합니다.
+        """
+        query_vecs = await self._encode_queries([question for _, question, _ in requests])
+        session_counts = {}
+        for _, _, session_id in requests:
+            session_counts[session_id] = session_counts.get(session_id, 0) + 1
+        cacheable = await asyncio.gather(*(
+            self._uses_answer_cache(session_id) if session_counts[session_id] == 1 else asyncio.sleep(0, result=False)
+            for _, _, session_id in requests
+        ))
+
+        jobs = [None] * len(requests)
+        by_rule_key = {}   # 룰 인덱스 키 -> [(요청 번호, 정규 게임 이름)]
+        for i, (game_name, question, _) in enumerate(requests):
+            resolved_name, rule_key = self._resolve_rule_game(game_name)
+            if rule_key is None:
+                jobs[i] = f"'{game_name}' 게임의 룰 데이터를 찾을 수 없습니다. 해당 게임의 데이터가 올바른 경로에 있는지 확인해주세요." \
+                    + self.did_you_mean(game_name)
+                continue
+            cached_answer = await self.answer_cache.alookup(resolved_name, query_vecs[i]) if cacheable[i] else None
+            if cached_answer is not None:
+                await self._record_cached_answer(requests[i][2], requests[i][1], cached_answer)
+                jobs[i] = {"answer": cached_answer, "cached": True}
+                continue
+            by_rule_key.setdefault(rule_key, []).append((i, resolved_name))
+
+        for rule_key, pending in by_rule_key.items():
+            rows = [i for i, _ in pending]
+            retrieved = self._retrieve_rule_chunks(rule_key, query_vecs[rows])
+            for row, (i, resolved_name) in enumerate(pending):
+                if retrieved is None:
+                    jobs[i] = f"'{resolved_name}' 게임의 룰 데이터를 찾을 수 없습니다. 해당 게임의 데이터가 올바른 경로에 있는지 확인해주세요."
+                    continue
+                inputs, error = self._rule_question_inputs(resolved_name, requests[i][1], retrieved[row])
+                jobs[i] = error or inputs
+
+        async def answer(i):
+            job = jobs[i]
+            if isinstance(job, str):
+                raise LookupError(job)
+            if "context" not in job:
+                return job
+            async with self.batch_semaphore:
+                q_vec = query_vecs[i:i + 1] if cacheable[i] else None
+                answer = await self._run_rule_question_chain(job, requests[i][2], q_vec)
+            return {"answer": answer, "cached": False}
+
+        return await self._fan_out([answer(i) for i in range(len(requests))], "rule_question_batch")
+    
+    async def search_rules_across_games(self, question: str, top_k: int = 5):
+        """통합 룰 인덱스에서 게임 구분 없이 한 번의 검색으로 관련 룰 청크를 찾음"""
+        if not self.rules_index:
+            return []
+        q_vec = await self._encode_query(question)
+        return self.rules_index.search(q_vec, k=top_k)
+    
+    async def _prepare_rule_summary(self, game_name: str):
+        """룰 요약 체인 입력 준비. (inputs, None) 또는 (None, 오류 메시지) 반환"""
+        # 게임 정보 찾기 (이름 해석 인덱스로 O(1) 조회)
+        game_id = self.name_resolver.resolve_id(game_name)
+        game_info = self._game_info.get(game_id)
+        
+        if not game_info:
+            return None, f"'{game_name}' 게임의 전체 룰 정보를 찾을 수 없습니다. 'game.json' 파일을 확인해주세요." \
+                + self.did_you_mean(game_name)
+        game_name = self.name_resolver.names[game_id]
+        
+        game_rule_text = game_info.get('text', '')
+        
+        if not game_rule_text:
+            return None, f"'{game_name}' 게임의 룰 내용이 비어 있습니다."
+        return {"game_name": game_name, "game_rule_text": game_rule_text}, None
+    
+    def _get_rule_chunks(self, game_name):
+        """상주 중인 룰 인덱스의 청크 목록 (chunked_game_rules.json과 동일), 없으면 None"""
+        rule_key = self._rule_keys.get(self.name_resolver.resolve_id(game_name))
+        if rule_key is None:
+            return None
+        if self.rules_index:
+            return self.rules_index.get_chunks(rule_key) or None
+        entry = self.rule_index_registry.get(rule_key) if self.rule_index_registry else None
+        return entry[1] if entry else None
+    
+    async def _rule_summary_chain_inputs(self, inputs):
+        """룰 요약 체인 입력. 룰이 토큰 예산을 넘으면 구간별 부분 요약을 합친 텍스트로 대체"""
+        rule_text = await self.rule_text_reducer.prepare(
+            inputs["game_name"], inputs["game_rule_text"], self._get_rule_chunks(inputs["game_name"])
+        )
+        return {"game_name": inputs["game_name"], "game_rule_text": rule_text, "history": []}
+    
+    async def _generate_rule_summary(self, inputs):
+        """LLM으로 룰 요약을 생성하고 저장소에 기록"""
+        chain_inputs = await self._rule_summary_chain_inputs(inputs)
+        with _stage("llm"):
+            response = await self.rule_summary_chain.ainvoke(chain_inputs)
+        summary = response.content.strip()
+        self.summary_store.put(
+            inputs["game_name"], inputs["game_rule_text"], RULE_SUMMARY_PROMPT_VERSION, self.model_id, summary
+        )
+        return summary
+    
+    def _lookup_rule_summary(self, inputs):
+        """저장된 요약 조회. stale이면 바로 제공하고 백그라운드에서 다시 생성"""
+        summary, fresh = self.summary_store.get(
+            inputs["game_name"], inputs["game_rule_text"], RULE_SUMMARY_PROMPT_VERSION, self.model_id
+        )
+        if summary is not None and not fresh and inputs["game_name"] not in self._refreshing_summaries:
+            self._refreshing_summaries.add(inputs["game_name"])
+            task = asyncio.create_task(self._refresh_rule_summary(inputs))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+        return summary
+    
+    async def _refresh_rule_summary(self, inputs):
+        try:
+            await self._generate_rule_summary(inputs)
+            logger.info(f"🔄 룰 요약 백그라운드 갱신 완료: {inputs['game_name']}")
+        except Exception as e:
+            ERRORS.inc(service="rag", operation="rule_summary_refresh")
+            logger.error(f"❌ 룰 요약 백그라운드 갱신 실패: {str(e)}")
+        finally:
+            self._refreshing_summaries.discard(inputs["game_name"])
+    
     async def get_rule_summary(self, game_name: str, session_id: str = "default_session"):
-        """게임 룰 요약 (전체 룰 텍스트를 LangChain으로 LLM 호출)"""
+        """게임 룰 요약 (저장된 요약이 있으면 바로 제공, 없으면 LLM으로 생성 후 저장)"""
         try:
-            # 게임 정보 찾기
-            game_info = None
-            for game in self.game_data:
-                if game.get("game_name") == game_name:
-                    game_info = game
-                    break
+            inputs, error = await self._prepare_rule_summary(game_name)
+            if error:
+                return error
+
+            summary = self._lookup_rule_summary(inputs)
+            if summary is not None:
+                return summary
+
+            return await self._generate_rule_summary(inputs)
             
-            if not game_info:
-                return f"'{game_name}' 게임의 전체 룰 정보를 찾을 수 없습니다. 'game.json' 파일을 확인해주세요."
+        except Exception as e:
+            ERRORS.inc(service="rag", operation="rule_summary")
+            logger.error(f"❌ 룰 요약 실패: {str(e)}")
+            return f"룰 요약 중 오류가 발생했습니다: {str(e)}"
+    
+    async def _astream_chain(self, chain, inputs, session_id):
+        """체인의 astream 결과에서 텍스트 토큰만 순서대로 내보냄 (첫 토큰까지 / 전체 생성 시간 기록)"""
+        start = time.perf_counter()
+        first = True
+        async for chunk in chain.astream(inputs, config={"configurable": {"session_id": session_id}}):
+            if chunk.content:
+                if first:
+                    STAGE_LATENCY.observe(time.perf_counter() - start, service="rag", stage="llm_first_token")
+                    first = False
+                yield chunk.content
+        STAGE_LATENCY.observe(time.perf_counter() - start, service="rag", stage="llm")
+    
+    async def stream_recommendation(self, query: str, session_id: str = "default_session", top_k: int = 3):
+        """게임 추천 스트리밍 ('추천 완료!' 마커는 생성 도중 감지해 잘라냄)"""
+        try:
+            inputs, error = await self._prepare_recommendation(query, top_k)
+            if error:
+                yield error
+                return
             
-            game_rule_text = game_info.get('text', '')
+            async for text in cut_at_marker(
+                self._astream_chain(self.recommendation_chain, inputs, session_id), RECOMMENDATION_END_MARKER
+            ):
+                yield text
+        
+        except Exception as e:
+            ERRORS.inc(service="rag", operation="recommend_stream")
+            logger.error(f"❌ 게임 추천 스트리밍 실패: {str(e)}")
+            yield f"게임 추천 중 오류가 발생했습니다: {str(e)}"
+    
+    async def stream_rule_answer(self, game_name: str, question: str, session_id: str = "default_session"):
+        """룰 질문 답변 스트리밍"""
+        try:
+            game_name = self.resolve_game_name(game_name) or game_name
+            q_vec = None
+            if await self._uses_answer_cache(session_id):
+                q_vec = await self._encode_query(question)
+                cached_answer = await self.answer_cache.alookup(game_name, q_vec)
+                if cached_answer is not None:
+                    await self._record_cached_answer(session_id, question, cached_answer)
+                    yield cached_answer
+                    return
             
-            if not game_rule_text:
-                return f"'{game_name}' 게임의 룰 내용이 비어 있습니다."
-
-            # LangChain 체인 호출
-            response = await self.rule_summary_chain.ainvoke(
-                {"game_name": game_name, "game_rule_text": game_rule_text},
-                config={"configurable": {"session_id": session_id}}
-            )
+            inputs, error = await self._prepare_rule_question(game_name, question)
+            if error:
+                yield error
+                return
             
-            summary = response.content
-            return summary.strip()
+            parts = []
+            async for text in self._astream_chain(self.rule_question_chain, inputs, session_id):
+                parts.append(text)
+                yield text
             
+            if q_vec is not None:
+                await self.answer_cache.astore(game_name, q_vec, question, "".join(parts).strip())
+        
         except Exception as e:
-            logger.error(f"❌ 룰 요약 실패: {str(e)}")
-            return f"룰 요약 중 오류가 발생했습니다: {str(e)}"
+            ERRORS.inc(service="rag", operation="rule_question_stream")
+            logger.error(f"❌ 룰 질문 답변 스트리밍 실패: {str(e)}")
+            yield f"룰 질문 답변 중 오류가 발생했습니다: {str(e)}"
+    
+    async def stream_rule_summary(self, game_name: str, session_id: str = "default_session"):
+        """게임 룰 요약 스트리밍"""
+        try:
+            inputs, error = await self._prepare_rule_summary(game_name)
+            if error:
+                yield error
+                return
+            
+            summary = self._lookup_rule_summary(inputs)
+            if summary is not None:
+                yield summary
+                return
+            
+            parts = []
+            chain_inputs = await self._rule_summary_chain_inputs(inputs)
+            async for text in self._astream_chain(self.rule_summary_chain, chain_inputs, session_id):
+                parts.append(text)
+                yield text
+            
+            self.summary_store.put(
+                inputs["game_name"], inputs["game_rule_text"], RULE_SUMMARY_PROMPT_VERSION, self.model_id,
+                "".join(parts).strip()
+            )
+        
+        except Exception as e:
+            ERRORS.inc(service="rag", operation="rule_summary_stream")
+            logger.error(f"❌ 룰 요약 스트리밍 실패: {str(e)}")
+            yield f"룰 요약 중 오류가 발생했습니다: {str(e)}"
         
+    def find_similar_games(self, game_name: str, limit: int = 10):
+        """이웃 테이블에서 비슷한 게임 조회 (임베딩/검색/LLM 호출 없음). 게임을 찾지 못하면 None"""
+        game_id = self.name_resolver.resolve_id(game_name)
+        row = self._game_rows.get(game_id)
+        if row is None:
+            return None
+        
+        similar = []
+        seen = {game_id}   # 같은 게임의 중복 항목은 한 번만
+        for neighbor, score in self.similar_games.lookup(row):
+            neighbor_id = self._row_game_ids[neighbor]
+            if neighbor_id in seen:
+                continue
+            seen.add(neighbor_id)
+            similar.append({"game_name": self.game_names[neighbor], "score": round(score, 4)})
+            if len(similar) >= limit:
+                break
+        return {"game_name": self.name_resolver.names[game_id], "similar": similar}
+    
     def get_available_games(self):
         """사용 가능한 게임 목록 반환"""
-        if self.game_names:
-            return self.game_names
+        if self.rules_index:
+            return self.rules_index.get_game_names()
+        elif self.game_names:
+            return list(self.game_names)
         elif self.game_data:
             return [game.get("game_name", "") for game in self.game_data if game.get("game_name")]
         else:
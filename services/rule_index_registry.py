@@ -0,0 +1,138 @@
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+
+from services.metrics import STAGE_LATENCY
+from services.shared_state import read_index
+
+logger = logging.getLogger(__name__)
+
+
+class RuleIndexRegistry:
+    """게임별 룰 FAISS 인덱스와 청크 목록을 한 번만 로드해 메모리에 상주시키는 레지스트리
+
+    - 메모리 예산(RULE_INDEX_MEMORY_MB)을 넘으면 가장 오래 사용하지 않은 게임부터 내림 (LRU)
+    - 조회는 dict 기반 O(1), hit/miss/eviction 횟수를 집계
+    - corpus(CorpusStore)가 있으면 청크는 게임별 JSON 대신 저장소의 mmap 뷰를 사용 (메모리 예산에는 인덱스만 계산)
+    """
+
+    def __init__(self, base_path, memory_budget_mb=None, preload=True, corpus=None):
+        self.base_path = base_path
+        self.corpus = corpus
+        if memory_budget_mb is None:
+            memory_budget_mb = float(os.getenv("RULE_INDEX_MEMORY_MB", "256"))
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+
+        self._entries = OrderedDict()  # game_name -> (index, chunks, nbytes)
+        self._memory_used = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # 사용 가능한 게임 목록 (파일 이름 기준)
+        self.available = self._scan_available()
+
+        if preload:
+            self.preload()
+
+    def _scan_available(self):
+        """인덱스(.faiss)와 청크(.json 또는 코퍼스 저장소)가 모두 있는 게임만 수집"""
+        if not os.path.isdir(self.base_path):
+            logger.warning(f"⚠️ 게임별 룰 인덱스 폴더가 없습니다: {self.base_path}")
+            return set()
+
+        corpus_keys = self.corpus.rule_keys() if self.corpus else set()
+        names = set()
+        for file_name in os.listdir(self.base_path):
+            stem, ext = os.path.splitext(file_name)
+            if ext == ".faiss" and (stem in corpus_keys or os.path.exists(os.path.join(self.base_path, f"{stem}.json"))):
+                names.add(stem)
+        return names
+
+    def _load(self, game_name):
+        """디스크에서 인덱스와 청크를 읽고 대략적인 메모리 사용량을 계산"""
+        with STAGE_LATENCY.time(service="rag", stage="index_load"):
+            index = read_index(os.path.join(self.base_path, f"{game_name}.faiss"))
+            chunks = self.corpus.chunks(game_name) if self.corpus else None
+            # 저장소 청크가 인덱스와 어긋나면(인덱스만 다시 빌드된 경우 등) 게임별 JSON 사용
+            if chunks is not None and len(chunks) == index.ntotal:
+                return index, chunks, index.ntotal * index.d * 4
+            with open(os.path.join(self.base_path, f"{game_name}.json"), "r", encoding="utf-8") as f:
+                chunks = json.load(f)
+
+        nbytes = index.ntotal * index.d * 4 + sum(len(chunk.encode("utf-8")) for chunk in chunks)
+        return index, chunks, nbytes
+
+    def _evict_until_fits(self, incoming_bytes):
+        """예산을 넘지 않도록 LRU 순서로 제거 (lock 보유 상태에서 호출)"""
+        while self._entries and self._memory_used + incoming_bytes > self.memory_budget:
+            evicted_name, (_, _, nbytes) = self._entries.popitem(last=False)
+            self._memory_used -= nbytes
+            self.evictions += 1
+            logger.debug(f"룰 인덱스 LRU 제거: {evicted_name}")
+
+    def preload(self):
+        """예산 안에서 모든 게임 인덱스를 미리 로드"""
+        loaded = 0
+        for game_name in sorted(self.available):
+            try:
+                index, chunks, nbytes = self._load(game_name)
+            except Exception as e:
+                logger.warning(f"⚠️ 룰 인덱스 로드 실패 ({game_name}): {str(e)}")
+                continue
+
+            with self._lock:
+                if self._memory_used + nbytes > self.memory_budget:
+                    logger.info("ℹ️ 룰 인덱스 메모리 예산에 도달하여 나머지는 요청 시 로드합니다.")
+                    break
+                self._entries[game_name] = (index, chunks, nbytes)
+                self._memory_used += nbytes
+                loaded += 1
+
+        logger.info(f"✅ 게임별 룰 인덱스 {loaded}/{len(self.available)}개 상주 로드 완료 "
+                    f"({self._memory_used / 1024 / 1024:.1f}MB)")
+
+    def __contains__(self, game_name):
+        return game_name in self.available
+
+    def get(self, game_name):
+        """(index, chunks) 반환. 없는 게임이면 None"""
+        if game_name not in self.available:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(game_name)
+            if entry is not None:
+                self._entries.move_to_end(game_name)
+                self.hits += 1
+                return entry[0], entry[1]
+            self.misses += 1
+
+        index, chunks, nbytes = self._load(game_name)
+
+        with self._lock:
+            if game_name not in self._entries:
+                self._evict_until_fits(nbytes)
+                self._entries[game_name] = (index, chunks, nbytes)
+                self._memory_used += nbytes
+            else:
+                self._entries.move_to_end(game_name)
+        return index, chunks
+
+    def get_stats(self):
+        """hit/miss 및 메모리 사용 현황"""
+        total = self.hits + self.misses
+        return {
+            "available_games": len(self.available),
+            "resident_games": len(self._entries),
+            "memory_used_mb": round(self._memory_used / 1024 / 1024, 2),
+            "memory_budget_mb": round(self.memory_budget / 1024 / 1024, 2),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0
+        }
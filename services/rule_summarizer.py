@@ -0,0 +1,100 @@
+import os
+import json
+import asyncio
+import logging
+
+from langchain_core.prompts import ChatPromptTemplate
+
+from services.tokens import count_tokens
+from services.context_packer import split_into_windows, pack_context
+from services.metrics import STAGE_LATENCY
+from services.corpus_store import open_corpus
+
+logger = logging.getLogger(__name__)
+
+# 부분 요약 프롬프트를 바꾸면 버전을 올려 캐시된 부분 요약을 무효화
+RULE_CHUNK_SUMMARY_PROMPT_VERSION = "v1"
+
+
+def build_rule_chunk_summary_prompt():
+    """룰 일부 구간 요약 프롬프트 (map 단계)"""
+    return ChatPromptTemplate.from_messages([
+        (
+            "system",
+            "너는 보드게임 룰 전문 AI야. 룰의 일부 구간이 주어지면 그 구간에 있는 내용만 요약해.\n"
+            "- 게임 목표, 준비, 진행 방식, 승리 조건, 예외 규칙에 해당하는 내용은 빠뜨리지 마.\n"
+            "- 숫자(인원수, 장수, 점수 등)는 원문 그대로 유지하고, 없는 내용은 지어내지 마."
+        ),
+        ("human", "게임 이름: {game_name}\n\n룰 일부:\n{rule_part}\n\n이 구간의 룰을 간결하게 요약해주세요.")
+    ])
+
+
+def load_rule_chunks(path="data/chunked_game_rules.json"):
+    """게임 이름 → 룰 청크 목록 (코퍼스 저장소가 있으면 그 뷰, 없으면 chunked_game_rules.json)"""
+    corpus = open_corpus()
+    if corpus:
+        chunks = {name: corpus.chunks(name) for name in set(corpus.game_names)}
+        return {name: view for name, view in chunks.items() if view is not None}
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return {entry.get("game_name", name): entry.get("chunks", []) for name, entry in data.items()}
+
+
+class RuleTextReducer:
+    """룰 요약 프롬프트에 넣을 룰 텍스트 준비
+
+    룰 전체가 RULE_SUMMARY_TOKEN_BUDGET 이하면 그대로 사용하고, 넘으면 룰 청크를
+    RULE_SUMMARY_WINDOW_TOKENS 크기의 구간으로 묶어 구간별 부분 요약(map)을 만든 뒤
+    이어 붙여 반환합니다 (reduce는 기존 룰 요약 프롬프트가 수행). 부분 요약은 store에 캐시됩니다.
+    """
+
+    def __init__(self, llm, store, model_id, token_budget=None, window_tokens=None, concurrency=None):
+        self.chunk_chain = build_rule_chunk_summary_prompt() | llm
+        self.store = store
+        self.model_id = model_id
+        self.token_budget = token_budget or int(os.getenv("RULE_SUMMARY_TOKEN_BUDGET", "3000"))
+        self.window_tokens = window_tokens or int(os.getenv("RULE_SUMMARY_WINDOW_TOKENS", "1500"))
+        self.semaphore = asyncio.Semaphore(concurrency or int(os.getenv("RULE_SUMMARY_MAP_CONCURRENCY", "4")))
+
+        self.reduced = 0
+        self.partial_hits = 0
+        self.partial_misses = 0
+
+    async def _summarize_window(self, game_name, window):
+        summary = self.store.get_partial(window, RULE_CHUNK_SUMMARY_PROMPT_VERSION, self.model_id)
+        if summary is not None:
+            self.partial_hits += 1
+            return summary
+
+        self.partial_misses += 1
+        async with self.semaphore:
+            with STAGE_LATENCY.time(service="rag", stage="summary_map"):
+                response = await self.chunk_chain.ainvoke({"game_name": game_name, "rule_part": window})
+        summary = response.content.strip()
+        self.store.put_partial(window, RULE_CHUNK_SUMMARY_PROMPT_VERSION, self.model_id, summary)
+        return summary
+
+    async def prepare(self, game_name, rule_text, chunks=None):
+        """요약 프롬프트의 {game_rule_text} 값. chunks가 없으면 룰 전체 텍스트를 문장 경계로 나눠 사용"""
+        if count_tokens(rule_text) <= self.token_budget:
+            return rule_text
+
+        windows = split_into_windows(chunks or [rule_text], self.window_tokens)
+        partials = await asyncio.gather(*(self._summarize_window(game_name, window) for window in windows))
+        self.reduced += 1
+        logger.info(f"🧩 룰이 길어 {len(windows)}개 구간으로 나눠 요약합니다: {game_name}")
+
+        # 부분 요약을 합쳐도 예산을 넘으면 문장 경계에서 잘라냄 (구간 순서 유지)
+        blocks = [{"text": partial, "score": -i} for i, partial in enumerate(partials)]
+        return pack_context(blocks, self.token_budget)
+
+    def get_stats(self):
+        return {
+            "token_budget": self.token_budget,
+            "window_tokens": self.window_tokens,
+            "reduced": self.reduced,
+            "partial_hits": self.partial_hits,
+            "partial_misses": self.partial_misses
+        }
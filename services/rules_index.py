@@ -0,0 +1,111 @@
+import json
+import logging
+
+import faiss
+import numpy as np
+
+from services.shared_state import read_index
+
+logger = logging.getLogger(__name__)
+
+
+class ConsolidatedRuleIndex:
+    """모든 게임의 룰 청크 벡터를 담은 단일 FAISS 인덱스 + 청크 테이블
+
+    `python -m services.index_builder consolidate`로 생성한 파일을 읽습니다.
+    벡터 ID에 게임 ID가 인코딩되어 있어 게임별 필터 검색과 전체 게임 검색을 모두 지원합니다.
+    청크 텍스트는 코퍼스 저장소(corpus)의 게임별 룰 청크 뷰를 사용하고, 구버전 테이블(version 1)은 JSON 안의 청크 목록을 사용합니다.
+    """
+
+    def __init__(self, index_path, table_path, corpus=None):
+        self.index = read_index(index_path)
+        with open(table_path, "r", encoding="utf-8") as f:
+            table = json.load(f)
+
+        self.id_stride = table["id_stride"]
+        self.games = table["games"]
+        if "chunks" in table:
+            self._chunks = [table["chunks"][game["start"]:game["end"]] for game in self.games]
+        else:
+            self._chunks = [self._corpus_chunks(corpus, game) for game in self.games]
+
+        # 파일 키(공백→'_')와 표시 이름 모두로 조회 가능하게
+        self._by_name = {}
+        for game in self.games:
+            self._by_name[game["key"]] = game
+            self._by_name[game["game_name"]] = game
+
+        # 구버전 FAISS(1.7.2 이하)는 검색 시 ID 필터를 지원하지 않으므로 게임별 벡터 슬라이스로 직접 계산
+        self._supports_id_filter = hasattr(faiss, "SearchParameters") and hasattr(faiss, "IDSelectorRange")
+        self.vectors = None
+        if not self._supports_id_filter:
+            inner = faiss.downcast_index(self.index.index)
+            self.vectors = inner.reconstruct_n(0, inner.ntotal)
+
+        logger.info(f"✅ 통합 룰 인덱스 로드 완료 (게임 {len(self.games)}개, 청크 {sum(map(len, self._chunks))}개)")
+
+    @staticmethod
+    def _corpus_chunks(corpus, game):
+        """코퍼스 저장소의 게임 룰 청크 뷰. 저장소가 없거나 인덱스와 청크 수가 다르면 ValueError"""
+        chunks = corpus.chunks(game["key"]) if corpus else None
+        if chunks is None or len(chunks) != game["end"] - game["start"]:
+            raise ValueError(f"코퍼스 저장소의 '{game['key']}' 룰 청크가 통합 룰 인덱스와 맞지 않습니다. 다시 빌드하세요.")
+        return chunks
+
+    def __contains__(self, game_name):
+        return game_name in self._by_name
+
+    def get_game(self, game_name):
+        return self._by_name.get(game_name)
+
+    def get_game_names(self):
+        return [game["game_name"] for game in self.games]
+
+    def get_chunks(self, game_name):
+        game = self._by_name.get(game_name)
+        if game is None:
+            return []
+        return self._chunks[game["game_id"]]
+
+    def _decode(self, vector_id):
+        """벡터 ID → (게임, 게임 내 청크 번호)"""
+        return self.games[vector_id // self.id_stride], vector_id % self.id_stride
+
+    def search(self, query_vec, k=3, game_name=None):
+        """
+        query_vec와 유사한 청크 검색. game_name을 주면 해당 게임 청크만, 없으면 전체 게임 대상.
+        반환: [{"game_name", "chunk", "score"}, ...]
+        """
+        return self.search_many(np.asarray(query_vec, dtype="float32").reshape(1, -1), k, game_name)[0]
+
+    def search_many(self, query_vecs, k=3, game_name=None):
+        """여러 쿼리를 한 번의 행렬 검색으로 처리. 반환: 쿼리별 search() 결과 목록"""
+        query_vecs = np.ascontiguousarray(query_vecs, dtype="float32").reshape(-1, self.index.d)
+
+        if game_name is None:
+            D, I = self.index.search(query_vecs, k)
+            pairs = [[(int(i), float(d)) for d, i in zip(d_row, i_row) if i >= 0] for d_row, i_row in zip(D, I)]
+        else:
+            game = self._by_name.get(game_name)
+            if game is None:
+                return [[] for _ in range(len(query_vecs))]
+
+            if self._supports_id_filter:
+                lo = game["game_id"] * self.id_stride
+                params = faiss.SearchParameters(sel=faiss.IDSelectorRange(lo, lo + self.id_stride))
+                D, I = self.index.search(query_vecs, k, params=params)
+                pairs = [[(int(i), float(d)) for d, i in zip(d_row, i_row) if i >= 0] for d_row, i_row in zip(D, I)]
+            else:
+                scores = query_vecs @ self.vectors[game["start"]:game["end"]].T
+                top = np.argsort(-scores, axis=1)[:, :k]
+                base_id = game["game_id"] * self.id_stride
+                pairs = [[(base_id + int(i), float(row_scores[i])) for i in row_top] for row_scores, row_top in zip(scores, top)]
+
+        results = []
+        for row_pairs in pairs:
+            row_results = []
+            for vector_id, score in row_pairs:
+                game, row = self._decode(vector_id)
+                row_results.append({"game_name": game["game_name"], "chunk": self._chunks[game["game_id"]][row], "score": score})
+            results.append(row_results)
+        return results
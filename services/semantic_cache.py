@@ -0,0 +1,214 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from services.shared_state import is_multi_worker, shared_state_path, connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+# 유사도 분포 집계 구간 (상한 기준)
+SIMILARITY_BUCKETS = [0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 1.0]
+
+
+class _GameEntries:
+    """한 게임의 캐시 항목 (질문 벡터 행렬 + 답변 목록)"""
+
+    def __init__(self, dim):
+        self.vectors = np.empty((0, dim), dtype="float32")
+        self.questions = []
+        self.answers = []
+        self.created_at = []
+
+    def __len__(self):
+        return len(self.answers)
+
+    def remove(self, keep_mask):
+        self.vectors = self.vectors[keep_mask]
+        self.questions = [q for q, keep in zip(self.questions, keep_mask) if keep]
+        self.answers = [a for a, keep in zip(self.answers, keep_mask) if keep]
+        self.created_at = [t for t, keep in zip(self.created_at, keep_mask) if keep]
+
+
+class SemanticAnswerCache:
+    """게임별 시맨틱 답변 캐시
+
+    새 질문 임베딩과 캐시된 질문 임베딩의 코사인 유사도가 임계값 이상이면 저장된 답변을 재사용합니다.
+    (임베딩은 정규화되어 있으므로 내적 = 코사인 유사도)
+    - SEMANTIC_CACHE_THRESHOLD: 재사용 유사도 임계값
+    - SEMANTIC_CACHE_TTL_SECONDS: 항목 유효 시간
+    - SEMANTIC_CACHE_MAX_PER_GAME / SEMANTIC_CACHE_MAX_ENTRIES: 게임별 / 전체 최대 항목 수
+    - SEMANTIC_CACHE_DB_PATH: 지정하면(멀티 워커에서는 기본 SHARED_STATE_DIR/answers.sqlite) 답변을 SQLite에 기록하고,
+      조회 시 다른 워커가 추가한 항목을 게임별 마지막 행 ID 이후만 가져와 합칩니다.
+      비동기 호출(alookup/astore)은 SQLite 조회와 쓰기를 이벤트 루프 밖의 스레드에서 실행합니다
+      (다른 워커가 쓰기 잠금을 잡고 있어도 SQLITE_BUSY_TIMEOUT 동안 다른 요청이 멈추지 않도록).
+    """
+
+    def __init__(self, threshold=None, ttl_seconds=None, max_per_game=None, max_entries=None, db_path=None):
+        self.threshold = threshold if threshold is not None else float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+        self.ttl = ttl_seconds if ttl_seconds is not None else float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "86400"))
+        self.max_per_game = max_per_game or int(os.getenv("SEMANTIC_CACHE_MAX_PER_GAME", "64"))
+        self.max_entries = max_entries or int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "4096"))
+
+        self._games = OrderedDict()  # game_name -> _GameEntries (최근 사용 게임이 뒤쪽)
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.similarity_counts = [0] * len(SIMILARITY_BUCKETS)
+
+        if db_path is None:
+            db_path = os.getenv("SEMANTIC_CACHE_DB_PATH", "") or \
+                (shared_state_path("answers.sqlite") if is_multi_worker() else "")
+        self._synced = {}  # game_name -> 메모리에 반영한 마지막 행 ID
+        self._db = None
+        if db_path:
+            try:
+                self._db = connect_sqlite(db_path)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS answers (id INTEGER PRIMARY KEY AUTOINCREMENT, game_name TEXT,"
+                    " dim INTEGER, vector BLOB, question TEXT, answer TEXT, created_at REAL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS answers_game ON answers (game_name, id)")
+                self._db.commit()
+                logger.info(f"✅ 시맨틱 캐시 공유 저장소 연결: {db_path}")
+            except Exception as e:
+                logger.warning(f"⚠️ 시맨틱 캐시 공유 저장소를 사용할 수 없습니다 (메모리만 사용): {str(e)}")
+                self._db = None
+
+    def _record_similarity(self, similarity):
+        for i, upper in enumerate(SIMILARITY_BUCKETS):
+            if similarity <= upper:
+                self.similarity_counts[i] += 1
+                return
+        self.similarity_counts[-1] += 1
+
+    def _expire(self, entries):
+        """TTL이 지난 항목 제거 (lock 보유 상태에서 호출)"""
+        if not self.ttl or not len(entries):
+            return
+        now = time.time()
+        keep = np.array([now - t <= self.ttl for t in entries.created_at], dtype=bool)
+        if not keep.all():
+            self._size -= int((~keep).sum())
+            entries.remove(keep)
+
+    def _sync(self, game_name):
+        """다른 워커가 SQLite에 추가한 항목을 메모리에 반영 (lock 보유 상태에서 호출)"""
+        min_created = time.time() - self.ttl if self.ttl else 0
+        rows = self._db.execute(
+            "SELECT id, dim, vector, question, answer, created_at FROM answers"
+            " WHERE game_name = ? AND id > ? AND created_at >= ? ORDER BY id",
+            (game_name, self._synced.get(game_name, 0), min_created)
+        ).fetchall()
+        for row_id, dim, vector, question, answer, created_at in rows:
+            self._append(game_name, np.frombuffer(vector, dtype="float32").reshape(1, dim), question, answer, created_at)
+            self._synced[game_name] = row_id
+
+    def lookup(self, game_name, query_vec):
+        """유사한 질문의 답변이 있으면 반환, 없으면 None"""
+        query_vec = np.asarray(query_vec, dtype="float32").reshape(-1)
+        with self._lock:
+            if self._db is not None:
+                self._sync(game_name)
+            entries = self._games.get(game_name)
+            if entries is not None:
+                self._expire(entries)
+            if entries is None or not len(entries):
+                self.misses += 1
+                return None
+
+            similarities = entries.vectors @ query_vec
+            best = int(similarities.argmax())
+            similarity = float(similarities[best])
+            self._record_similarity(similarity)
+
+            if similarity < self.threshold:
+                self.misses += 1
+                return None
+
+            self._games.move_to_end(game_name)
+            self.hits += 1
+            logger.debug(f"시맨틱 캐시 적중 ({similarity:.3f}): '{entries.questions[best]}'")
+            return entries.answers[best]
+
+    async def alookup(self, game_name, query_vec):
+        if self._db is None:
+            return self.lookup(game_name, query_vec)
+        return await asyncio.to_thread(self.lookup, game_name, query_vec)
+
+    async def astore(self, game_name, query_vec, question, answer):
+        if self._db is None:
+            return self.store(game_name, query_vec, question, answer)
+        return await asyncio.to_thread(self.store, game_name, query_vec, question, answer)
+
+    def store(self, game_name, query_vec, question, answer):
+        query_vec = np.asarray(query_vec, dtype="float32").reshape(1, -1)
+        with self._lock:
+            if self._db is None:
+                self._append(game_name, query_vec, question, answer, time.time())
+                return
+
+            # 공유 저장소에 기록한 뒤 동기화로 메모리에 반영 (다른 워커가 먼저 넣은 항목도 함께)
+            now = time.time()
+            self._db.execute(
+                "INSERT INTO answers (game_name, dim, vector, question, answer, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (game_name, query_vec.shape[1], query_vec.tobytes(), question, answer, now)
+            )
+            self._db.execute(
+                "DELETE FROM answers WHERE game_name = ? AND id NOT IN"
+                " (SELECT id FROM answers WHERE game_name = ? ORDER BY id DESC LIMIT ?)",
+                (game_name, game_name, self.max_per_game)
+            )
+            if self.ttl:
+                self._db.execute("DELETE FROM answers WHERE created_at < ?", (now - self.ttl,))
+            self._db.commit()
+            self._sync(game_name)
+
+    def _append(self, game_name, query_vec, question, answer, created_at):
+        """메모리 캐시에 항목 추가 후 게임별/전체 상한 적용 (lock 보유 상태에서 호출)"""
+        entries = self._games.get(game_name)
+        if entries is None:
+            entries = self._games[game_name] = _GameEntries(query_vec.shape[1])
+        self._games.move_to_end(game_name)
+
+        entries.vectors = np.vstack([entries.vectors, query_vec])
+        entries.questions.append(question)
+        entries.answers.append(answer)
+        entries.created_at.append(created_at)
+        self._size += 1
+
+        # 게임별 상한: 가장 오래된 항목부터 제거
+        if len(entries) > self.max_per_game:
+            keep = np.arange(len(entries)) >= len(entries) - self.max_per_game
+            self._size -= int((~keep).sum())
+            entries.remove(keep)
+
+        # 전체 상한: 가장 오래 사용하지 않은 게임의 항목부터 제거
+        while self._size > self.max_entries and self._games:
+            oldest_name, oldest = next(iter(self._games.items()))
+            if len(oldest):
+                oldest.remove(np.arange(len(oldest)) > 0)
+                self._size -= 1
+            if not len(oldest):
+                del self._games[oldest_name]
+
+    def get_stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": self._size,
+            "games": len(self._games),
+            "threshold": self.threshold,
+            "shared": self._db is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "similarity_distribution": {
+                f"<={upper}": count for upper, count in zip(SIMILARITY_BUCKETS, self.similarity_counts)
+            }
+        }
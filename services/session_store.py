@@ -0,0 +1,247 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import messages_from_dict, messages_to_dict
+
+from services.tokens import count_tokens
+from services.shared_state import is_multi_worker, shared_state_path, connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+
+def _trim_count(token_counts, token_budget):
+    """예산을 넘는 동안 앞에서부터 질문+답변 한 턴(2개)씩 제거할 메시지 수 (마지막 턴은 남김)"""
+    total = sum(token_counts)
+    drop = 0
+    while token_budget and total > token_budget and len(token_counts) - drop > 2:
+        total -= sum(token_counts[drop:drop + 2])
+        drop += 2
+    return drop
+
+
+class BoundedHistory(BaseChatMessageHistory):
+    """토큰 예산을 넘으면 가장 오래된 대화 턴부터 잘라내는 세션 히스토리 (LangChain용)
+
+    store(SessionStore)가 SQLite 계층을 쓰면 메시지는 처음 읽을 때 불러옵니다.
+    RunnableWithMessageHistory는 aget_messages / aadd_messages를 executor에서 실행하므로
+    SQLite 조회와 쓰기는 이벤트 루프 밖에서 일어납니다.
+    """
+
+    def __init__(self, session_id, token_budget, store=None, messages=None):
+        self.session_id = session_id
+        self.token_budget = token_budget
+        self._store = store
+        self._messages = None
+        self._token_counts = None
+        self._lock = threading.Lock()
+        if messages is not None or store is None or store._db is None:
+            self._set(list(messages or []))
+
+    def _set(self, messages, token_counts=None):
+        self._messages = messages
+        self._token_counts = token_counts if token_counts is not None else [count_tokens(str(m.content)) for m in messages]
+
+    def _ensure_loaded(self):
+        if self._messages is None:
+            with self._lock:
+                if self._messages is None:
+                    self._set(*self._store._load(self.session_id))
+
+    @property
+    def messages(self):
+        self._ensure_loaded()
+        return self._messages
+
+    @property
+    def token_count(self):
+        self._ensure_loaded()
+        return sum(self._token_counts)
+
+    def add_messages(self, messages):
+        messages = list(messages)
+        token_counts = [count_tokens(str(m.content)) for m in messages]
+        if self._store is not None and self._store._db is not None:
+            # SQLite에 메시지 행을 덧붙이고 잘라낸 뒤의 전체 히스토리를 다시 읽음 (다른 워커가 추가한 턴 포함)
+            with self._lock:
+                self._set(*self._store._append(self.session_id, messages, token_counts, self.token_budget))
+            return
+
+        with self._lock:
+            self._ensure_loaded()
+            self._messages.extend(messages)
+            self._token_counts.extend(token_counts)
+            drop = _trim_count(self._token_counts, self.token_budget)
+            del self._messages[:drop]
+            del self._token_counts[:drop]
+
+    def clear(self):
+        with self._lock:
+            if self._store is not None and self._store._db is not None:
+                self._store._delete(self.session_id)
+            self._set([])
+
+    def __repr__(self):
+        return str(self.messages)
+
+
+class SessionStore:
+    """세션 히스토리 저장소
+
+    - SESSION_TOKEN_BUDGET: 세션별 히스토리 토큰 예산 (초과 시 오래된 턴 제거)
+    - SESSION_TTL_SECONDS: 이 시간 동안 사용하지 않은 세션은 메모리에서 제거
+    - SESSION_MAX_COUNT: 메모리에 유지할 최대 세션 수 (초과 시 LRU 제거)
+    - SESSION_DB_PATH: 지정하면 SQLite에 기록해 메모리에서 빠진 세션도 복원
+    - SESSION_DB_TTL_SECONDS: SQLite 계층의 세션 보관 시간 (0이면 만료 없음)
+
+    SQLite에는 메시지마다 한 행을 덧붙이고, 예산을 넘는 앞쪽 턴은 같은 BEGIN IMMEDIATE 트랜잭션에서 지웁니다.
+    같은 세션에 두 워커가 동시에 턴을 추가해도 행 전체를 덮어쓰지 않으므로 어느 턴도 사라지지 않습니다.
+    멀티 워커(shared)에서는 같은 세션의 요청이 다른 워커로 갈 수 있으므로 메모리 계층 없이
+    매 요청 SQLite(SESSION_DB_PATH, 기본 SHARED_STATE_DIR/sessions.sqlite)에서 읽고 씁니다.
+    """
+
+    def __init__(self, token_budget=None, ttl_seconds=None, max_sessions=None, db_path=None, shared=None):
+        self.token_budget = token_budget if token_budget is not None else int(os.getenv("SESSION_TOKEN_BUDGET", "1500"))
+        self.ttl = ttl_seconds if ttl_seconds is not None else float(os.getenv("SESSION_TTL_SECONDS", "1800"))
+        self.max_sessions = max_sessions or int(os.getenv("SESSION_MAX_COUNT", "1000"))
+        self.shared = is_multi_worker() if shared is None else shared
+        if db_path is None:
+            db_path = os.getenv("SESSION_DB_PATH", "") or (shared_state_path("sessions.sqlite") if self.shared else "")
+        self.db_ttl = float(os.getenv("SESSION_DB_TTL_SECONDS", "0"))
+
+        self._sessions = OrderedDict()  # session_id -> (history, last_access)
+        self._lock = threading.RLock()
+        self.evictions = 0
+        self.restored = 0
+
+        self._db = None
+        if db_path:
+            try:
+                self._db = connect_sqlite(db_path)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS session_messages (seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                    " session_id TEXT, message TEXT, tokens INTEGER, created_at REAL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS session_messages_session ON session_messages (session_id, seq)")
+                self._migrate()
+                self._db.commit()
+                logger.info(f"✅ 세션 SQLite 저장소 연결: {db_path}")
+            except Exception as e:
+                logger.warning(f"⚠️ 세션 SQLite 저장소를 사용할 수 없습니다 (메모리만 사용): {str(e)}")
+                self._db = None
+        if self._db is None:
+            self.shared = False
+
+    def _migrate(self):
+        """세션마다 메시지 목록 JSON 한 행을 쓰던 이전 sessions 테이블을 메시지 행으로 옮김"""
+        if not self._db.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'sessions'").fetchone():
+            return
+        for session_id, messages, updated_at in self._db.execute("SELECT session_id, messages, updated_at FROM sessions").fetchall():
+            self._db.executemany(
+                "INSERT INTO session_messages (session_id, message, tokens, created_at) VALUES (?, ?, ?, ?)",
+                [
+                    (session_id, json.dumps(message, ensure_ascii=False), count_tokens(str(message["data"]["content"])), updated_at)
+                    for message in json.loads(messages)
+                ]
+            )
+        self._db.execute("DROP TABLE sessions")
+
+    def _rows(self, session_id):
+        return self._db.execute(
+            "SELECT seq, message, tokens FROM session_messages WHERE session_id = ? ORDER BY seq", (session_id,)
+        ).fetchall()
+
+    @staticmethod
+    def _decode(rows):
+        return messages_from_dict([json.loads(row[1]) for row in rows]), [row[2] for row in rows]
+
+    def _load(self, session_id):
+        """SQLite의 세션 히스토리 (메시지 목록, 메시지별 토큰 수). executor 스레드에서 호출"""
+        with self._lock:
+            if self.db_ttl:
+                last = self._db.execute(
+                    "SELECT MAX(created_at) FROM session_messages WHERE session_id = ?", (session_id,)
+                ).fetchone()[0]
+                if last is not None and time.time() - last > self.db_ttl:
+                    self._delete(session_id)
+                    return [], []
+            rows = self._rows(session_id)
+            if rows and not self.shared:
+                self.restored += 1
+            return self._decode(rows)
+
+    def _append(self, session_id, messages, token_counts, token_budget):
+        """메시지 행을 덧붙이고 예산을 넘는 앞쪽 턴을 지운 뒤 남은 히스토리 반환 (한 트랜잭션)"""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(
+                    "INSERT INTO session_messages (session_id, message, tokens, created_at) VALUES (?, ?, ?, ?)",
+                    [
+                        (session_id, json.dumps(message, ensure_ascii=False), tokens, now)
+                        for message, tokens in zip(messages_to_dict(messages), token_counts)
+                    ]
+                )
+                rows = self._rows(session_id)
+                drop = _trim_count([row[2] for row in rows], token_budget)
+                if drop:
+                    self._db.execute(
+                        "DELETE FROM session_messages WHERE session_id = ? AND seq <= ?", (session_id, rows[drop - 1][0])
+                    )
+                    rows = rows[drop:]
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+            return self._decode(rows)
+
+    def _delete(self, session_id):
+        with self._lock:
+            self._db.execute("DELETE FROM session_messages WHERE session_id = ?", (session_id,))
+            self._db.commit()
+
+    def _evict(self, now):
+        """TTL이 지난 세션과 최대 개수를 넘는 LRU 세션 제거 (lock 보유 상태에서 호출)"""
+        while self._sessions:
+            session_id, (_, last_access) = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_sessions or (self.ttl and now - last_access > self.ttl):
+                del self._sessions[session_id]
+                self.evictions += 1
+            else:
+                break
+
+    def get(self, session_id):
+        """세션 히스토리. SQLite는 여기서 읽지 않고 메시지를 처음 사용할 때 불러옴 (이벤트 루프에서 호출됨)"""
+        if self.shared:
+            # 다른 워커가 갱신했을 수 있으므로 메모리에 두지 않고 매번 SQLite에서 복원
+            return BoundedHistory(session_id, self.token_budget, self)
+
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry is not None and self.ttl and now - entry[1] > self.ttl:
+                self.evictions += 1
+                entry = None
+
+            history = entry[0] if entry is not None else BoundedHistory(session_id, self.token_budget, self)
+            self._sessions[session_id] = (history, now)
+            self._evict(now)
+            return history
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "shared": self.shared,
+                "max_sessions": self.max_sessions,
+                "token_budget": self.token_budget,
+                "ttl_seconds": self.ttl,
+                "persistent": self._db is not None,
+                "evictions": self.evictions,
+                "restored": self.restored
+            }
@@ -0,0 +1,86 @@
+"""
+멀티 워커 실행 설정 (uvicorn --workers N, WEB_CONCURRENCY=N)
+
+워커 프로세스마다 인덱스와 코퍼스를 따로 읽어 RSS가 워커 수만큼 늘지 않도록
+- FAISS 인덱스는 mmap 플래그로 열어 모든 워커가 같은 OS 페이지 캐시를 공유하고
+- 세션/캐시 상태는 SHARED_STATE_DIR 아래의 SQLite(WAL) 파일로 공유합니다.
+
+IndexFlat 계열(추천/룰 인덱스 기본값) 코드를 mmap하려면 IO_FLAG_MMAP_IFC가 있는 FAISS 1.10 이상이 필요합니다
+(requirements.txt는 faiss-cpu 1.15.1). 구버전은 IVF 역리스트만 mmap하므로 Flat 인덱스는 워커마다 메모리로 읽힙니다.
+임베딩 모델(bge-m3)은 워커마다 로드되고, 파인튜닝 모델은 워커가 2개 이상이면 로드하지 않습니다 (main.py).
+
+환경변수:
+    WEB_CONCURRENCY       워커 프로세스 수 (기본 1, main.py 실행 시 uvicorn workers로도 사용)
+    FAISS_MMAP            auto | 1 | 0  (기본 auto: 워커가 2개 이상일 때만 mmap)
+    SHARED_STATE_DIR      공유 SQLite 파일 폴더 (기본 data/shared_state)
+    SQLITE_BUSY_TIMEOUT   다른 워커가 쓰는 중일 때 기다리는 시간(초, 기본 5)
+"""
+
+import os
+import sqlite3
+import logging
+from functools import lru_cache
+
+import faiss
+
+logger = logging.getLogger(__name__)
+
+
+def worker_count():
+    return max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+
+
+def is_multi_worker():
+    return worker_count() > 1
+
+
+def flat_mmap_supported():
+    """설치된 FAISS가 IndexFlat 계열 코드를 mmap할 수 있는지 (IO_FLAG_MMAP_IFC, FAISS 1.10+)"""
+    return hasattr(faiss, "IO_FLAG_MMAP_IFC")
+
+
+@lru_cache(maxsize=1)
+def _warn_flat_mmap_unsupported():
+    logger.warning(
+        f"⚠️ FAISS {faiss.__version__}는 Flat 인덱스를 mmap하지 않아 워커마다 인덱스를 메모리로 읽습니다. "
+        "인덱스 메모리를 워커끼리 공유하려면 FAISS 1.10 이상(IO_FLAG_MMAP_IFC)을 설치하세요."
+    )
+
+
+def faiss_io_flags():
+    """FAISS_MMAP 설정에 따른 read_index 플래그 (0이면 메모리로 읽음)"""
+    setting = os.getenv("FAISS_MMAP", "auto").lower()
+    enabled = is_multi_worker() if setting == "auto" else setting == "1"
+    if not enabled:
+        return 0
+    if not flat_mmap_supported():
+        # 구버전은 IVF 역리스트만 mmap하고 IndexFlat 코드는 그대로 읽음
+        _warn_flat_mmap_unsupported()
+        return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY | faiss.IO_FLAG_MMAP_IFC
+
+
+def read_index(path, io_flags=None):
+    """FAISS 인덱스 읽기. mmap으로 열 수 없는 인덱스 타입이면 일반 로드로 대체"""
+    flags = faiss_io_flags() if io_flags is None else io_flags
+    if flags:
+        try:
+            return faiss.read_index(path, flags)
+        except RuntimeError as e:
+            logger.warning(f"⚠️ mmap으로 열 수 없어 메모리로 읽습니다 ({path}): {str(e)}")
+    return faiss.read_index(path)
+
+
+def shared_state_path(name):
+    """워커들이 함께 쓰는 SQLite 파일 경로"""
+    directory = os.getenv("SHARED_STATE_DIR", os.path.join("data", "shared_state"))
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, name)
+
+
+def connect_sqlite(path):
+    """여러 프로세스가 동시에 읽고 쓰는 SQLite 연결 (WAL: 읽기가 쓰기를 막지 않음)"""
+    db = sqlite3.connect(path, check_same_thread=False, timeout=float(os.getenv("SQLITE_BUSY_TIMEOUT", "5")))
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    return db
@@ -0,0 +1,230 @@
+"""
+비슷한 게임 이웃 테이블 ("X 같은 게임")
+
+추천 인덱스의 벡터로 게임마다 가장 가까운 N개 게임을 미리 계산해 data/similar_games.npz에 저장하고,
+/similar/{game_name}은 임베딩·검색·LLM 호출 없이 테이블의 한 행을 그대로 반환합니다.
+
+    neighbors       (게임 수, N) uint16/uint32  코사인 유사도 내림차순 이웃 행 번호
+    scores          (게임 수, N) float16
+    row_hashes      (게임 수,) uint64           행 벡터 해시 (증분 갱신용)
+    index_digest    game_index.faiss 파일 해시 (서버가 인덱스 변경을 감지)
+
+인덱스가 바뀌면 벡터가 바뀐 게임과, 이웃 목록에 그런 게임이 있던 게임만 전체 행렬곱으로 다시 계산하고
+나머지 게임은 기존 이웃과 새 게임 사이의 유사도만 합칩니다.
+
+사용법:
+    python -m services.similar_games build          # 변경분만 갱신
+    python -m services.similar_games build --full
+"""
+
+import os
+import hashlib
+import argparse
+import logging
+from collections import defaultdict
+
+import numpy as np
+
+from services.ann_index import load_corpus_vectors
+
+logger = logging.getLogger(__name__)
+
+SIMILAR_PATH = os.path.join("data", "similar_games.npz")
+GAME_INDEX_PATH = os.path.join("data", "game_index.faiss")
+DEFAULT_NEIGHBORS = 20
+_BLOCK_ROWS = 1024  # 행렬곱 블록 크기 (게임 수 × 블록 float32 만큼만 메모리 사용)
+
+
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _row_hashes(vectors):
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(row.tobytes(), digest_size=8).digest(), "little") for row in vectors],
+        dtype="<u8"
+    )
+
+
+def _normalize(vectors):
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores, ids, k):
+    """행마다 scores 상위 k개 (내림차순) → (ids, scores)"""
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    part = np.take_along_axis(part, order, axis=1)
+    return np.take_along_axis(ids, part, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+def compute_neighbors(vectors, rows, k):
+    """rows 행마다 전체 게임 중 자기 자신을 뺀 상위 k개 이웃 (블록 단위 행렬곱)"""
+    rows = np.asarray(rows, dtype="int64")
+    neighbors = np.empty((len(rows), k), dtype="int64")
+    scores = np.empty((len(rows), k), dtype="float32")
+    all_ids = np.arange(len(vectors), dtype="int64")
+    for start in range(0, len(rows), _BLOCK_ROWS):
+        block = rows[start:start + _BLOCK_ROWS]
+        sims = vectors[block] @ vectors.T
+        sims[np.arange(len(block)), block] = -np.inf
+        ids = np.broadcast_to(all_ids, sims.shape)
+        neighbors[start:start + len(block)], scores[start:start + len(block)] = _top_k(sims, ids, k)
+    return neighbors, scores
+
+
+def update_table(vectors, previous=None, k=DEFAULT_NEIGHBORS):
+    """
+    이웃 테이블 계산. previous(이전 테이블 dict)가 있으면 행 벡터 해시로 이전 행을 찾아 재사용.
+    반환: (table dict, 다시 계산한 행 수)
+    """
+    vectors = _normalize(vectors)
+    n = len(vectors)
+    k = max(1, min(k, n - 1))
+    hashes = _row_hashes(vectors)
+
+    neighbors = np.empty((n, k), dtype="int64")
+    scores = np.empty((n, k), dtype="float32")
+    recompute = np.ones(n, dtype=bool)
+
+    if previous is not None and previous["neighbors"].shape[1] == k:
+        # 이전 행 → 새 행 번호 (같은 벡터가 여러 개면 순서대로 짝지음)
+        old_rows = defaultdict(list)
+        for i, h in enumerate(previous["row_hashes"].tolist()):
+            old_rows[h].append(i)
+        old_to_new = np.full(len(previous["row_hashes"]), -1, dtype="int64")
+        reused = np.full(n, -1, dtype="int64")
+        for j, h in enumerate(hashes.tolist()):
+            if old_rows.get(h):
+                i = old_rows[h].pop(0)
+                old_to_new[i], reused[j] = j, i
+
+        added = np.flatnonzero(reused < 0)
+        clean = np.flatnonzero(reused >= 0)
+        if len(clean) and len(added) < n // 2:
+            # 이웃이 모두 남아 있는 행은 기존 상위 k가 그대로 유효하므로 새 게임과의 유사도만 합침
+            old_neighbors = old_to_new[previous["neighbors"][reused[clean]].astype("int64")]
+            clean = clean[(old_neighbors >= 0).all(axis=1)]
+            old_neighbors = old_to_new[previous["neighbors"][reused[clean]].astype("int64")]
+            # 저장된 float16 유사도 대신 다시 계산 (새 게임과 비교할 때 반올림 오차로 순서가 바뀌지 않도록)
+            old_scores = np.einsum("id,ikd->ik", vectors[clean], vectors[old_neighbors])
+            if len(added):
+                candidate_ids = np.hstack([old_neighbors, np.broadcast_to(added, (len(clean), len(added)))])
+                candidate_scores = np.hstack([old_scores, vectors[clean] @ vectors[added].T])
+                neighbors[clean], scores[clean] = _top_k(candidate_scores, candidate_ids, k)
+            else:
+                neighbors[clean], scores[clean] = old_neighbors, old_scores
+            recompute[clean] = False
+
+    rows = np.flatnonzero(recompute)
+    if len(rows):
+        neighbors[rows], scores[rows] = compute_neighbors(vectors, rows, k)
+
+    table = {
+        "neighbors": neighbors.astype(np.min_scalar_type(max(n - 1, 0))),
+        "scores": scores.astype("float16"),
+        "row_hashes": hashes
+    }
+    return table, len(rows)
+
+
+def _read_table(path):
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def save_table(path, table):
+    """임시 파일에 쓴 뒤 교체 (여러 워커가 동시에 갱신해도 섞이지 않도록 임시 파일은 프로세스별)"""
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, **table)
+    os.replace(tmp_path, path)
+
+
+def build_similar_table(path=SIMILAR_PATH, index_path=GAME_INDEX_PATH, k=DEFAULT_NEIGHBORS, full=False):
+    """추천 인덱스 벡터로 이웃 테이블을 만들거나 변경분만 갱신해 저장"""
+    previous = None
+    if not full and os.path.exists(path):
+        try:
+            previous = _read_table(path)
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"⚠️ 기존 이웃 테이블을 읽을 수 없어 전체 계산합니다: {str(e)}")
+
+    vectors = load_corpus_vectors(index_path=index_path)
+    table, recomputed = update_table(vectors, previous, k)
+    table["index_digest"] = np.array(file_digest(index_path))
+    save_table(path, table)
+    logger.info(f"✅ 비슷한 게임 테이블 저장: {len(vectors)}개 게임 중 {recomputed}개 다시 계산 (이웃 {table['neighbors'].shape[1]}개)")
+    return table
+
+
+class SimilarGames:
+    """이웃 테이블 조회 (행 번호 → 이웃 행 번호/유사도)"""
+
+    def __init__(self, table, path=None):
+        self.path = path
+        self.neighbors = table["neighbors"]
+        self.scores = table["scores"]
+
+    def __len__(self):
+        return len(self.neighbors)
+
+    def lookup(self, row):
+        """row의 이웃 [(행 번호, 유사도)] (유사도 내림차순)"""
+        return list(zip(self.neighbors[row].tolist(), self.scores[row].astype("float32").tolist()))
+
+    def get_stats(self):
+        return {
+            "path": self.path,
+            "games": len(self.neighbors),
+            "neighbors": int(self.neighbors.shape[1]),
+            "bytes": int(self.neighbors.nbytes + self.scores.nbytes)
+        }
+
+
+def load_similar_games(size, path=None, index_path=GAME_INDEX_PATH):
+    """
+    이웃 테이블 로드. 테이블이 없거나 추천 인덱스 파일과 해시가 다르면 변경분만 다시 계산해 저장.
+    계산할 수 없으면 None
+    """
+    path = path or os.getenv("SIMILAR_GAMES_PATH", SIMILAR_PATH)
+    k = int(os.getenv("SIMILAR_GAMES_NEIGHBORS", str(DEFAULT_NEIGHBORS)))
+    try:
+        table = _read_table(path) if os.path.exists(path) else None
+        stale = table is None or str(table.get("index_digest")) != file_digest(index_path) or \
+            len(table["neighbors"]) != size or table["neighbors"].shape[1] != max(1, min(k, size - 1))
+        if stale:
+            logger.info("🔄 추천 인덱스가 바뀌어 비슷한 게임 테이블을 갱신합니다.")
+            table = build_similar_table(path, index_path, k)
+    except Exception as e:
+        logger.warning(f"⚠️ 비슷한 게임 테이블을 사용할 수 없습니다: {str(e)}")
+        return None
+
+    if len(table["neighbors"]) != size:
+        logger.warning(f"⚠️ 비슷한 게임 테이블 행 수({len(table['neighbors'])})가 추천 인덱스({size})와 다릅니다.")
+        return None
+    return SimilarGames(table, path)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="비슷한 게임 이웃 테이블")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build_parser = subparsers.add_parser("build", help="추천 인덱스 벡터로 이웃 테이블 생성 (변경분만 갱신)")
+    build_parser.add_argument("--full", action="store_true", help="기존 테이블을 무시하고 전체 계산")
+    build_parser.add_argument("--neighbors", type=int, default=DEFAULT_NEIGHBORS)
+    build_parser.add_argument("--output", default=SIMILAR_PATH)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_similar_table(args.output, k=args.neighbors, full=args.full)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+룰 요약 저장소
+
+사용법:
+    python -m services.summary_store precompute                  # 모든 게임 요약 미리 생성 (최신 항목은 건너뜀)
+    python -m services.summary_store precompute --concurrency 8 --force
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+import logging
+import threading
+
+from services.shared_state import connect_sqlite
+
+logger = logging.getLogger(__name__)
+
+
+def _text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class SummaryStore:
+    """게임 룰 요약을 (게임 이름, 룰 텍스트 해시, 프롬프트 버전, 모델 ID) 키로 디스크에 보관
+
+    키가 정확히 일치하면 최신(fresh) 요약, 같은 게임의 다른 키만 있거나
+    RULE_SUMMARY_MAX_AGE_HOURS보다 오래된 요약은 stale로 반환해 백그라운드 갱신 대상으로 표시합니다.
+    """
+
+    def __init__(self, path=None, max_age_hours=None):
+        self.path = path or os.getenv("RULE_SUMMARY_STORE_PATH", "data/rule_summaries.sqlite")
+        if max_age_hours is None:
+            max_age_hours = float(os.getenv("RULE_SUMMARY_MAX_AGE_HOURS", "0"))
+        self.max_age = max_age_hours * 3600  # 0이면 만료 없음
+
+        self._lock = threading.Lock()
+        self._db = connect_sqlite(self.path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " game_name TEXT, text_hash TEXT, prompt_version TEXT, model_id TEXT,"
+            " summary TEXT, created_at REAL,"
+            " PRIMARY KEY (game_name, text_hash, prompt_version, model_id))"
+        )
+        # 긴 룰의 map-reduce 요약에서 쓰는 구간별 부분 요약 (구간 텍스트가 같으면 재사용)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS partial_summaries ("
+            " text_hash TEXT, prompt_version TEXT, model_id TEXT, summary TEXT, created_at REAL,"
+            " PRIMARY KEY (text_hash, prompt_version, model_id))"
+        )
+        self._db.commit()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def get(self, game_name, rule_text, prompt_version, model_id):
+        """(summary, is_fresh) 반환. 저장된 요약이 전혀 없으면 (None, False)"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT summary, created_at FROM summaries"
+                " WHERE game_name = ? AND text_hash = ? AND prompt_version = ? AND model_id = ?",
+                (game_name, _text_hash(rule_text), prompt_version, model_id)
+            ).fetchone()
+            if row is not None:
+                if self.max_age and time.time() - row[1] > self.max_age:
+                    self.stale_hits += 1
+                    return row[0], False
+                self.hits += 1
+                return row[0], True
+
+            # 룰 텍스트/프롬프트/모델이 바뀌기 전의 요약이라도 있으면 우선 제공
+            row = self._db.execute(
+                "SELECT summary FROM summaries WHERE game_name = ? ORDER BY created_at DESC LIMIT 1",
+                (game_name,)
+            ).fetchone()
+            if row is not None:
+                self.stale_hits += 1
+                return row[0], False
+
+            self.misses += 1
+            return None, False
+
+    def put(self, game_name, rule_text, prompt_version, model_id, summary):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO summaries VALUES (?, ?, ?, ?, ?, ?)",
+                (game_name, _text_hash(rule_text), prompt_version, model_id, summary, time.time())
+            )
+            # 같은 게임의 이전 키 요약은 정리
+            self._db.execute(
+                "DELETE FROM summaries WHERE game_name = ?"
+                " AND NOT (text_hash = ? AND prompt_version = ? AND model_id = ?)",
+                (game_name, _text_hash(rule_text), prompt_version, model_id)
+            )
+            self._db.commit()
+
+    def get_partial(self, text, prompt_version, model_id):
+        """구간 텍스트의 부분 요약, 없으면 None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT summary FROM partial_summaries WHERE text_hash = ? AND prompt_version = ? AND model_id = ?",
+                (_text_hash(text), prompt_version, model_id)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def put_partial(self, text, prompt_version, model_id, summary):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO partial_summaries VALUES (?, ?, ?, ?, ?)",
+                (_text_hash(text), prompt_version, model_id, summary, time.time())
+            )
+            self._db.commit()
+
+    def get_stats(self):
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+            partial_entries = self._db.execute("SELECT COUNT(*) FROM partial_summaries").fetchone()[0]
+        return {
+            "entries": entries,
+            "partial_entries": partial_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses
+        }
+
+
+async def precompute_summaries(game_data, generate, store, prompt_version, model_id, concurrency=4, force=False):
+    """
+    game.json의 모든 게임 요약을 동시성 제한 안에서 생성해 store에 채움.
+    generate(game_name, rule_text) -> summary 코루틴. force가 아니면 최신 요약이 있는 게임은 건너뜁니다.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    # 같은 이름이 여러 번 있으면 서비스와 동일하게 첫 번째 항목 기준
+    games = {}
+    for game in game_data:
+        if game.get("game_name") and game.get("text") and game["game_name"] not in games:
+            games[game["game_name"]] = game["text"]
+
+    async def precompute_one(game_name, rule_text):
+        if not force:
+            _, fresh = store.get(game_name, rule_text, prompt_version, model_id)
+            if fresh:
+                return "skipped"
+        async with semaphore:
+            summary = await generate(game_name, rule_text)
+        store.put(game_name, rule_text, prompt_version, model_id, summary)
+        logger.info(f"✅ 룰 요약 생성: {game_name}")
+        return "generated"
+
+    results = await asyncio.gather(
+        *(precompute_one(name, text) for name, text in games.items()),
+        return_exceptions=True
+    )
+    for game_name, result in zip(games, results):
+        if isinstance(result, Exception):
+            logger.error(f"❌ 룰 요약 생성 실패 ({game_name}): {str(result)}")
+
+    return {
+        "generated": sum(1 for r in results if r == "generated"),
+        "skipped": sum(1 for r in results if r == "skipped"),
+        "failed": sum(1 for r in results if isinstance(r, Exception))
+    }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="룰 요약 저장소 관리")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    precompute_parser = subparsers.add_parser("precompute", help="모든 게임의 룰 요약 미리 생성")
+    precompute_parser.add_argument("--concurrency", type=int, default=4)
+    precompute_parser.add_argument("--force", action="store_true", help="최신 요약이 있어도 다시 생성")
+    args = parser.parse_args()
+
+    from langchain_openai import ChatOpenAI
+    from services.rag_service import build_rule_summary_prompt, LLM_MODEL_ID, RULE_SUMMARY_PROMPT_VERSION
+    from services.rule_summarizer import RuleTextReducer, load_rule_chunks
+
+    store = SummaryStore()
+    llm = ChatOpenAI(model_name=LLM_MODEL_ID, temperature=0.7, openai_api_key=os.getenv("OPENAI_API_KEY"))
+    chain = build_rule_summary_prompt() | llm
+    reducer = RuleTextReducer(llm, store, LLM_MODEL_ID)
+    rule_chunks = load_rule_chunks()
+
+    async def generate(game_name, rule_text):
+        # 긴 룰은 서비스와 동일하게 구간별 부분 요약 후 합쳐서 요약
+        prepared = await reducer.prepare(game_name, rule_text, rule_chunks.get(game_name))
+        response = await chain.ainvoke({"game_name": game_name, "game_rule_text": prepared, "history": []})
+        return response.content.strip()
+
+    from services.corpus_store import open_corpus
+    corpus = open_corpus()
+    if corpus:
+        game_data = corpus.game_data
+    else:
+        with open("data/game.json", "r", encoding="utf-8") as f:
+            game_data = json.load(f)
+
+    result = asyncio.run(precompute_summaries(
+        game_data, generate, store, RULE_SUMMARY_PROMPT_VERSION, LLM_MODEL_ID,
+        concurrency=args.concurrency, force=args.force
+    ))
+    logger.info(f"🎉 룰 요약 사전 생성 완료: {result}")
+
+
+if __name__ == "__main__":
+    main()
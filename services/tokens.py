@@ -0,0 +1,51 @@
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _get_encoding(model_name):
+    """
+    모델의 tiktoken 인코딩. 없거나 만들 수 없으면 None (글자 수 근사).
+    tiktoken은 처음 사용할 때 BPE 파일을 내려받으므로, 네트워크가 없는 배포에서는
+    TIKTOKEN_CACHE_DIR에 미리 받아 둔 파일을 두어야 합니다 (실패 결과도 캐시되어 요청마다 다시 시도하지 않음).
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        logger.warning("⚠️ tiktoken이 없어 토큰 수를 글자 수로 근사합니다.")
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"⚠️ tiktoken 인코딩을 불러올 수 없어 토큰 수를 글자 수로 근사합니다 "
+                       f"(오프라인이면 TIKTOKEN_CACHE_DIR 확인): {str(e)}")
+        return None
+
+
+def count_tokens(text: str, model_name: str = "gpt-3.5-turbo") -> int:
+    """OpenAI 토크나이저 기준 토큰 수 (tiktoken이 없으면 한국어 기준 대략 글자 수로 근사)"""
+    if not text:
+        return 0
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return len(text)
+    return len(encoding.encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int, model_name: str = "gpt-3.5-turbo") -> str:
+    """앞에서부터 max_tokens 토큰까지만 남김 (문장 경계를 찾지 못했을 때의 마지막 수단)"""
+    if max_tokens <= 0:
+        return ""
+    encoding = _get_encoding(model_name)
+    if encoding is None:
+        return text[:max_tokens]
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    # 멀티바이트 문자가 토큰 경계에서 잘리면 깨진 글자가 생기므로 제거
+    return encoding.decode(tokens[:max_tokens]).rstrip("�")
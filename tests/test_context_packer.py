@@ -0,0 +1,90 @@
+import pytest
+
+from services import context_packer
+from services.context_packer import MIN_BLOCK_TOKENS, pack_blocks, pack_context, split_sentences, truncate_to_budget
+
+# 40글자 문장 (토큰 수 = 글자 수, 블록 안에서는 줄바꿈 포함 41)
+A1 = "A1 주사위를 굴려 나온 숫자만큼 자원을 받습니다".ljust(39, "~") + "."
+A2 = "A2 도적이 있는 타일은 자원을 생산하지 않습니다".ljust(39, "~") + "."
+B1 = "B1 같은 색이나 같은 숫자의 카드를 낼 수 있습니다".ljust(39, "~") + "."
+B2 = "B2 낼 카드가 없으면 더미에서 한 장을 가져옵니다".ljust(39, "~") + "."
+C1 = "C1 마지막 한 장이 남으면 우노를 외쳐야 합니다".ljust(39, "~") + "."
+
+
+@pytest.fixture(autouse=True)
+def char_tokens(monkeypatch):
+    # tiktoken BPE 파일 다운로드 없이 글자 수를 토큰 수로 사용
+    monkeypatch.setattr(context_packer, "count_tokens", len)
+    monkeypatch.setattr(context_packer, "truncate_tokens", lambda text, max_tokens: text[:max_tokens])
+
+
+def _text(*sentences):
+    return "\n".join(sentences)
+
+
+def test_split_sentences_keeps_original_text():
+    text = "첫 문장입니다. 두 번째 문장! 세 번째?\n줄바꿈 문장"
+    sentences = split_sentences(text)
+    assert "".join(sentences) == text
+    assert len(sentences) == 4
+
+
+def test_truncate_to_budget_keeps_whole_sentences():
+    assert truncate_to_budget(["abc ", "def ", "ghi"], 9) == (["abc ", "def "], 8)
+    # 첫 문장부터 예산을 넘으면 토큰 단위로 자름
+    assert truncate_to_budget(["abcdefgh"], 5) == (["abcde"], 5)
+
+
+def test_blocks_are_packed_by_score_within_budget():
+    blocks = [
+        {"text": _text(B1, B2), "score": 0.5},
+        {"text": _text(A1, A2), "score": 0.9},
+    ]
+    packed = pack_blocks(blocks, token_budget=200)
+
+    assert packed == [_text(A1, A2), _text(B1, B2)]
+    assert len(pack_context(blocks, token_budget=200)) <= 200
+
+
+def test_duplicate_sentences_are_removed_across_blocks():
+    blocks = [
+        {"text": _text(A1, A2), "score": 0.9},
+        {"text": _text(A2, B1), "score": 0.8},
+        {"text": _text(A1), "score": 0.7},
+    ]
+    packed = pack_blocks(blocks, token_budget=500)
+
+    assert packed == [_text(A1, A2), B1]
+
+
+def test_last_block_is_cut_at_sentence_boundary():
+    blocks = [
+        {"text": _text(A1, A2), "score": 0.9, "title": "카탄"},
+        {"text": _text(B1, B2), "score": 0.8, "title": "우노"},
+    ]
+    # 첫 블록 "[카탄]\n" + 81글자, 구분자 2글자, 두 번째 블록 제목 5글자 + 한 문장(41글자)까지만 들어감
+    packed = pack_blocks(blocks, token_budget=140)
+
+    assert packed == ["[카탄]\n" + _text(A1, A2), "[우노]\n" + B1]
+    assert len(pack_context(blocks, token_budget=140)) <= 140
+
+
+def test_block_budget_leaves_room_for_later_blocks():
+    blocks = [
+        {"text": _text(A1, A2, C1), "score": 0.9},
+        {"text": _text(B1, B2), "score": 0.8},
+    ]
+    assert len(pack_blocks(blocks, token_budget=130)) == 1
+
+    packed = pack_blocks(blocks, token_budget=130, block_budget=64)
+    assert packed == [A1, B1]
+
+
+def test_packing_stops_when_remaining_budget_is_too_small():
+    blocks = [
+        {"text": _text(A1, A2), "score": 0.9},
+        {"text": _text(B1), "score": 0.8},
+    ]
+    packed = pack_blocks(blocks, token_budget=81 + 2 + MIN_BLOCK_TOKENS - 1)
+
+    assert packed == [_text(A1, A2)]
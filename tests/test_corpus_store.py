@@ -0,0 +1,78 @@
+import pytest
+
+from services.corpus_store import CorpusStore, open_corpus, write_corpus
+
+GAME_DATA = [
+    {"id": "1", "game_name": "Catan", "section": "rule", "text": "자원을 모읍니다. 도적을 옮깁니다.", "players": "3-4"},
+    {"id": "2", "game_name": "BTS 우노", "section": "rule", "text": "같은 색을 냅니다.", "players": "2-10"},
+    {"id": "3", "game_name": "Catan", "section": "rule", "text": "자원을 모읍니다. 도적을 옮깁니다.", "players": "3-4"},
+    {"id": "4", "game_name": "Dune", "section": "", "text": "", "players": None},
+]
+CHUNKED_RULES = {
+    "Catan": {"game_name": "Catan", "chunks": ["자원을 모읍니다.", " ", "도적을 옮깁니다."]},
+    "BTS 우노": {"game_name": "BTS 우노", "chunks": ["같은 색을 냅니다.", "룰 텍스트에 없는 청크"]},
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = str(tmp_path / "corpus.bin")
+    write_corpus(path, GAME_DATA, CHUNKED_RULES)
+    return CorpusStore(path)
+
+
+def test_games_round_trip(store):
+    assert len(store.game_data) == len(GAME_DATA)
+    assert list(store.texts) == [game["text"] for game in GAME_DATA]
+    assert list(store.game_names) == [game["game_name"] for game in GAME_DATA]
+    assert dict(store.game_data[1]) == GAME_DATA[1]
+    assert store.game_data[-1]["players"] == ""
+    assert store.game_data[1:3][1]["id"] == "3"
+
+
+def test_rule_chunks_round_trip_without_empty_chunks(store):
+    assert list(store.chunks("Catan")) == ["자원을 모읍니다.", "도적을 옮깁니다."]
+    # 룰 인덱스 키(공백→'_')와 게임 이름 모두로 조회
+    assert list(store.chunks("BTS_우노")) == list(store.chunks("BTS 우노")) == ["같은 색을 냅니다.", "룰 텍스트에 없는 청크"]
+    assert store.chunks("Dune") is None
+    assert store.rule_keys() == {"Catan", "BTS_우노"}
+
+
+def test_repeated_strings_are_stored_once(store):
+    # 같은 문자열은 한 번만, 게임 텍스트 안에 있는 룰 청크는 blob에 다시 저장하지 않음
+    fields = {str(game.get(field) or "") for game in GAME_DATA for field in ("id", "game_name", "section", "text", "players")}
+    unique = fields | {"BTS_우노", "룰 텍스트에 없는 청크"}
+    assert store.get_stats()["blob_bytes"] == sum(len(text.encode("utf-8")) for text in unique)
+
+
+def test_open_corpus_falls_back_when_file_is_missing_or_invalid(tmp_path):
+    assert open_corpus(str(tmp_path / "missing.bin")) is None
+
+    invalid = tmp_path / "invalid.bin"
+    invalid.write_bytes(b"NOTACORPUS" + b"\0" * 64)
+    assert open_corpus(str(invalid)) is None
+    with pytest.raises(ValueError):
+        CorpusStore(str(invalid))
+
+
+def test_consolidated_rule_index_reads_chunks_from_corpus(store, tmp_path):
+    pytest.importorskip("faiss")
+    import numpy as np
+
+    from services.index_builder import write_rules_index
+    from services.rules_index import ConsolidatedRuleIndex
+
+    vectors = np.eye(4, dtype="float32")
+    index_path, table_path = str(tmp_path / "rules_index.faiss"), str(tmp_path / "rules_table.json")
+    write_rules_index([
+        ("BTS_우노", "BTS 우노", vectors[:2], list(store.chunks("BTS_우노"))),
+        ("Catan", "Catan", vectors[2:], list(store.chunks("Catan"))),
+    ], index_path, table_path)
+
+    rules_index = ConsolidatedRuleIndex(index_path, table_path, corpus=store)
+    assert list(rules_index.get_chunks("Catan")) == ["자원을 모읍니다.", "도적을 옮깁니다."]
+    assert rules_index.search(vectors[3], k=1)[0]["chunk"] == "도적을 옮깁니다."
+    assert rules_index.search(vectors[3], k=1, game_name="BTS_우노")[0]["game_name"] == "BTS 우노"
+    # 코퍼스 저장소 없이는 청크를 찾을 수 없으므로 ValueError (게임별 인덱스로 대체)
+    with pytest.raises(ValueError):
+        ConsolidatedRuleIndex(index_path, table_path)
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from services.game_attributes import CATEGORY_BITS, GameAttributes, build_columns, parse_constraints, rerank
+
+GAME_DATA = [
+    {"game_name": "뱅", "players": "4~7", "text": "정체를 숨기고 블러핑하는 게임. 플레이 시간 30분"},
+    {"game_name": "듀얼", "players": "2", "text": "두 사람이 겨루는 게임. play time: 20분"},
+    {"game_name": "마피아", "players": "6~12", "text": "밤마다 범인을 찾습니다. 플레이 시간 60분"},
+    {"game_name": "모름", "players": "~", "text": ""},
+    {"game_name": "파티", "players": "3~10", "text": "여럿이 함께 즐기는 게임"},
+]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("4명이서 할 게임", {"players": (4, 4)}),
+    ("3~5명", {"players": (3, 5)}),
+    ("5인 이상 게임", {"players": (5, None)}),
+    ("4명 이하", {"players": (None, 4)}),
+    ("셋이서 할 만한 거", {"players": (3, 3)}),
+    ("혼자 하는 게임", {"players": (1, 1)}),
+    ("30분 이내 게임", {"max_time": 30}),
+    ("1시간 이상 걸리는 게임", {"min_time": 60}),
+    ("인기 있는 게임 추천", {}),
+])
+def test_parse_constraints(query, expected):
+    assert parse_constraints(query) == expected
+
+
+def test_parse_constraints_combines_conditions():
+    constraints = parse_constraints("30분 안에 끝나는 4명 파티 추리 게임")
+    assert constraints == {"players": (4, 4), "max_time": 30, "categories": ["party", "deduction"]}
+
+
+def test_build_columns_extracts_attributes():
+    columns = build_columns(GAME_DATA, overrides={})
+    assert columns["min_players"].tolist() == [4, 2, 6, 0, 3]
+    assert columns["max_players"].tolist() == [7, 2, 12, 0, 10]
+    assert columns["play_time"].tolist() == [30, 20, 60, 0, 0]
+    # 최대 8인 이상이면 본문 키워드가 없어도 파티
+    assert columns["categories"][2] & CATEGORY_BITS["party"]
+    assert not columns["curated"].any()
+
+
+def test_mask_filters_players_and_keeps_unknown_games():
+    attributes = GameAttributes(build_columns(GAME_DATA, overrides={}))
+    assert attributes.mask({"players": (4, 4)}).tolist() == [True, False, False, True, True]
+    assert attributes.mask({"players": (8, None)}).tolist() == [False, False, True, True, True]
+    assert attributes.mask({"players": (None, 2)}).tolist() == [False, True, False, True, False]
+
+
+def test_keyword_attributes_only_boost_without_overrides():
+    attributes = GameAttributes(build_columns(GAME_DATA, overrides={}))
+    constraints = {"max_time": 30, "categories": ["bluff"]}
+
+    assert attributes.mask(constraints) is None
+    boost = attributes.boost(constraints, weight=0.1)
+    assert boost == pytest.approx([0.2, 0.1, 0.0, 0.0, 0.0])
+    assert attributes.boost({"players": (4, 4)}) is None
+
+
+def test_curated_overrides_become_hard_filters():
+    overrides = {"파티": {"play_time": 90, "categories": ["party"]}, "뱅": {"categories": ["bluff", "deduction"]}}
+    attributes = GameAttributes(build_columns(GAME_DATA, overrides=overrides))
+
+    # 지정한 값이 있는 게임만 거르고, 나머지는 키워드 값과 관계없이 통과
+    assert attributes.mask({"max_time": 60}).tolist() == [True, True, True, True, False]
+    assert attributes.mask({"categories": ["party"]}).tolist() == [False, True, True, True, True]
+
+
+def test_rerank_adds_boost_and_skips_missing_ids():
+    scores = np.array([[0.9, 0.85, 0.8]], dtype="float32")
+    ids = np.array([[0, 1, -1]], dtype="int64")
+    boost = np.array([0.0, 0.1], dtype="float32")
+
+    new_scores, new_ids = rerank(scores, ids, boost, k=2)
+    assert new_ids.tolist() == [[1, 0]]
+    assert new_scores[0].tolist() == pytest.approx([0.95, 0.9])
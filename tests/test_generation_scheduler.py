@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("torch")
+
+from services.generation_scheduler import GenerationScheduler, _resolve
+
+
+class _Tokenizer:
+    eos_token_id = 2
+    pad_token_id = 0
+
+
+def _failing_prefill(requests):
+    raise RuntimeError("CUDA out of memory")
+
+
+def test_generate_raises_when_prefill_fails():
+    scheduler = GenerationScheduler(model=None, tokenizer=_Tokenizer(), device="cpu", max_wait_ms=0)
+    scheduler._prefill = _failing_prefill
+    try:
+        async def run():
+            # prefill에서 난 오류가 전달되어야 하고, 타임아웃(멈춤)이면 실패
+            return await asyncio.wait_for(scheduler.generate("질문", max_new_tokens=4), timeout=5)
+
+        with pytest.raises(RuntimeError, match="out of memory"):
+            asyncio.run(run())
+    finally:
+        scheduler.shutdown()
+
+
+def test_stream_ends_with_error_when_prefill_fails():
+    scheduler = GenerationScheduler(model=None, tokenizer=_Tokenizer(), device="cpu", max_wait_ms=0)
+    scheduler._prefill = _failing_prefill
+    try:
+        async def run():
+            async def consume():
+                return [text async for text in scheduler.stream("질문", max_new_tokens=4)]
+            return await asyncio.wait_for(consume(), timeout=5)
+
+        with pytest.raises(RuntimeError, match="out of memory"):
+            asyncio.run(run())
+    finally:
+        scheduler.shutdown()
+
+
+def test_max_new_tokens_is_clamped(monkeypatch):
+    monkeypatch.setenv("GEN_MAX_NEW_TOKENS", "16")
+    scheduler = GenerationScheduler(model=None, tokenizer=_Tokenizer(), device="cpu", max_wait_ms=0)
+    enqueued = []
+    scheduler._enqueue = lambda request: (enqueued.append(request.max_new_tokens), _resolve(request.future, ""))
+    try:
+        asyncio.run(scheduler.generate("질문", max_new_tokens=100000))
+        asyncio.run(scheduler.generate("질문", max_new_tokens=0))
+        assert enqueued == [16, 1]
+    finally:
+        scheduler.shutdown()
@@ -0,0 +1,54 @@
+from services.name_resolver import GameNameResolver, normalize_name
+
+NAMES = ["Catan", "Catan Junior", "Carcassonne", "Uno", "BTS 우노", "Dune"]
+
+
+def _resolver(**kwargs):
+    kwargs = {"fuzzy_threshold": 0.6, "short_threshold": 0.8, "fuzzy_margin": 0.1, **kwargs}
+    return GameNameResolver(NAMES, {"카탄": "Catan", "없는 별칭": "Nothing"}, **kwargs)
+
+
+def test_normalize_name_ignores_case_spaces_and_punctuation():
+    assert normalize_name("BTS 우노") == normalize_name("bts_우노") == normalize_name("ＢＴＳ우노!")
+
+
+def test_exact_and_normalized_names_resolve_to_canonical():
+    resolver = _resolver()
+    assert resolver.resolve("Catan") == "Catan"
+    assert resolver.resolve("bts_우노") == "BTS 우노"
+    assert resolver.resolve("") is None
+    assert len(resolver) == len(NAMES)
+
+
+def test_alias_resolves_to_target_and_unknown_target_is_skipped():
+    resolver = _resolver()
+    assert resolver.resolve("카탄") == "Catan"
+    assert resolver.resolve_id("카탄") == resolver.resolve_id("Catan")
+    assert resolver.resolve("없는 별칭") is None
+
+
+def test_fuzzy_match_accepts_clear_typos():
+    resolver = _resolver()
+    assert resolver.resolve("carcasone") == "Carcassonne"
+    assert resolver.resolve("catan junor") == "Catan Junior"
+    # 별칭으로도 유사도 매칭되며, 같은 게임의 별칭은 경쟁 후보로 세지 않음
+    assert resolver.resolve("카탄!!") == "Catan"
+
+
+def test_fuzzy_match_rejects_ambiguous_names():
+    # 1위가 임계값은 넘지만 2위와의 차이가 margin보다 작으면 해석하지 않음
+    resolver = _resolver(fuzzy_margin=0.3)
+    assert resolver.resolve("catan jr") is None
+    assert resolver.suggest("catan jr")[:2] == ["Catan", "Catan Junior"]
+
+
+def test_short_names_need_higher_similarity():
+    # 'duna'는 'dune'과 유사도 0.67: 일반 임계값(0.6)은 넘지만 짧은 이름 임계값(0.8)은 넘지 못함
+    resolver = _resolver()
+    assert resolver.resolve("Duna") is None
+    assert resolver.suggest("Duna")[0] == "Dune"
+    assert _resolver(short_threshold=0.6).resolve("Duna") == "Dune"
+
+
+def test_suggest_returns_nothing_for_unrelated_names():
+    assert _resolver().suggest("zzzz") == []
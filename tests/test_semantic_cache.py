@@ -0,0 +1,87 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from services import semantic_cache
+from services.semantic_cache import SemanticAnswerCache
+
+
+class _Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(semantic_cache, "time", clock)
+    return clock
+
+
+def _unit(*values):
+    vector = np.asarray(values, dtype="float32")
+    return vector / np.linalg.norm(vector)
+
+
+def _cache(**kwargs):
+    kwargs = {"threshold": 0.9, "ttl_seconds": 60, "max_per_game": 4, "max_entries": 8, "db_path": "", **kwargs}
+    return SemanticAnswerCache(**kwargs)
+
+
+def test_lookup_returns_answer_of_similar_question(clock):
+    cache = _cache()
+    cache.store("카탄", _unit(1, 0, 0), "도적은 언제 움직이나요?", "7이 나오면 움직입니다.")
+
+    assert cache.lookup("카탄", _unit(1, 0.1, 0)) == "7이 나오면 움직입니다."
+    # 임계값 미만 유사도와 다른 게임은 적중하지 않음
+    assert cache.lookup("카탄", _unit(0, 1, 0)) is None
+    assert cache.lookup("우노", _unit(1, 0, 0)) is None
+    assert cache.get_stats()["hits"] == 1
+    assert cache.get_stats()["misses"] == 2
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = _cache()
+    cache.store("카탄", _unit(1, 0, 0), "질문", "답변")
+
+    clock.now += 59
+    assert cache.lookup("카탄", _unit(1, 0, 0)) == "답변"
+    clock.now += 2
+    assert cache.lookup("카탄", _unit(1, 0, 0)) is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_per_game_cap_drops_oldest_entries(clock):
+    cache = _cache(max_per_game=2)
+    for i in range(3):
+        cache.store("카탄", _unit(*np.eye(3)[i]), f"질문{i}", f"답변{i}")
+
+    assert cache.lookup("카탄", _unit(1, 0, 0)) is None
+    assert cache.lookup("카탄", _unit(0, 0, 1)) == "답변2"
+    assert cache.get_stats()["entries"] == 2
+
+
+def test_total_cap_evicts_least_recently_used_game(clock):
+    cache = _cache(max_entries=2)
+    cache.store("카탄", _unit(1, 0, 0), "질문", "카탄 답변")
+    cache.store("우노", _unit(1, 0, 0), "질문", "우노 답변")
+    assert cache.lookup("카탄", _unit(1, 0, 0)) == "카탄 답변"
+
+    cache.store("루미큐브", _unit(1, 0, 0), "질문", "루미큐브 답변")
+
+    assert cache.lookup("우노", _unit(1, 0, 0)) is None
+    assert cache.lookup("카탄", _unit(1, 0, 0)) == "카탄 답변"
+    assert cache.get_stats()["entries"] == 2
+
+
+def test_shared_database_is_visible_to_other_workers(clock, tmp_path):
+    db_path = str(tmp_path / "answers.sqlite")
+    writer, reader = _cache(db_path=db_path), _cache(db_path=db_path)
+
+    asyncio.run(writer.astore("카탄", _unit(1, 0, 0), "질문", "답변"))
+
+    assert asyncio.run(reader.alookup("카탄", _unit(1, 0, 0))) == "답변"
@@ -0,0 +1,107 @@
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from services import session_store
+from services.session_store import SessionStore, _trim_count
+
+
+class _Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def char_tokens(monkeypatch):
+    # tiktoken BPE 파일 다운로드 없이 글자 수를 토큰 수로 사용
+    monkeypatch.setattr(session_store, "count_tokens", len)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(session_store, "time", clock)
+    return clock
+
+
+def _turn(history, question, answer):
+    history.add_messages([HumanMessage(content=question), AIMessage(content=answer)])
+
+
+def _contents(history):
+    return [message.content for message in history.messages]
+
+
+def test_trim_count_drops_whole_turns_and_keeps_last_turn():
+    assert _trim_count([3, 3, 3, 3], 12) == 0
+    assert _trim_count([3, 3, 3, 3], 8) == 2
+    assert _trim_count([3, 3, 30, 30], 8) == 2
+    assert _trim_count([3, 3, 3, 3], 0) == 0
+
+
+def test_history_drops_oldest_turns_over_budget():
+    history = SessionStore(token_budget=10, db_path="", shared=False).get("s")
+    _turn(history, "q1", "a1")
+    _turn(history, "q2", "a2")
+    _turn(history, "q3", "a3")
+
+    assert _contents(history) == ["q2", "a2", "q3", "a3"]
+    assert history.token_count == 8
+
+    # 마지막 턴 하나가 예산보다 커도 남김
+    _turn(history, "긴 질문입니다", "긴 답변입니다")
+    assert _contents(history) == ["긴 질문입니다", "긴 답변입니다"]
+
+
+def test_idle_sessions_expire_after_ttl(clock):
+    store = SessionStore(ttl_seconds=60, db_path="", shared=False)
+    _turn(store.get("s"), "q", "a")
+
+    clock.now += 59
+    assert _contents(store.get("s")) == ["q", "a"]
+    clock.now += 61
+    assert _contents(store.get("s")) == []
+    assert store.get_stats()["evictions"] == 1
+
+
+def test_least_recently_used_session_is_evicted_over_max_count(clock):
+    store = SessionStore(max_sessions=2, db_path="", shared=False)
+    _turn(store.get("a"), "q", "a")
+    store.get("b")
+    store.get("a")
+    store.get("c")
+
+    assert store.get_stats()["sessions"] == 2
+    assert _contents(store.get("a")) == ["q", "a"]
+    assert store.get_stats()["evictions"] == 1
+
+
+def test_sqlite_layer_restores_and_trims_sessions(clock, tmp_path):
+    db_path = str(tmp_path / "sessions.sqlite")
+    store = SessionStore(token_budget=10, ttl_seconds=60, db_path=db_path, shared=False)
+    _turn(store.get("s"), "q1", "a1")
+    _turn(store.get("s"), "q2", "a2")
+    _turn(store.get("s"), "q3", "a3")
+
+    # 메모리에서 만료된 세션은 SQLite에서 잘린 상태 그대로 복원
+    clock.now += 61
+    assert _contents(store.get("s")) == ["q2", "a2", "q3", "a3"]
+    assert store.get_stats()["restored"] == 1
+
+
+def test_shared_workers_append_turns_without_losing_any(tmp_path):
+    db_path = str(tmp_path / "sessions.sqlite")
+    worker_a = SessionStore(token_budget=1000, db_path=db_path, shared=True)
+    worker_b = SessionStore(token_budget=1000, db_path=db_path, shared=True)
+
+    history_a, history_b = worker_a.get("s"), worker_b.get("s")
+    assert _contents(history_a) == _contents(history_b) == []
+    _turn(history_a, "qa", "aa")
+    _turn(history_b, "qb", "ab")
+
+    assert _contents(worker_a.get("s")) == ["qa", "aa", "qb", "ab"]
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+
+from services.similar_games import SimilarGames, update_table
+
+N_GAMES = 200
+K = 5
+
+
+def _vectors(n, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, 16)).astype("float32")
+
+
+def _brute_force(vectors, k):
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    sims = vectors @ vectors.T
+    np.fill_diagonal(sims, -np.inf)
+    return np.argsort(-sims, axis=1)[:, :k]
+
+
+def test_full_build_matches_brute_force():
+    vectors = _vectors(N_GAMES)
+    table, recomputed = update_table(vectors, k=K)
+
+    assert recomputed == N_GAMES
+    assert table["neighbors"].dtype == np.uint8
+    np.testing.assert_array_equal(table["neighbors"], _brute_force(vectors, K))
+    assert (np.diff(table["scores"].astype("float32"), axis=1) <= 0).all()
+
+
+def test_unchanged_vectors_are_not_recomputed():
+    vectors = _vectors(N_GAMES)
+    previous, _ = update_table(vectors, k=K)
+    table, recomputed = update_table(vectors, previous, k=K)
+
+    assert recomputed == 0
+    np.testing.assert_array_equal(table["neighbors"], previous["neighbors"])
+
+
+def test_added_games_are_merged_into_existing_rows():
+    vectors = _vectors(N_GAMES)
+    previous, _ = update_table(vectors[:-10], k=K)
+    table, recomputed = update_table(vectors, previous, k=K)
+
+    # 새 게임 행만 전체 계산하고, 기존 행은 새 게임과의 유사도만 합침
+    assert recomputed == 10
+    np.testing.assert_array_equal(table["neighbors"], _brute_force(vectors, K))
+
+
+def test_changed_game_recomputes_rows_that_listed_it():
+    vectors = _vectors(N_GAMES)
+    previous, _ = update_table(vectors, k=K)
+    listed_changed = int((previous["neighbors"] == 0).any(axis=1).sum())
+
+    vectors[0] = _vectors(1, seed=1)[0]
+    table, recomputed = update_table(vectors, previous, k=K)
+
+    assert recomputed == 1 + listed_changed
+    np.testing.assert_array_equal(table["neighbors"], _brute_force(vectors, K))
+
+
+def test_reordered_rows_reuse_previous_neighbors():
+    vectors = _vectors(N_GAMES)
+    previous, _ = update_table(vectors, k=K)
+    order = np.random.default_rng(2).permutation(N_GAMES)
+    table, recomputed = update_table(vectors[order], previous, k=K)
+
+    assert recomputed == 0
+    np.testing.assert_array_equal(table["neighbors"], _brute_force(vectors[order], K))
+
+
+def test_lookup_returns_neighbors_with_scores():
+    vectors = _vectors(N_GAMES)
+    table, _ = update_table(vectors, k=K)
+    similar = SimilarGames(table)
+
+    neighbors = similar.lookup(3)
+    assert [row for row, _ in neighbors] == table["neighbors"][3].tolist()
+    assert all(isinstance(score, float) for _, score in neighbors)
+    assert len(similar) == N_GAMES